@@ -1,2 +1,3 @@
 from . import reports
-from . import analytics 
\ No newline at end of file
+from . import analytics
+from . import uploads 
\ No newline at end of file
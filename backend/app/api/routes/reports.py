@@ -1,9 +1,19 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Form
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 from ...processors.excel_processor import ExcelProcessor
 from ...processors.report_processor import ReportProcessor
 from ...core.config import settings
+from ...services.task_store import get_task_store
+from ...services.txt_jobs import enqueue_txt_reports, get_txt_task_status
+from ...services.resumable_uploads import get_upload_store
+from ...services.artifact_storage import get_artifact_storage
+from ...services.report_outbox import get_report_outbox
+from ...services.processed_catalog import get_processed_catalog
+from ...processors.base_encoding import decode_base_parquet_records
+from ...core.workers import run_cpu
+import asyncio
 import json
 from pathlib import Path
 
@@ -13,7 +23,8 @@ report_processor = ReportProcessor()
 
 @router.post("/upload")
 async def upload_file(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None, description="ID de um upload em partes finalizado, no lugar de file"),
     report_type: str = Form(..., description="Tipo do relatório (plantio, colheita, cav)"),
     report_date: date = Form(..., description="Data do relatório"),
     frente: str = Form(..., description="Frente de trabalho"),
@@ -28,8 +39,18 @@ async def upload_file(
     Suporta tanto relatórios diários quanto semanais
     """
     try:
-        # Validar arquivo
-        await excel_processor.validate_file(file)
+        # Validar arquivo, enviado diretamente ou por upload em partes
+        if upload_id:
+            upload_store = get_upload_store()
+            arquivo = upload_store.get_file(upload_id)
+            filename = upload_store.filename(upload_id)
+            excel_processor.validate_filename(filename)
+        elif file:
+            await excel_processor.validate_file(file)
+            arquivo = file
+            filename = file.filename
+        else:
+            raise HTTPException(status_code=400, detail="Envie o arquivo ou o upload_id de um upload em partes finalizado")
         
         # Determinar se é relatório semanal
         is_weekly = report_type and 'semanal' in report_type and start_date and end_date
@@ -39,7 +60,9 @@ async def upload_file(
         print(f"Data(s): {report_date} {f'(Período: {start_date} a {end_date})' if is_weekly else ''}")
         
         # Processar arquivo
-        processed_data = await excel_processor.process_file(file, report_type=report_type)
+        processed_data = await excel_processor.process_file(arquivo, report_type=report_type, filename=filename)
+        if upload_id:
+            upload_store.delete(upload_id)
         
         # Gerar relatório
         report = await report_processor.generate_report(
@@ -62,12 +85,17 @@ async def upload_file(
             processed_path = settings.UPLOAD_DIR / processed_filename
             with open(processed_path, 'w', encoding='utf-8') as f:
                 json.dump(report, f, ensure_ascii=False, indent=2)
+            
+            # Registrar no catálogo usado por /daily e /analytics
+            get_processed_catalog().register(processed_path, report)
         
         return {
             "message": "Relatório gerado com sucesso",
             "data": report
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -82,19 +110,15 @@ async def get_daily_report(
     Recupera relatório diário processado
     """
     try:
-        # Construir padrão do nome do arquivo
-        date_str = report_date.strftime("%Y%m%d")
-        files = list(settings.UPLOAD_DIR.glob(f"processed_{date_str}_*.json"))
+        # Arquivo gerado por último para a data, o tipo e a frente, consultado no catálogo
+        latest_file = get_processed_catalog().latest(report_date, report_type, frente)
         
-        if not files:
+        if latest_file is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Nenhum relatório encontrado para a data {report_date}"
             )
         
-        # Pegar o arquivo mais recente
-        latest_file = max(files, key=lambda x: x.stat().st_mtime)
-        
         # Carregar dados
         with open(latest_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -110,6 +134,8 @@ async def get_daily_report(
         
         return report
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -137,24 +163,18 @@ async def get_analytics(
             'group_by': group_by
         }
         
-        # Carregar e agregar dados do período
-        date_range = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1)]
+        # Carregar e agregar dados do período: o arquivo mais recente de cada dia, em uma única consulta ao catálogo
         aggregated_data = {}
         
-        for current_date in date_range:
-            date_str = current_date.strftime("%Y%m%d")
-            files = list(settings.UPLOAD_DIR.glob(f"processed_{date_str}_*.json"))
+        for _, latest_file in get_processed_catalog().latest_by_date(start_date, end_date, report_type, frente):
+            with open(latest_file, 'r', encoding='utf-8') as f:
+                day_data = json.load(f)
             
-            if files:
-                latest_file = max(files, key=lambda x: x.stat().st_mtime)
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    day_data = json.load(f)
-                
-                # Agregar dados do dia
-                for key, value in day_data.get('data', {}).items():
-                    if key not in aggregated_data:
-                        aggregated_data[key] = []
-                    aggregated_data[key].append(value)
+            # Agregar dados do dia
+            for key, value in day_data.get('data', {}).items():
+                if key not in aggregated_data:
+                    aggregated_data[key] = []
+                aggregated_data[key].append(value)
         
         # Gerar relatório com dados agregados
         if aggregated_data:
@@ -169,4 +189,133 @@ async def get_analytics(
         return analytics_data
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.post("/txt")
+async def upload_txt_files(
+    colhedora_file: Optional[UploadFile] = File(None, description="Arquivo TXT de colhedoras"),
+    transbordo_file: Optional[UploadFile] = File(None, description="Arquivo TXT de transbordos"),
+    colhedora_upload_id: Optional[str] = Form(None, description="Upload em partes finalizado, no lugar de colhedora_file"),
+    transbordo_upload_id: Optional[str] = Form(None, description="Upload em partes finalizado, no lugar de transbordo_file"),
+    frentes: List[str] = Form(..., description="Frentes selecionadas"),
+    report_types: List[str] = Form(..., description="Tipos de relatório selecionados"),
+    report_date: date = Form(..., description="Data do relatório"),
+    is_teste: bool = Form(False, description="Indica se é um processamento de teste")
+):
+    """
+    Enfileira a geração de relatórios a partir de arquivos TXT.
+    O processamento é feito pelos workers (worker.py); o progresso é acompanhado pelas rotas /tarefas.
+    """
+    # Uploads em partes finalizados são entregues à fila no lugar dos arquivos
+    upload_store = get_upload_store()
+    if colhedora_upload_id:
+        colhedora_file = upload_store.get_file(colhedora_upload_id)
+    if transbordo_upload_id:
+        transbordo_file = upload_store.get_file(transbordo_upload_id)
+
+    if not colhedora_file and not transbordo_file:
+        raise HTTPException(status_code=400, detail="Pelo menos um arquivo (colhedora ou transbordo) deve ser fornecido")
+
+    try:
+        task_id, criado = await enqueue_txt_reports(
+            colhedora_file, transbordo_file, frentes, report_types, report_date, is_teste
+        )
+        # Os arquivos foram movidos para a fila; as sessões de upload não são mais necessárias
+        for consumido in (colhedora_upload_id, transbordo_upload_id):
+            if consumido:
+                upload_store.delete(consumido)
+        return {
+            "task_id": task_id,
+            "duplicate": not criado,
+            "status": get_txt_task_status(task_id)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/base")
+async def get_report_base(
+    key: str = Query(..., description="Chave do artefato, da referência em dados.base do relatório"),
+    formato: str = Query("records", description="records (JSON) ou parquet (arquivo original)")
+):
+    """
+    Retorna a base bruta de um relatório gravada como artefato Parquet
+    (settings.REPORT_BASE_STORAGE = "artifact").
+    """
+    if formato not in ("records", "parquet"):
+        raise HTTPException(status_code=400, detail="Formato inválido: use records ou parquet")
+    try:
+        conteudo = await get_artifact_storage().get(key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Base não encontrada")
+
+    if formato == "parquet":
+        return Response(content=conteudo, media_type="application/vnd.apache.parquet")
+    return await run_cpu(decode_base_parquet_records, conteudo)
+
+@router.get("/outbox/{report_id}")
+async def get_outbox_report(report_id: str):
+    """
+    Estado do envio de um relatório aceito no outbox (settings.PERSIST_MODE = "outbox"),
+    pelo id provisório; remote_id é o id definitivo após o envio.
+    """
+    registro = get_report_outbox().get(report_id)
+    if registro is None:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado no outbox")
+    return registro
+
+@router.get("/tarefas/{task_id}")
+async def get_task_status(task_id: str):
+    """
+    Retorna o status atual de uma tarefa de processamento
+    """
+    status = get_txt_task_status(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return status
+
+@router.get("/tarefas/{task_id}/eventos")
+async def stream_task_status(task_id: str):
+    """
+    Envia o progresso da tarefa via Server-Sent Events, um evento "progress" a cada mudança
+    de etapa ou de relatório concluído. O stream termina quando a tarefa conclui ou falha.
+    """
+    store = get_task_store()
+    if store.get(task_id) is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+
+    async def eventos():
+        fila: asyncio.Queue = asyncio.Queue()
+
+        async def acompanhar():
+            async for status in store.watch(task_id, settings.TASK_EVENTS_POLL_INTERVAL):
+                await fila.put(status)
+            await fila.put(StopAsyncIteration)
+
+        tarefa = asyncio.create_task(acompanhar())
+        try:
+            while True:
+                try:
+                    status = await asyncio.wait_for(fila.get(), timeout=settings.TASK_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão aberta em proxies sem gerar evento no cliente
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if status is StopAsyncIteration:
+                    break
+                if status is None:
+                    # Status expirado ou removido durante o acompanhamento
+                    status = {"status": "not_found"}
+                yield f"event: progress\ndata: {json.dumps(status, ensure_ascii=False, default=str)}\n\n"
+        finally:
+            tarefa.cancel()
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
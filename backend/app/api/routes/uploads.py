@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Form, Header, Query, Request
+from typing import Optional
+from ...services.resumable_uploads import get_upload_store
+
+router = APIRouter()
+
+@router.post("")
+async def init_upload(
+    filename: str = Form(..., description="Nome do arquivo"),
+    size: int = Form(..., description="Tamanho total do arquivo em bytes"),
+    sha256: Optional[str] = Form(None, description="SHA-256 do arquivo, conferido na finalização")
+):
+    """
+    Inicia um upload em partes. Retorna o upload_id, o tamanho das partes (part_size) e o total de partes
+    """
+    return get_upload_store().init(filename, size, sha256)
+
+@router.get("/{upload_id}")
+async def get_upload_status(upload_id: str):
+    """
+    Estado do upload: partes recebidas e pendentes (para retomar um envio interrompido)
+    """
+    return get_upload_store().status(upload_id)
+
+@router.put("/{upload_id}")
+async def upload_part(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., description="Posição da parte no arquivo (múltiplo de part_size)"),
+    x_part_sha256: Optional[str] = Header(None, description="SHA-256 da parte, conferido antes de confirmá-la")
+):
+    """
+    Envia uma parte do arquivo no corpo da requisição. As partes podem ser enviadas em paralelo
+    """
+    return await get_upload_store().write_part(upload_id, offset, request.stream(), x_part_sha256)
+
+@router.post("/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    sha256: Optional[str] = Form(None, description="SHA-256 do arquivo, se não informado no início")
+):
+    """
+    Finaliza o upload após o envio de todas as partes, conferindo o SHA-256 do arquivo.
+    O upload_id pode então ser usado no lugar do arquivo em /relatorios/upload e /relatorios/txt
+    """
+    return await get_upload_store().finalize(upload_id, sha256)
+
+@router.delete("/{upload_id}")
+async def cancel_upload(upload_id: str):
+    """
+    Cancela o upload e remove as partes recebidas
+    """
+    store = get_upload_store()
+    store.status(upload_id)
+    store.delete(upload_id)
+    return {"upload_id": upload_id, "status": "deleted"}
@@ -19,9 +19,71 @@ class Settings(BaseSettings):
     
     # Configurações de arquivos
     UPLOAD_DIR: Path = Path("uploads")
+    PROCESSED_CATALOG_PATH: Path = Path("data/processed_catalog.sqlite3")  # Índice dos processed_*.json de UPLOAD_DIR
     ALLOWED_EXTENSIONS: List[str] = ["xlsx", "csv"]
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_TXT_UPLOAD_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB - telemetria em TXT
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB - blocos gravados em disco durante o upload
+    UPLOAD_SESSIONS_DIR: Path = Path("data/uploads_parciais")  # Uploads em partes (retomáveis)
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # 8MB - tamanho de cada parte dos uploads em partes
+    UPLOAD_SESSION_TTL: int = 24 * 60 * 60  # 24 horas sem receber partes - o upload em partes é removido
     
+    # Configurações de processamento de TXT
+    TXT_CHUNK_ROWS: int = 200_000  # Linhas por bloco na leitura em blocos
+    TXT_STREAMING_MIN_SIZE: int = 256 * 1024 * 1024  # 256MB - arquivos maiores são lidos em blocos
+    TXT_CACHE_ENABLED: bool = True  # Reaproveita a telemetria tratada de arquivos já processados
+    TXT_CACHE_DIR: Path = Path("cache/telemetria")
+    TXT_CACHE_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB - entradas menos usadas são removidas
+    REPORT_BASE_FORMAT: str = "columnar"  # Seção "base" dos relatórios: "columnar" (compacta) ou "records"
+    REPORT_BASE_STORAGE: str = "inline"  # "inline" (base dentro do relatório) ou "artifact" (Parquet no armazenamento de artefatos)
+    
+    # Configurações do armazenamento de artefatos (base dos relatórios em Parquet)
+    ARTIFACT_STORAGE_BACKEND: str = "local"  # "local" (desenvolvimento e testes) ou "supabase" (Storage)
+    ARTIFACT_STORAGE_DIR: Path = Path("data/artefatos")
+    ARTIFACT_BUCKET: str = "relatorios-base"
+    
+    # Configurações dos pools de execução
+    CPU_POOL_TYPE: str = "process"  # "process" para as etapas em pandas; "thread" evita serializar os dados
+    CPU_POOL_WORKERS: int = os.cpu_count() or 1
+    IO_POOL_WORKERS: int = 8  # Threads para disco e chamadas ao Supabase
+    REPORTS_MAX_CONCURRENCY: int = 4  # Relatórios (frente x tipo) gerados ao mesmo tempo; 1 gera em sequência
+    PERSIST_MAX_CONCURRENCY: int = 4  # Bases de relatórios gravadas no armazenamento de artefatos ao mesmo tempo
+    PERSIST_BATCH_MAX_BYTES: int = 4 * 1024 * 1024  # 4MB - JSON máximo de cada inserção em lote
+    PERSIST_BATCH_MAX_ROWS: int = 100  # Relatórios por inserção em lote
+    PERSIST_MODE: str = "direct"  # "direct" (grava antes de concluir a tarefa) ou "outbox" (grava em segundo plano)
+    OUTBOX_PATH: Path = Path("data/outbox.sqlite3")
+    OUTBOX_POLL_INTERVAL: float = 2.0  # Segundos entre verificações de registros pendentes
+    OUTBOX_RETRY_DELAY: int = 5  # Segundos até a segunda tentativa de envio; dobra a cada nova falha
+    OUTBOX_MAX_RETRY_DELAY: int = 300  # Intervalo máximo entre tentativas de envio
+    OUTBOX_LEASE_TIMEOUT: int = 120  # Segundos de reserva do envio por um processo; renovada a cada lote
+    OUTBOX_RETENTION: int = 7 * 24 * 60 * 60  # 7 dias - registros enviados ou falhos são removidos
+
+    # Configurações do banco de dados
+    DATABASE_BACKEND: str = "supabase"  # "supabase" ou "local" (SQLite com a mesma API de tabelas, sem rede)
+    LOCAL_DATABASE_PATH: Path = Path("data/local_db.sqlite3")
+    LOCAL_STORAGE_DIR: Path = Path("data/storage")  # Buckets do Storage com DATABASE_BACKEND=local
+    DATABASE_HTTP_TIMEOUT: float = 60.0  # Segundos por requisição ao Supabase
+    DATABASE_HTTP_MAX_CONNECTIONS: int = 20  # Conexões simultâneas com o Supabase por processo
+    DATABASE_HTTP_MAX_KEEPALIVE: int = 10  # Conexões mantidas abertas entre requisições
+    DATABASE_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Segundos até fechar uma conexão ociosa
+
+    # Configurações do status das tarefas
+    TASK_STORE_BACKEND: str = "sqlite"  # "sqlite" (API e workers da fila na mesma máquina) ou "memory" (um único processo, sem worker.py)
+    TASK_STORE_PATH: Path = Path("data/task_status.sqlite3")
+    TASK_STATUS_TTL: int = 24 * 60 * 60  # 24 horas sem atualização - o status é descartado
+    TASK_STATUS_MAX_ENTRIES: int = 1000  # Acima disso, os status atualizados há mais tempo são descartados
+    TASK_EVENTS_POLL_INTERVAL: float = 0.5  # Segundos entre verificações de mudança no stream de eventos
+    TASK_EVENTS_KEEPALIVE: float = 15.0  # Segundos sem mudança até enviar um comentário de keep-alive
+
+    # Configurações da fila de processamento (worker.py)
+    JOB_QUEUE_PATH: Path = Path("data/jobs.sqlite3")
+    JOB_FILES_DIR: Path = Path("data/jobs")  # Arquivos enviados aguardando os workers
+    JOB_VISIBILITY_TIMEOUT: int = 300  # Segundos de reserva de um trabalho; renovada enquanto o worker roda
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY: int = 30  # Segundos até a segunda tentativa; dobra a cada nova falha
+    JOB_RETENTION: int = 7 * 24 * 60 * 60  # 7 dias - trabalhos concluídos ou falhos são removidos
+    JOB_POLL_INTERVAL: float = 1.0  # Segundos entre consultas à fila vazia
+
     # Configurações de cache
     CACHE_EXPIRE_MINUTES: int = 60  # 1 hora
     
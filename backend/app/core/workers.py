@@ -0,0 +1,86 @@
+"""
+Pools de execução usados para tirar do event loop o trabalho bloqueante.
+
+O pool de CPU recebe as etapas pesadas em pandas (processos ou threads, conforme
+settings.CPU_POOL_TYPE) e o pool de I/O, sempre de threads, recebe acesso a disco e
+chamadas bloqueantes a serviços externos. As corrotinas aguardam o resultado, então o
+servidor continua atendendo outras requisições enquanto o trabalho é executado.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+_cpu_executor: Optional[Executor] = None
+_io_executor: Optional[Executor] = None
+
+
+def get_cpu_executor() -> Executor:
+    """
+    Retorna o pool de CPU, criando-o no primeiro uso.
+    """
+    global _cpu_executor
+    if _cpu_executor is None:
+        if settings.CPU_POOL_TYPE == "process":
+            # "spawn" evita herdar, via fork, threads e conexões abertas pelo servidor
+            _cpu_executor = ProcessPoolExecutor(
+                max_workers=settings.CPU_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        elif settings.CPU_POOL_TYPE == "thread":
+            _cpu_executor = ThreadPoolExecutor(
+                max_workers=settings.CPU_POOL_WORKERS, thread_name_prefix="cpu"
+            )
+        else:
+            raise ValueError(f"CPU_POOL_TYPE inválido: {settings.CPU_POOL_TYPE} (use 'process' ou 'thread')")
+    return _cpu_executor
+
+
+def get_io_executor() -> Executor:
+    """
+    Retorna o pool de I/O, criando-o no primeiro uso.
+    """
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=settings.IO_POOL_WORKERS, thread_name_prefix="io")
+    return _io_executor
+
+
+async def run_cpu(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa func no pool de CPU e aguarda o resultado.
+    No pool de processos, func e os argumentos precisam ser serializáveis (funções de módulo).
+    """
+    global _cpu_executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_cpu_executor(), partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        # Um worker morreu (ex.: falta de memória); o próximo uso cria um pool novo
+        _cpu_executor = None
+        raise
+
+
+async def run_io(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa func no pool de I/O e aguarda o resultado.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """
+    Encerra os pools, aguardando as tarefas em andamento.
+    """
+    global _cpu_executor, _io_executor
+    for executor in (_cpu_executor, _io_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _cpu_executor = None
+    _io_executor = None
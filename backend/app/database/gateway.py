@@ -0,0 +1,291 @@
+"""
+Gateway assíncrono de persistência: tabelas (PostgREST) e Storage do Supabase.
+
+O cliente síncrono do Supabase bloqueia o event loop a cada requisição. Aqui as chamadas usam
+um httpx.AsyncClient com pool de conexões e keep-alive, compartilhado por todas as requisições
+do processo (limites em settings.DATABASE_HTTP_*).
+
+Com settings.DATABASE_BACKEND = "local", LocalGateway oferece a mesma interface sobre o
+LocalDatabaseClient e um diretório local (settings.LOCAL_STORAGE_DIR), sem rede.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+from dotenv import load_dotenv
+
+from ..core.config import settings
+from ..core.workers import run_io
+from .local_client import LocalDatabaseClient
+
+
+class PersistenceError(Exception):
+    """
+    Falha de uma operação de persistência. status é o código HTTP (None em falhas de conexão).
+    """
+
+    def __init__(self, mensagem: str, status: Optional[int] = None):
+        super().__init__(mensagem)
+        self.status = status
+
+    @property
+    def transitoria(self) -> bool:
+        """
+        Indica se a falha pode desaparecer em uma nova tentativa (conexão, timeout, 408, 429 ou 5xx).
+        """
+        return self.status is None or self.status in (408, 429) or self.status >= 500
+
+
+class PersistenceResponseError(PersistenceError):
+    """
+    O banco aceitou a operação (resposta 2xx), mas a resposta não pôde ser usada (ex.: JSON
+    inválido ou número de linhas diferente do enviado). A operação não deve ser repetida:
+    os registros provavelmente já foram gravados.
+    """
+
+    @property
+    def transitoria(self) -> bool:
+        return False
+
+
+def json_bytes(conteudo: Any) -> bytes:
+    """
+    Serializa o conteúdo no JSON enviado ao banco. Datas e outros tipos sem representação
+    JSON são enviados como texto.
+    """
+    return json.dumps(conteudo, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _validar_caminho(caminho: str) -> str:
+    # Caminhos de objetos podem vir de referências lidas do banco: recusar saídas do bucket
+    partes = PurePosixPath(caminho).parts
+    if not partes or caminho.startswith('/') or any(parte in ('', '.', '..') for parte in partes):
+        raise ValueError(f"Caminho de objeto inválido: {caminho}")
+    return caminho
+
+
+class SupabaseGateway:
+    """
+    Acesso assíncrono às APIs REST do Supabase.
+    """
+
+    def __init__(self, url: str, chave: str):
+        self.url = url.rstrip('/')
+        self.chave = chave
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _cliente(self) -> httpx.AsyncClient:
+        # As conexões do pool pertencem ao event loop em que foram abertas
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._http = httpx.AsyncClient(
+                base_url=self.url,
+                headers={"apikey": self.chave, "Authorization": f"Bearer {self.chave}"},
+                timeout=settings.DATABASE_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.DATABASE_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.DATABASE_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.DATABASE_HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+            self._loop = loop
+        return self._http
+
+    async def _requisicao(self, metodo: str, caminho: str, **kwargs: Any) -> httpx.Response:
+        try:
+            response = await self._cliente().request(metodo, caminho, **kwargs)
+        except httpx.HTTPError as e:
+            raise PersistenceError(f"Falha de conexão com o Supabase ({metodo} {caminho}): {str(e)}")
+        if response.status_code >= 400:
+            raise PersistenceError(
+                f"Supabase retornou {response.status_code} ({metodo} {caminho}): {response.text[:500]}",
+                response.status_code
+            )
+        return response
+
+    async def insert(self, tabela: str, registros: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insere os registros com uma única requisição e retorna as linhas gravadas, na mesma ordem.
+        """
+        return await self.insert_json(tabela, json_bytes(registros))
+
+    async def insert_json(self, tabela: str, corpo: bytes) -> List[Dict[str, Any]]:
+        """
+        Como insert, com os registros já serializados em um array JSON (ver json_bytes).
+        """
+        response = await self._requisicao(
+            "POST", f"/rest/v1/{tabela}",
+            content=corpo,
+            headers={"Content-Type": "application/json", "Prefer": "return=representation"}
+        )
+        try:
+            return response.json()
+        except ValueError as e:
+            raise PersistenceResponseError(
+                f"Resposta inválida do Supabase após inserir em {tabela}: {str(e)}", response.status_code
+            )
+
+    async def update(self, tabela: str, valores: Dict[str, Any], filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Atualiza as linhas com coluna = valor para cada filtro e retorna as linhas alteradas.
+        """
+        response = await self._requisicao(
+            "PATCH", f"/rest/v1/{tabela}",
+            params={coluna: f"eq.{valor}" for coluna, valor in filtros.items()},
+            content=json_bytes(valores),
+            headers={"Content-Type": "application/json", "Prefer": "return=representation"}
+        )
+        return response.json()
+
+    async def list_buckets(self) -> List[Dict[str, Any]]:
+        return (await self._requisicao("GET", "/storage/v1/bucket")).json()
+
+    async def create_bucket(self, nome: str, publico: bool = False) -> None:
+        await self._requisicao("POST", "/storage/v1/bucket", json={"id": nome, "name": nome, "public": publico})
+
+    async def upload(
+        self, bucket: str, caminho: str, conteudo: bytes,
+        content_type: str = "application/octet-stream", upsert: bool = False
+    ) -> None:
+        """
+        Grava um objeto no bucket.
+        """
+        await self._requisicao(
+            "POST", f"/storage/v1/object/{bucket}/{quote(_validar_caminho(caminho))}",
+            content=conteudo,
+            headers={"Content-Type": content_type, "x-upsert": "true" if upsert else "false"}
+        )
+
+    async def download(self, bucket: str, caminho: str) -> bytes:
+        """
+        Lê um objeto do bucket. Levanta FileNotFoundError se ele não existir.
+        """
+        try:
+            response = await self._requisicao("GET", f"/storage/v1/object/{bucket}/{quote(_validar_caminho(caminho))}")
+        except PersistenceError as e:
+            if e.status in (400, 404):
+                raise FileNotFoundError(f"Objeto {caminho} não encontrado no bucket {bucket}")
+            raise
+        return response.content
+
+    async def remove(self, bucket: str, caminhos: List[str]) -> None:
+        await self._requisicao(
+            "DELETE", f"/storage/v1/object/{bucket}",
+            json={"prefixes": [_validar_caminho(caminho) for caminho in caminhos]}
+        )
+
+    def public_url(self, bucket: str, caminho: str) -> str:
+        return f"{self.url}/storage/v1/object/public/{bucket}/{quote(caminho)}"
+
+    async def aclose(self) -> None:
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http = None
+
+
+class LocalGateway:
+    """
+    Mesma interface de SupabaseGateway, sobre o LocalDatabaseClient e arquivos em diretorio/<bucket>/.
+    As operações síncronas rodam no pool de I/O.
+    """
+
+    def __init__(self, cliente: LocalDatabaseClient, diretorio: Path):
+        self.cliente = cliente
+        self.diretorio = Path(diretorio)
+
+    def _arquivo(self, bucket: str, caminho: str) -> Path:
+        return self.diretorio.joinpath(bucket, *PurePosixPath(_validar_caminho(caminho)).parts)
+
+    async def insert(self, tabela: str, registros: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return (await run_io(self.cliente.from_(tabela).insert(registros).execute)).data
+
+    async def insert_json(self, tabela: str, corpo: bytes) -> List[Dict[str, Any]]:
+        return await run_io(lambda: self.cliente.from_(tabela).insert(json.loads(corpo)).execute().data)
+
+    async def update(self, tabela: str, valores: Dict[str, Any], filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        consulta = self.cliente.from_(tabela).update(valores)
+        for coluna, valor in filtros.items():
+            consulta = consulta.eq(coluna, valor)
+        return (await run_io(consulta.execute)).data
+
+    async def list_buckets(self) -> List[Dict[str, Any]]:
+        if not self.diretorio.exists():
+            return []
+        return [{"id": item.name, "name": item.name} for item in self.diretorio.iterdir() if item.is_dir()]
+
+    async def create_bucket(self, nome: str, publico: bool = False) -> None:
+        (self.diretorio / nome).mkdir(parents=True, exist_ok=True)
+
+    async def upload(
+        self, bucket: str, caminho: str, conteudo: bytes,
+        content_type: str = "application/octet-stream", upsert: bool = False
+    ) -> None:
+        arquivo = self._arquivo(bucket, caminho)
+        if arquivo.exists() and not upsert:
+            raise PersistenceError(f"Objeto {caminho} já existe no bucket {bucket}", 409)
+
+        def gravar() -> None:
+            arquivo.parent.mkdir(parents=True, exist_ok=True)
+            temporario = arquivo.with_name(f".{arquivo.name}.tmp")
+            temporario.write_bytes(conteudo)
+            os.replace(temporario, arquivo)
+
+        await run_io(gravar)
+
+    async def download(self, bucket: str, caminho: str) -> bytes:
+        return await run_io(self._arquivo(bucket, caminho).read_bytes)
+
+    async def remove(self, bucket: str, caminhos: List[str]) -> None:
+        arquivos = [self._arquivo(bucket, caminho) for caminho in caminhos]
+
+        def remover() -> None:
+            for arquivo in arquivos:
+                arquivo.unlink(missing_ok=True)
+
+        await run_io(remover)
+
+    def public_url(self, bucket: str, caminho: str) -> str:
+        return self._arquivo(bucket, caminho).resolve().as_uri()
+
+    async def aclose(self) -> None:
+        pass
+
+
+_gateways: Dict[bool, Any] = {}
+
+
+def get_persistence_gateway(admin: bool = False) -> Any:
+    """
+    Retorna o gateway de persistência configurado em settings.DATABASE_BACKEND, criando-o no
+    primeiro uso. admin=True usa a chave service_role (SUPABASE_SERVICE_ROLE), quando existir,
+    para operações de administração como criar buckets.
+    """
+    if admin not in _gateways:
+        if settings.DATABASE_BACKEND == "local":
+            _gateways[admin] = _gateways.get(not admin) or LocalGateway(
+                LocalDatabaseClient(settings.LOCAL_DATABASE_PATH), settings.LOCAL_STORAGE_DIR
+            )
+        else:
+            load_dotenv()
+            url = os.getenv('SUPABASE_URL')
+            chave = os.getenv('SUPABASE_KEY')
+            if not url or not chave:
+                raise Exception("Variáveis de ambiente SUPABASE_URL e SUPABASE_KEY são obrigatórias")
+            if admin:
+                chave = os.getenv('SUPABASE_SERVICE_ROLE') or chave
+            _gateways[admin] = SupabaseGateway(url, chave)
+    return _gateways[admin]
+
+
+async def close_persistence_gateways() -> None:
+    """
+    Fecha as conexões abertas pelos gateways (encerramento da API e dos workers).
+    """
+    for gateway in list(_gateways.values()):
+        await gateway.aclose()
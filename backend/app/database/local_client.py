@@ -0,0 +1,153 @@
+"""
+Substituto local do cliente do Supabase, para desenvolvimento e testes sem rede.
+
+Implementa a parte da API de tabelas usada pelo backend (from_/table, insert, update,
+delete, select, eq, order, limit e execute), guardando os registros como JSON em um
+arquivo SQLite. Cada registro inserido recebe um id (uuid) e as respostas trazem os
+registros em .data, na mesma ordem da inserção, como o PostgREST.
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+@dataclass
+class LocalResponse:
+    """
+    Resposta de execute(), no formato das respostas do cliente do Supabase.
+    """
+    data: List[Dict[str, Any]] = field(default_factory=list)
+    count: Optional[int] = None
+
+
+class LocalQuery:
+    """
+    Consulta sobre uma tabela, montada em cadeia e executada por execute().
+    """
+
+    def __init__(self, cliente: "LocalDatabaseClient", tabela: str):
+        self.cliente = cliente
+        self.tabela = tabela
+        self.operacao = "select"
+        self.registros: List[Dict[str, Any]] = []
+        self.valores: Dict[str, Any] = {}
+        self.filtros: List[Tuple[str, Any]] = []
+        self.ordenacao: List[Tuple[str, bool]] = []
+        self.limite: Optional[int] = None
+
+    def select(self, *colunas: str) -> "LocalQuery":
+        # Todas as colunas são sempre retornadas
+        self.operacao = "select"
+        return self
+
+    def insert(self, registros: Union[Dict[str, Any], List[Dict[str, Any]]]) -> "LocalQuery":
+        self.operacao = "insert"
+        self.registros = registros if isinstance(registros, list) else [registros]
+        return self
+
+    def update(self, valores: Dict[str, Any]) -> "LocalQuery":
+        self.operacao = "update"
+        self.valores = valores
+        return self
+
+    def delete(self) -> "LocalQuery":
+        self.operacao = "delete"
+        return self
+
+    def eq(self, coluna: str, valor: Any) -> "LocalQuery":
+        self.filtros.append((coluna, valor))
+        return self
+
+    def order(self, coluna: str, desc: bool = False) -> "LocalQuery":
+        self.ordenacao.append((coluna, desc))
+        return self
+
+    def limit(self, quantidade: int) -> "LocalQuery":
+        self.limite = quantidade
+        return self
+
+    def execute(self) -> LocalResponse:
+        return self.cliente._executar(self)
+
+
+class LocalDatabaseClient:
+    """
+    Tabelas guardadas em um arquivo SQLite, com a interface de tabelas do cliente do Supabase.
+    """
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._conectar() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS registros (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tabela TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    dados TEXT NOT NULL,
+                    UNIQUE (tabela, id)
+                )
+            """)
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    def from_(self, tabela: str) -> LocalQuery:
+        return LocalQuery(self, tabela)
+
+    table = from_
+
+    def _selecionar(self, conexao: sqlite3.Connection, consulta: LocalQuery) -> List[Tuple[int, Dict[str, Any]]]:
+        linhas = conexao.execute(
+            "SELECT seq, dados FROM registros WHERE tabela = ? ORDER BY seq", (consulta.tabela,)
+        ).fetchall()
+        registros = [(seq, json.loads(dados)) for seq, dados in linhas]
+        return [
+            (seq, registro) for seq, registro in registros
+            if all(registro.get(coluna) == valor for coluna, valor in consulta.filtros)
+        ]
+
+    def _executar(self, consulta: LocalQuery) -> LocalResponse:
+        with self._lock, self._conectar() as conexao:
+            if consulta.operacao == "insert":
+                inseridos = []
+                for registro in consulta.registros:
+                    registro = {"id": str(uuid.uuid4()), **registro}
+                    # Mesmo JSON que seria enviado ao PostgREST: datas e outros tipos como texto
+                    dados = json.dumps(registro, ensure_ascii=False, default=str)
+                    conexao.execute(
+                        "INSERT INTO registros (tabela, id, dados) VALUES (?, ?, ?)",
+                        (consulta.tabela, str(registro["id"]), dados)
+                    )
+                    inseridos.append(json.loads(dados))
+                return LocalResponse(inseridos)
+
+            selecionados = self._selecionar(conexao, consulta)
+
+            if consulta.operacao == "update":
+                atualizados = []
+                for seq, registro in selecionados:
+                    registro.update(consulta.valores)
+                    dados = json.dumps(registro, ensure_ascii=False, default=str)
+                    conexao.execute("UPDATE registros SET dados = ? WHERE seq = ?", (dados, seq))
+                    atualizados.append(json.loads(dados))
+                return LocalResponse(atualizados)
+
+            if consulta.operacao == "delete":
+                conexao.executemany("DELETE FROM registros WHERE seq = ?", [(seq,) for seq, _ in selecionados])
+                return LocalResponse([registro for _, registro in selecionados])
+
+            registros = [registro for _, registro in selecionados]
+            for coluna, desc in reversed(consulta.ordenacao):
+                registros.sort(key=lambda registro: (registro.get(coluna) is None, registro.get(coluna)), reverse=desc)
+            if consulta.limite is not None:
+                registros = registros[:consulta.limite]
+            return LocalResponse(registros, len(registros))
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.workers import shutdown_executors
 from app.api import reports
 
 app = FastAPI(
@@ -20,6 +21,11 @@ app.add_middleware(
 # Incluindo as rotas
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 
+@app.on_event("shutdown")
+def encerrar_pools():
+    # Encerrar os pools de execução usados no processamento dos relatórios
+    shutdown_executors()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Codificação colunar compacta da seção "base" dos relatórios.
+
+Em vez de uma lista de registros, que repete o nome de cada coluna e cada texto em todas as
+linhas, a base é gravada coluna a coluna:
+- textos e categorias: dicionário de valores distintos + códigos (-1 para nulo);
+- datas e horas: primeiro instante + diferenças entre linhas consecutivas, em inteiros;
+- números: lista de valores (None para nulo).
+
+O tipo original de cada coluna é guardado, então decode_base reconstrói o mesmo DataFrame
+e decode_base_records os mesmos registros de df.to_dict(orient='records').
+
+Com settings.REPORT_BASE_STORAGE = "artifact", a base sai do relatório: é gravada como Parquet
+compactado (encode_base_parquet) no armazenamento de artefatos e o relatório guarda só a
+referência (ver services/artifact_storage.py).
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# Identificador do formato, gravado no payload para permitir evoluções
+FORMATO_BASE = "columnar-v1"
+
+# Identificador do formato dos artefatos da base
+FORMATO_BASE_PARQUET = "parquet"
+
+# Compressão dos artefatos Parquet
+COMPRESSAO_PARQUET = "zstd"
+
+# Unidades de tempo possíveis para as diferenças, da mais grossa para a mais fina (em ns)
+UNIDADES_TEMPO = (("s", 10**9), ("ms", 10**6), ("us", 10**3), ("ns", 1))
+
+
+def _valores_json(serie: pd.Series) -> List[Any]:
+    """
+    Valores da série como tipos nativos do Python, com None no lugar de nulos (NaN não é JSON válido).
+    """
+    valores = serie.astype(object)
+    return valores.where(serie.notna(), None).tolist()
+
+
+def _codificar_dicionario(serie: pd.Series) -> Dict[str, Any]:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.cat.remove_unused_categories()
+        codigos, dicionario = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, dicionario = pd.factorize(serie, use_na_sentinel=True)
+    return {
+        "encoding": "dictionary",
+        "dictionary": _valores_json(pd.Series(dicionario)),
+        "codes": codigos.astype(np.int64).tolist()
+    }
+
+
+def _codificar_tempo(serie: pd.Series) -> Dict[str, Any]:
+    nulos = serie.isna().to_numpy()
+    # Nulos repetem o instante anterior (diferença zero) e são listados à parte
+    inteiros = serie.ffill().bfill().to_numpy().astype('datetime64[ns]').view(np.int64)
+    unidade, divisor = next(
+        (nome, fator) for nome, fator in UNIDADES_TEMPO if not np.any(inteiros % fator)
+    )
+    inteiros = inteiros // divisor
+    return {
+        "encoding": "delta",
+        "unit": unidade,
+        "start": int(inteiros[0]) if len(inteiros) else 0,
+        "deltas": np.diff(inteiros).tolist(),
+        "nulls": np.flatnonzero(nulos).tolist()
+    }
+
+
+def encode_base(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Codifica o DataFrame da base no formato colunar.
+    """
+    colunas = []
+    for nome in df.columns:
+        serie = df[nome]
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype) and serie.notna().any():
+            coluna = _codificar_tempo(serie)
+        elif isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+            coluna = _codificar_dicionario(serie)
+        else:
+            coluna = {"encoding": "plain", "values": _valores_json(serie)}
+        coluna["name"] = nome
+        coluna["dtype"] = str(serie.dtype)
+        colunas.append(coluna)
+
+    return {"format": FORMATO_BASE, "rows": len(df), "columns": colunas}
+
+
+def _decodificar_coluna(coluna: Dict[str, Any], linhas: int) -> pd.Series:
+    tipo = coluna["dtype"]
+    if coluna["encoding"] == "dictionary":
+        codigos = np.asarray(coluna["codes"], dtype=np.int64)
+        dicionario = pd.Index(coluna["dictionary"])
+        if tipo == "category":
+            return pd.Series(pd.Categorical.from_codes(codigos, categories=dicionario))
+        valores = np.asarray(coluna["dictionary"] + [None], dtype=object)[codigos]
+        return pd.Series(valores, dtype=object)
+
+    if coluna["encoding"] == "delta":
+        fator = dict(UNIDADES_TEMPO)[coluna["unit"]]
+        inteiros = np.empty(linhas, dtype=np.int64)
+        if linhas:
+            inteiros[0] = coluna["start"]
+            inteiros[1:] = coluna["deltas"]
+            inteiros = np.cumsum(inteiros) * fator
+        serie = pd.Series(inteiros.view('datetime64[ns]'))
+        serie[coluna["nulls"]] = pd.NaT
+        return serie.astype(tipo)
+
+    serie = pd.Series(coluna["values"], dtype=object)
+    try:
+        return serie.astype(tipo)
+    except (TypeError, ValueError):
+        # Inteiros com nulos, por exemplo: manter o tipo inferido
+        return pd.Series(coluna["values"])
+
+
+def decode_base(payload: Union[Dict[str, Any], List[Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    Reconstrói o DataFrame da base. Aceita também o formato antigo (lista de registros).
+    """
+    if isinstance(payload, list):
+        return pd.DataFrame(payload)
+    if payload.get("format") != FORMATO_BASE:
+        raise ValueError(f"Formato da base não suportado: {payload.get('format')}")
+
+    linhas = payload["rows"]
+    return pd.DataFrame(
+        {coluna["name"]: _decodificar_coluna(coluna, linhas) for coluna in payload["columns"]},
+        index=pd.RangeIndex(linhas)
+    )
+
+
+def decode_base_records(payload: Union[Dict[str, Any], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Reconstrói a base como lista de registros, no formato anterior à codificação colunar.
+    """
+    if isinstance(payload, list):
+        return payload
+    return decode_base(payload).to_dict(orient='records')
+
+
+@dataclass
+class BaseArtefato:
+    """
+    Base de um relatório já serializada em Parquet, aguardando a gravação no armazenamento de artefatos.
+    """
+    conteudo: bytes
+    linhas: int
+
+
+def encode_base_parquet(df: pd.DataFrame) -> BaseArtefato:
+    """
+    Serializa o DataFrame da base em Parquet compactado.
+    """
+    df = df.reset_index(drop=True)
+    # Colunas de texto com valores de tipos mistos não são aceitas pelo Parquet: gravar como texto
+    for nome in df.columns:
+        if df[nome].dtype == object and pd.api.types.infer_dtype(df[nome], skipna=True).startswith('mixed'):
+            df[nome] = df[nome].where(df[nome].isna(), df[nome].astype(str))
+
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine='pyarrow', compression=COMPRESSAO_PARQUET, index=False)
+    return BaseArtefato(buffer.getvalue(), len(df))
+
+
+def decode_base_parquet(conteudo: bytes) -> pd.DataFrame:
+    """
+    Lê a base gravada por encode_base_parquet.
+    """
+    return pd.read_parquet(io.BytesIO(conteudo), engine='pyarrow')
+
+
+def decode_base_parquet_records(conteudo: bytes) -> List[Dict[str, Any]]:
+    """
+    Lê a base gravada por encode_base_parquet como lista de registros (None no lugar de nulos).
+    """
+    df = decode_base_parquet(conteudo)
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
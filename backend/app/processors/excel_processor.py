@@ -1,12 +1,14 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from datetime import datetime, timedelta
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
 from ..core.config import settings
-from io import BytesIO
+from ..utils.uploads import ArquivoGravado, save_upload_file
+import os
 import re
+import tempfile
 
 class ExcelProcessor:
     def __init__(self):
@@ -18,9 +20,13 @@ class ExcelProcessor:
 
     async def validate_file(self, file: UploadFile) -> bool:
         """Valida o arquivo enviado"""
+        return self.validate_filename(file.filename)
+
+    def validate_filename(self, filename: str) -> bool:
+        """Valida o nome (extensão) de um arquivo enviado, inclusive por upload em partes"""
         # Verifica extensão
-        ext = file.filename.split('.')[-1].lower()
-        print(f"\n==== VALIDANDO ARQUIVO: {file.filename} (extensão: {ext}) ====")
+        ext = filename.split('.')[-1].lower()
+        print(f"\n==== VALIDANDO ARQUIVO: {filename} (extensão: {ext}) ====")
         
         if ext not in settings.ALLOWED_EXTENSIONS:
             print(f"ERRO: Formato de arquivo não suportado. Extensão: {ext}")
@@ -31,13 +37,19 @@ class ExcelProcessor:
             )
             
         # Sucesso na validação
-        print(f"Arquivo {file.filename} validado com sucesso!")
+        print(f"Arquivo {filename} validado com sucesso!")
         return True
 
-    async def process_file(self, file: UploadFile, report_type: str = None) -> Dict[str, Any]:
-        """Processa o arquivo Excel/CSV conforme o tipo de relatório"""
+    async def process_file(
+        self, file: Union[UploadFile, ArquivoGravado], report_type: str = None, filename: str = None
+    ) -> Dict[str, Any]:
+        """
+        Processa o arquivo Excel/CSV conforme o tipo de relatório.
+        Aceita um upload ou um arquivo já gravado (upload em partes finalizado), com o nome original em filename.
+        """
+        filename = filename or getattr(file, 'filename', None) or Path(file.caminho).name
         try:
-            print(f"\n==== PROCESSANDO ARQUIVO: {file.filename} (Tipo: {report_type}) ====")
+            print(f"\n==== PROCESSANDO ARQUIVO: {filename} (Tipo: {report_type}) ====")
             
             # Ler o arquivo de configuração para obter as planilhas esperadas
             config_file = Path("../config/reports.config.json")
@@ -66,16 +78,24 @@ class ExcelProcessor:
                 print(f"Erro ao carregar configurações: {str(config_error)}")
                 expected_sheets = []
             
-            # Carregar o arquivo Excel
+            # Carregar o arquivo Excel, gravado em disco em blocos (respeitando settings.MAX_UPLOAD_SIZE)
+            temp_path = None
+            xl = None
             try:
-                content = await file.read()
-                print(f"Conteúdo lido: {len(content)} bytes")
-                
-                # Usar pandas para ler cada planilha individualmente
-                import pandas as pd
-                from io import BytesIO
-                
-                excel_file = BytesIO(content)
+                if isinstance(file, ArquivoGravado):
+                    if file.tamanho > settings.MAX_UPLOAD_SIZE:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Arquivo {filename} excede o tamanho máximo de {settings.MAX_UPLOAD_SIZE} bytes"
+                        )
+                    caminho = file.caminho
+                else:
+                    ext = filename.split('.')[-1].lower()
+                    descritor, temp_path = tempfile.mkstemp(suffix=f".{ext}")
+                    os.close(descritor)
+                    caminho = Path(temp_path)
+                    arquivo = await save_upload_file(file, caminho, settings.MAX_UPLOAD_SIZE)
+                    print(f"Conteúdo gravado: {arquivo.tamanho} bytes")
                 
                 # Se temos configuração, processamos cada planilha individualmente
                 print("Processando planilhas individualmente:")
@@ -83,7 +103,7 @@ class ExcelProcessor:
                 missing_sheets = []
                 
                 # Verificar quais planilhas estão disponíveis
-                xl = pd.ExcelFile(excel_file)
+                xl = pd.ExcelFile(caminho)
                 available_sheets = xl.sheet_names
                 print(f"Planilhas disponíveis no arquivo: {available_sheets}")
                 
@@ -150,7 +170,14 @@ class ExcelProcessor:
                 import traceback
                 print(traceback.format_exc())
                 raise
+            finally:
+                if xl is not None:
+                    xl.close()
+                if temp_path is not None:
+                    Path(temp_path).unlink(missing_ok=True)
         
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"ERRO GERAL NO PROCESSAMENTO: {str(e)}")
             import traceback
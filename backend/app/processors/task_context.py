@@ -0,0 +1,136 @@
+"""
+Contexto isolado de uma tarefa de processamento de arquivos TXT.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..services.task_store import TaskStatusStore
+
+
+class TaskContext:
+    """
+    Estado de uma única tarefa: diretório temporário próprio, dados carregados e progresso.
+
+    Cada chamada de UnifiedTXTProcessor.process_files cria o seu contexto, então várias
+    tarefas podem rodar ao mesmo tempo na mesma instância do processador sem que uma
+    sobrescreva ou apague os arquivos da outra.
+
+    Com task_id e store, cada mudança de progresso é publicada no armazenamento de status,
+    de onde é lida por get_task_status e pelo stream de eventos da API.
+    """
+
+    def __init__(self, task_id: Optional[str] = None, store: Optional[TaskStatusStore] = None):
+        self.task_id = task_id
+        self.store = store
+        self._temp_dir = tempfile.TemporaryDirectory(prefix=f"tarefa_{task_id}_" if task_id else "tarefa_")
+        self.temp_path = Path(self._temp_dir.name)
+
+        # Dados carregados por tipo de arquivo: (dados, índice de partições, leitura em blocos)
+        self.dados: Dict[str, Tuple[Any, Optional[Dict[str, slice]], bool]] = {}
+
+        # Progresso da tarefa, no formato retornado por get_task_status
+        self.status: Dict[str, Any] = {
+            "status": "processing",
+            "stage": "starting",
+            "progress": 0,
+            "total_reports": 0,
+            "completed_reports": 0,
+            "reports": []
+        }
+        self._publicar()
+
+    def _publicar(self) -> None:
+        """
+        Grava o status atual no armazenamento, se a tarefa for acompanhada.
+        """
+        if self.task_id and self.store is not None:
+            self.store.set(self.task_id, self.status)
+
+    def arquivo(self, nome: str) -> Path:
+        """
+        Caminho de um arquivo dentro do diretório temporário da tarefa.
+        """
+        return self.temp_path / nome
+
+    def iniciar(self, total_reports: int) -> None:
+        """
+        Registra o total de relatórios a gerar.
+        """
+        self.status["total_reports"] = total_reports
+        self._publicar()
+
+    def definir_etapa(self, etapa: str) -> None:
+        """
+        Registra a etapa em andamento (ex.: "loading", "generating").
+        """
+        self.status["stage"] = etapa
+        self._publicar()
+
+    def registrar_codificacao(self, tipo: str, codificacao: str) -> None:
+        """
+        Registra a codificação usada para ler o arquivo de um tipo.
+        """
+        self.status.setdefault("encodings", {})[tipo] = codificacao
+        self._publicar()
+
+    def concluir_relatorio(self, relatorio: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Conta um relatório como concluído e atualiza o percentual de progresso.
+        Relatórios gerados são adicionados à lista "reports"; os pulados só contam no progresso.
+        """
+        self.status["completed_reports"] += 1
+        total = self.status["total_reports"]
+        self.status["progress"] = int((self.status["completed_reports"] / total) * 100) if total else 100
+        if relatorio is not None:
+            self.status["reports"].append(relatorio)
+        self._publicar()
+
+    def confirmar_relatorios(self, gravados: Dict[Tuple[str, str], Any]) -> None:
+        """
+        Marca como "success", com o id retornado, os relatórios calculados que foram gravados.
+        gravados associa (tipo, frente) ao id do relatório.
+        """
+        for relatorio in self.status["reports"]:
+            chave = (relatorio.get("type"), relatorio.get("frente"))
+            if chave in gravados:
+                relatorio["status"] = "success"
+                relatorio["id"] = gravados[chave]
+        self._publicar()
+
+    def finalizar(self, resultados: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Marca a tarefa como concluída, guardando os resultados (ids dos relatórios gravados).
+        """
+        self.status["status"] = "completed"
+        self.status["stage"] = "completed"
+        self.status["progress"] = 100
+        if resultados is not None:
+            self.status["results"] = resultados
+        self._publicar()
+
+    def falhar(self, erro: Exception) -> None:
+        """
+        Marca a tarefa como falha, mantendo apenas o status e a mensagem de erro.
+        """
+        self.status.clear()
+        self.status.update({
+            "status": "error",
+            "stage": "error",
+            "error": str(erro)
+        })
+        self._publicar()
+
+    def cleanup(self) -> None:
+        """
+        Remove o diretório temporário da tarefa e libera os dados carregados.
+        """
+        self.dados.clear()
+        self._temp_dir.cleanup()
+
+    def __enter__(self) -> "TaskContext":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cleanup()
@@ -0,0 +1,117 @@
+"""
+Cache em disco da telemetria já tratada pelos processadores de TXT.
+As entradas são endereçadas pelo conteúdo do arquivo e gravadas em formato colunar (Feather).
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Tamanho dos blocos lidos ao calcular o hash do arquivo
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+def hash_file(caminho_arquivo: str) -> str:
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo, lendo-o em blocos.
+    """
+    sha256 = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+class TelemetryCache:
+    """
+    Cache LRU limitado por tamanho de DataFrames tratados, gravados em Feather.
+
+    A chave combina o hash do arquivo, o tipo de equipamento, a versão do parser e as colunas
+    lidas, então uma mudança no tratamento ou na projeção nunca reaproveita uma entrada antiga.
+    O horário de modificação de cada entrada marca o último acesso e define a ordem de remoção.
+    """
+
+    def __init__(self, diretorio: Path, tamanho_maximo: int):
+        self.diretorio = Path(diretorio)
+        self.tamanho_maximo = tamanho_maximo
+
+    def build_key(
+        self, hash_arquivo: str, tipo: str, versao_parser: str, colunas: Optional[Iterable[str]] = None
+    ) -> str:
+        """
+        Monta a chave da entrada a partir do conteúdo do arquivo e dos parâmetros do tratamento.
+        """
+        projecao = ','.join(sorted(colunas)) if colunas is not None else '*'
+        assinatura = f"{hash_arquivo}|{tipo}|{versao_parser}|{projecao}"
+        return hashlib.sha256(assinatura.encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.feather"
+
+    def get(self, chave: str) -> Optional[pd.DataFrame]:
+        """
+        Retorna o DataFrame armazenado na chave, ou None se não houver entrada válida.
+        """
+        caminho = self._caminho(chave)
+        if not caminho.exists():
+            return None
+
+        try:
+            df = pd.read_feather(caminho)
+        except Exception as e:
+            # Entrada corrompida ou removida durante a leitura: descartar e tratar como ausente
+            print(f"Erro ao ler a entrada {caminho.name} do cache de telemetria: {str(e)}")
+            caminho.unlink(missing_ok=True)
+            return None
+
+        # Marcar o acesso para a ordem LRU
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        return df
+
+    def put(self, chave: str, df: pd.DataFrame) -> None:
+        """
+        Grava o DataFrame na chave e remove as entradas menos usadas se o limite for excedido.
+        Falhas de gravação apenas são registradas; o cache nunca interrompe o processamento.
+        """
+        try:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+
+            # Gravar em arquivo temporário e renomear, para nunca expor uma entrada incompleta
+            descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+            os.close(descritor)
+            try:
+                df.reset_index(drop=True).to_feather(temporario)
+                os.replace(temporario, self._caminho(chave))
+            finally:
+                if os.path.exists(temporario):
+                    os.unlink(temporario)
+
+            self._remover_excedente()
+        except Exception as e:
+            print(f"Erro ao gravar a entrada {chave} no cache de telemetria: {str(e)}")
+
+    def _remover_excedente(self) -> None:
+        """
+        Remove as entradas acessadas há mais tempo até o cache caber em tamanho_maximo.
+        """
+        entradas = []
+        for caminho in self.diretorio.glob('*.feather'):
+            try:
+                estado = caminho.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas, key=lambda entrada: entrada[0]):
+            if total <= self.tamanho_maximo:
+                break
+            caminho.unlink(missing_ok=True)
+            total -= tamanho
@@ -5,21 +5,63 @@ Gera múltiplos relatórios a partir de arquivos TXT de entrada.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.feather as feather
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 from datetime import datetime
-from fastapi import UploadFile, HTTPException, BackgroundTasks
+from fastapi import UploadFile, HTTPException
 import io
+import codecs
 import os
-import tempfile
 from pathlib import Path
 import json
+import re
 import asyncio
+import uuid
 from ..core.config import settings
-from ..database.supabase import supabase_client
+from ..core.workers import run_cpu, run_io
+from ..database.gateway import get_persistence_gateway, json_bytes
+from ..utils.uploads import ArquivoGravado, save_upload_file
+from ..utils.compression import detect_compression, open_decompressed, uncompressed_size
+from .telemetry_cache import TelemetryCache, hash_file
+from .task_context import TaskContext
+from .base_encoding import FORMATO_BASE_PARQUET, BaseArtefato, encode_base, encode_base_parquet
+from ..services.task_store import get_task_store
+from ..services.artifact_storage import get_artifact_storage
+from ..services.report_batch import ReportBatchWriter
+from ..services.report_outbox import get_outbox_flusher, get_report_outbox
+
+# Versão do tratamento dos TXT; incrementar ao alterar o resultado do parser invalida o cache de telemetria
+VERSAO_PARSER = "2"
 
 # Constantes comuns
 OPERADORES_EXCLUIR = ["9999 - TROCA DE TURNO"]
 
+# RPM mínimo para considerar o motor ligado em uma parada
+RPM_MINIMO = 300
+
+# Maior intervalo entre registros consecutivos considerado válido (em horas)
+LIMITE_DIFERENCA_HORA = 0.50
+
+# Bytes lidos do início do arquivo para detectar a codificação
+TAMANHO_AMOSTRA_CODIFICACAO = 64 * 1024
+
+# Coluna com a frente normalizada de cada registro, calculada na leitura
+COLUNA_CHAVE_FRENTE = 'Chave Frente'
+
+# Número da frente em textos como "Frente 4", "Frente4", "FRENTE 4 - NOME" ou no id "frente4" da configuração
+PADRAO_FRENTE = re.compile(r'frente\s*(\d+)', re.IGNORECASE)
+
+# Coluna que preserva os rótulos do índice na telemetria compartilhada com os workers
+COLUNA_INDICE_ORIGINAL = '__indice__'
+
+# Tabelas compartilhadas mantidas abertas por worker
+MAXIMO_TABELAS_COMPARTILHADAS = 4
+
+# Chaves de agrupamento da Base Calculo
+CHAVES_BASE_CALCULO = ['Equipamento', 'Grupo Equipamento/Frente', 'Operador']
+CHAVES_OPERADOR = ['Operador', 'Grupo Equipamento/Frente']
+
 # Constantes para colhedoras
 COLUNAS_REMOVER_COLHEDORAS = [
     'Justificativa Corte Base Desligado',
@@ -62,6 +104,55 @@ COLUNAS_DESEJADAS_TRANSBORDOS = [
     'Horas Produtivas', 'GPS'
 ]
 
+# Colunas do TXT usadas nos cálculos da Base Calculo, das tabelas derivadas e do filtro por frente.
+# Quando os registros brutos vão para a seção "base", lê-se também COLUNAS_DESEJADAS_*
+COLUNAS_CALCULO_COLHEDORAS = [
+    'Data', 'Hora', 'Data/Hora', 'Equipamento', 'Operador', 'Grupo Equipamento/Frente',
+    'Codigo Frente (digitada)', 'Grupo Operacao', 'Estado', 'Velocidade', 'RPM Motor',
+    'Esteira Ligada', 'Pressao de Corte', 'RTK (Piloto Automatico)', 'Field Cruiser',
+    'Motor Ligado', 'Diferença_Hora', 'Horas Produtivas', 'Parada com Motor Ligado'
+]
+
+COLUNAS_CALCULO_TRANSBORDOS = [
+    'Data', 'Hora', 'Data/Hora', 'Equipamento', 'Operador', 'Grupo Equipamento/Frente',
+    'Codigo Frente (digitada)', 'Grupo Operacao', 'Velocidade', 'RPM Motor',
+    'RTK (Piloto Automatico)', 'Motor Ligado', 'Codigo da Operacao', 'Operacao',
+    'Diferença_Hora', 'Horas Produtivas', 'Parado Com Motor Ligado', 'GPS'
+]
+
+# Esquema de tipos aplicado na leitura dos TXT: textos repetitivos como categoria e
+# sensores de valores inteiros como float32 (sensores com casas decimais seguem em float64)
+TIPOS_LEITURA_COMUNS = {
+    'Descricao Equipamento': 'category',
+    'Estado': 'category',
+    'Estado Operacional': 'category',
+    'Grupo Equipamento/Frente': 'category',
+    'Grupo Operacao': 'category',
+    'Operacao': 'category',
+    'Operador': 'category',
+    'Fazenda': 'category',
+    'RPM Motor': 'float32'
+}
+
+TIPOS_LEITURA_COLHEDORAS = {
+    **TIPOS_LEITURA_COMUNS,
+    'Corte Base Automatico/Manual': 'category',
+    'Pressao de Corte': 'float32',
+    'RPM Extrator': 'float32'
+}
+
+TIPOS_LEITURA_TRANSBORDOS = dict(TIPOS_LEITURA_COMUNS)
+
+# Identificadores numéricos convertidos para categoria após a leitura, mantendo o tipo dos valores
+COLUNAS_CATEGORIA_NUMERICA = ['Equipamento', 'Talhao']
+
+# Colunas binárias (0/1), armazenadas como int8
+COLUNAS_FLAG_COLHEDORAS = [
+    'Esteira Ligada', 'Motor Ligado', 'Field Cruiser', 'RTK (Piloto Automatico)', 'Implemento Ligado'
+]
+
+COLUNAS_FLAG_TRANSBORDOS = ['Motor Ligado']
+
 class UnifiedTXTProcessor:
     """
     Processador unificado para arquivos TXT de colhedoras e transbordos.
@@ -70,57 +161,51 @@ class UnifiedTXTProcessor:
     
     def __init__(self):
         # Inicialização das propriedades
-        self.task_status = {}
-        self.processing_results = {}
-        self.temp_dir = None
+        # Status e resultados das tarefas, com expiração e limite de entradas
+        self.task_store = get_task_store()
+        self._tabelas_compartilhadas = {}
+        self.cache_telemetria = (
+            TelemetryCache(settings.TXT_CACHE_DIR, settings.TXT_CACHE_MAX_SIZE)
+            if settings.TXT_CACHE_ENABLED else None
+        )
     
     async def process_files(
         self,
-        colhedora_file: Optional[UploadFile] = None,
-        transbordo_file: Optional[UploadFile] = None,
+        colhedora_file: Optional[Union[UploadFile, Path]] = None,
+        transbordo_file: Optional[Union[UploadFile, Path]] = None,
         frentes: List[str] = [],
         report_types: List[str] = [],
         report_date: str = None,
         is_teste: bool = False,
-        task_id: str = None
+        task_id: str = None,
+        streaming: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Processa os arquivos TXT e gera múltiplos relatórios com base nas seleções.
         
         Args:
-            colhedora_file: Arquivo TXT de colhedoras
-            transbordo_file: Arquivo TXT de transbordos
+            colhedora_file: Arquivo TXT de colhedoras (upload ou caminho de um arquivo já gravado)
+            transbordo_file: Arquivo TXT de transbordos (upload ou caminho de um arquivo já gravado)
             frentes: Lista de frentes selecionadas
             report_types: Lista de tipos de relatórios selecionados
             report_date: Data do relatório
             is_teste: Indica se é um relatório de teste
             task_id: ID da tarefa para acompanhamento
+            streaming: Força (True) ou desativa (False) a leitura em blocos; se None,
+                usa blocos para arquivos a partir de settings.TXT_STREAMING_MIN_SIZE
             
         Returns:
             Dict com os resultados do processamento
         """
+        # Cada tarefa tem o seu próprio contexto (diretório temporário, dados e progresso)
+        contexto = TaskContext(task_id, self.task_store)
+        
         try:
             print(f"Iniciando processamento unificado. Task ID: {task_id}")
             
-            # Criar diretório temporário para os arquivos
-            self.temp_dir = tempfile.TemporaryDirectory()
-            temp_path = Path(self.temp_dir.name)
-            
-            # Inicializar o status da tarefa
-            if task_id:
-                self.task_status[task_id] = {
-                    "status": "processing",
-                    "progress": 0,
-                    "total_reports": 0,
-                    "completed_reports": 0,
-                    "reports": []
-                }
-            
             # Calcular o total de relatórios a serem gerados
             total_reports = len(frentes) * len(report_types)
-            
-            if task_id:
-                self.task_status[task_id]["total_reports"] = total_reports
+            contexto.iniciar(total_reports)
             
             # Validar que temos arquivos e seleções
             if not colhedora_file and not transbordo_file:
@@ -135,24 +220,25 @@ class UnifiedTXTProcessor:
             if not report_date:
                 raise ValueError("Informe a data do relatório")
             
-            # Processar e salvar os arquivos TXT
-            colhedora_data = None
-            if colhedora_file:
-                colhedora_path = temp_path / f"colhedora_{task_id}.txt"
-                await self._save_upload_file(colhedora_file, colhedora_path)
-                colhedora_data = await self._process_colhedora_file(str(colhedora_path))
-            
-            transbordo_data = None
-            if transbordo_file:
-                transbordo_path = temp_path / f"transbordo_{task_id}.txt"
-                await self._save_upload_file(transbordo_file, transbordo_path)
-                transbordo_data = await self._process_transbordo_file(str(transbordo_path))
+            # Processar e salvar os arquivos TXT, apenas se algum relatório selecionado os utiliza.
+            # Os dois arquivos são carregados ao mesmo tempo
+            usa_colhedora = colhedora_file and any("colheita" in report_type for report_type in report_types)
+            usa_transbordo = transbordo_file and any("transbordo" in report_type for report_type in report_types)
+            contexto.definir_etapa("loading")
+            await asyncio.gather(
+                self._carregar_arquivo(
+                    colhedora_file if usa_colhedora else None, 'colhedora', contexto, frentes, streaming
+                ),
+                self._carregar_arquivo(
+                    transbordo_file if usa_transbordo else None, 'transbordo', contexto, frentes, streaming
+                )
+            )
             
             # Dicionário para armazenar os resultados por relatório
             results = {}
             
-            # Processar cada combinação de frente e tipo de relatório
-            completed_reports = 0
+            # Montar a lista de relatórios (frente x tipo) a gerar
+            trabalhos = []
             
             for frente in frentes:
                 for report_type in report_types:
@@ -161,340 +247,770 @@ class UnifiedTXTProcessor:
                     needs_transbordo = "transbordo" in report_type
                     
                     # Pular se não temos o arquivo necessário
-                    if (needs_colhedora and not colhedora_data) or (needs_transbordo and not transbordo_data):
-                        completed_reports += 1
-                        if task_id:
-                            self.task_status[task_id]["completed_reports"] = completed_reports
-                            self.task_status[task_id]["progress"] = int((completed_reports / total_reports) * 100)
+                    if (needs_colhedora and contexto.dados['colhedora'][0] is None) or \
+                            (needs_transbordo and contexto.dados['transbordo'][0] is None):
+                        contexto.concluir_relatorio()
                         continue
                     
-                    # Gerar chave única para este relatório
-                    report_key = f"{report_type}_{frente}"
-                    
-                    # Nome descritivo para o relatório
-                    report_name = f"Relatório {report_type.replace('_', ' ').title()} Frente {frente}"
-                    
+                    trabalhos.append((frente, report_type))
+            
+            contexto.definir_etapa("generating")
+            
+            # Até settings.REPORTS_MAX_CONCURRENCY relatórios são calculados ao mesmo tempo. Cada
+            # relatório pronto já grava o artefato da base (até settings.PERSIST_MAX_CONCURRENCY
+            # ao mesmo tempo) enquanto os demais são calculados; só a inserção em lote
+            # (ver _save_reports_to_supabase) espera o conjunto
+            semaforo_calculo = asyncio.Semaphore(max(1, settings.REPORTS_MAX_CONCURRENCY))
+            semaforo_gravacao = asyncio.Semaphore(max(1, settings.PERSIST_MAX_CONCURRENCY))
+            preparos: List[asyncio.Future] = []
+            
+            async def gerar_relatorio(frente: str, report_type: str) -> Optional[Tuple[str, Dict[str, Any], bytes]]:
+                # Nome descritivo para o relatório
+                report_name = f"Relatório {report_type.replace('_', ' ').title()} Frente {frente}"
+                
+                async with semaforo_calculo:
                     print(f"Processando: {report_name}")
                     
                     # Filtrar e processar os dados conforme o tipo
-                    if needs_colhedora and colhedora_data is not None:
-                        # Filtrar para a frente específica
-                        frente_data = self._filter_colhedora_by_frente(colhedora_data, frente)
-                        
-                        # Gerar métricas e dados do relatório
-                        report_data = await self._generate_colheita_report(frente_data, frente, report_type)
-                        
-                        # Salvar no Supabase
-                        report_id = await self._save_report_to_supabase(
-                            report_type, report_date, frente, report_data, is_teste
+                    report_data = None
+                    if "colheita" in report_type:
+                        report_data = await self._gerar_relatorio_da_frente(
+                            'colheita', *contexto.dados['colhedora'], frente, report_type
                         )
-                        
-                        # Guardar resultado
-                        results[report_key] = {
-                            "id": report_id,
-                            "name": report_name,
-                            "status": "success"
-                        }
-                        
-                    elif needs_transbordo and transbordo_data is not None:
-                        # Filtrar para a frente específica
-                        frente_data = self._filter_transbordo_by_frente(transbordo_data, frente)
-                        
-                        # Gerar métricas e dados do relatório
-                        report_data = await self._generate_transbordo_report(frente_data, frente, report_type)
-                        
-                        # Salvar no Supabase
-                        report_id = await self._save_report_to_supabase(
-                            report_type, report_date, frente, report_data, is_teste
+                    elif "transbordo" in report_type:
+                        report_data = await self._gerar_relatorio_da_frente(
+                            'transbordo', *contexto.dados['transbordo'], frente, report_type
                         )
-                        
-                        # Guardar resultado
-                        results[report_key] = {
-                            "id": report_id,
-                            "name": report_name,
-                            "status": "success"
-                        }
-                    
-                    # Atualizar progresso
-                    completed_reports += 1
-                    if task_id:
-                        self.task_status[task_id]["completed_reports"] = completed_reports
-                        self.task_status[task_id]["progress"] = int((completed_reports / total_reports) * 100)
-                        self.task_status[task_id]["reports"].append({
-                            "name": report_name,
-                            "status": "success",
-                            "type": report_type,
-                            "frente": frente
-                        })
-            
-            # Finalizar o status da tarefa
-            if task_id:
-                self.task_status[task_id]["status"] = "completed"
-                self.task_status[task_id]["progress"] = 100
                 
-            # Guardar os resultados para referência futura
-            if task_id:
-                self.processing_results[task_id] = results
+                # Atualizar progresso à medida que cada relatório termina. "computed" passa a
+                # "success" quando a gravação retorna o id (contexto.confirmar_relatorios)
+                contexto.concluir_relatorio({
+                    "name": report_name,
+                    "status": "computed" if report_data is not None else "skipped",
+                    "type": report_type,
+                    "frente": frente
+                })
+                if report_data is None:
+                    return None
+                
+                async with semaforo_gravacao:
+                    preparo = asyncio.ensure_future(self._preparar_registro_relatorio(
+                        report_type, report_date, frente, report_data, is_teste
+                    ))
+                    preparos.append(preparo)
+                    # Protegido do cancelamento: se a tarefa falhar, o artefato gravado precisa
+                    # ser conhecido para ser removido
+                    table_name, supabase_data = await asyncio.shield(preparo)
+                # Serializado uma única vez, fora do event loop: o mesmo JSON mede os lotes e
+                # forma o corpo da inserção
+                return table_name, supabase_data, await run_io(json_bytes, supabase_data)
+            
+            tarefas = [asyncio.create_task(gerar_relatorio(frente, report_type)) for frente, report_type in trabalhos]
+            try:
+                registros = await asyncio.gather(*tarefas)
+            except Exception:
+                # Uma falha interrompe a tarefa inteira: cancelar os relatórios ainda pendentes e
+                # remover os artefatos da base já gravados pelos concluídos
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                await asyncio.gather(*tarefas, *preparos, return_exceptions=True)
+                await self._remover_artefatos_nao_gravados([
+                    preparo.result()[1] for preparo in preparos
+                    if not preparo.cancelled() and preparo.exception() is None
+                ])
+                raise
+            
+            # Salvar no Supabase, em lote, todos os relatórios gerados
+            gerados = [
+                (frente, report_type, registro)
+                for (frente, report_type), registro in zip(trabalhos, registros)
+                if registro is not None
+            ]
+            contexto.definir_etapa("saving")
+            report_ids = await self._save_reports_to_supabase([registro for _, _, registro in gerados], task_id)
+            contexto.confirmar_relatorios({
+                (report_type, frente): report_id
+                for (frente, report_type, _), report_id in zip(gerados, report_ids)
+            })
+            
+            # Guardar os resultados na ordem de frentes e tipos selecionados
+            for (frente, report_type, _), report_id in zip(gerados, report_ids):
+                results[f"{report_type}_{frente}"] = {
+                    "id": report_id,
+                    "name": f"Relatório {report_type.replace('_', ' ').title()} Frente {frente}",
+                    "status": "success",
+                    # No modo outbox o id é provisório até o envio ao Supabase
+                    "persisted": settings.PERSIST_MODE != "outbox"
+                }
+            
+            # Finalizar o status da tarefa, guardando os resultados para referência futura
+            contexto.finalizar(results)
                 
             return results
             
         except Exception as e:
             print(f"Erro no processamento unificado: {str(e)}")
-            if task_id:
-                self.task_status[task_id] = {
-                    "status": "error",
-                    "error": str(e)
-                }
+            contexto.falhar(e)
             raise e
         finally:
-            # Limpar o diretório temporário
-            if self.temp_dir:
-                self.temp_dir.cleanup()
+            # Limpar o diretório temporário da tarefa
+            contexto.cleanup()
     
     def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """
         Retorna o status atual de uma tarefa de processamento.
         """
-        return self.task_status.get(task_id, {"status": "not_found"})
+        return self.task_store.get(task_id) or {"status": "not_found"}
 
-    async def _save_upload_file(self, upload_file: UploadFile, destination: Path) -> None:
+    async def _save_upload_file(self, upload_file: UploadFile, destination: Path) -> ArquivoGravado:
         """
-        Salva um arquivo de upload em um destino específico.
+        Salva um arquivo de upload em um destino específico, em blocos, respeitando
+        settings.MAX_TXT_UPLOAD_SIZE. Retorna o tamanho e o hash do conteúdo.
         """
         try:
-            # Ler o conteúdo do arquivo
-            content = await upload_file.read()
-            
-            # Escrever no destino
-            with open(str(destination), 'wb') as f:
-                f.write(content)
-                
-            print(f"Arquivo salvo em: {destination}")
+            arquivo = await save_upload_file(upload_file, destination, settings.MAX_TXT_UPLOAD_SIZE)
+            print(f"Arquivo salvo em: {destination} ({arquivo.tamanho} bytes)")
+            return arquivo
         except Exception as e:
             print(f"Erro ao salvar arquivo: {str(e)}")
             raise e
 
     # Funções comuns
-    def _calcular_porcentagem(self, numerador, denominador, precisao=4):
-        """Calcula porcentagem como decimal (0-1) evitando divisão por zero."""
-        if denominador > 0:
-            return round((numerador / denominador), precisao)
-        return 0.0
+    def _calcular_porcentagem_serie(self, numerador: pd.Series, denominador: pd.Series, precisao=4) -> pd.Series:
+        """Calcula porcentagens como decimal (0-1) para colunas inteiras, evitando divisão por zero."""
+        denominador_valido = denominador.where(denominador > 0)
+        return (numerador / denominador_valido).round(precisao).fillna(0.0)
+    
+    def _somar_horas_por_grupo(
+        self, df: pd.DataFrame, chaves: List[str], metricas: Dict[str, Optional[pd.Series]]
+    ) -> pd.DataFrame:
+        """
+        Soma as horas de várias métricas em uma única passada agrupada.
+        
+        Cada métrica é uma máscara booleana (soma Diferença_Hora onde verdadeira),
+        uma série numérica (somada diretamente) ou None (soma Diferença_Hora inteira).
+        Os grupos mantêm a ordem da primeira ocorrência nos dados.
+        """
+        horas = df['Diferença_Hora']
+        colunas = {}
+        
+        for nome, metrica in metricas.items():
+            if metrica is None:
+                colunas[nome] = horas
+            elif metrica.dtype == bool:
+                colunas[nome] = horas.where(metrica, 0)
+            else:
+                colunas[nome] = metrica
+        
+        dados = pd.DataFrame(colunas, index=df.index)
+        for chave in chaves:
+            dados[chave] = df[chave]
+        
+        agregado = dados.groupby(chaves, sort=False, dropna=False, observed=True)[list(metricas)].sum()
+        return agregado.reset_index()
+    
+    def _combinar_agregados(
+        self, acumulado: Optional[pd.DataFrame], parcial: pd.DataFrame, chaves: List[str]
+    ) -> pd.DataFrame:
+        """
+        Combina dois agregados parciais com as mesmas chaves: as somas são somadas e
+        a posição do primeiro registro válido fica com o menor valor.
+        """
+        if acumulado is None:
+            return parcial
+        
+        colunas = [col for col in parcial.columns if col not in chaves]
+        funcoes = {col: 'min' if col == 'Primeiro Registro Valido' else 'sum' for col in colunas}
+        
+        combinado = pd.concat([acumulado, parcial], ignore_index=True)
+        return combinado.groupby(chaves, sort=False, dropna=False, observed=True).agg(funcoes).reset_index()
+    
+    def _calcular_diferenca_hora(
+        self, df: pd.DataFrame, ultimos_instantes: Optional[Dict[Any, float]] = None
+    ) -> pd.Series:
+        """
+        Calcula Diferença_Hora (em horas) entre registros consecutivos de cada equipamento.
+        
+        Monta o instante de cada registro a partir de Data + Hora e calcula as diferenças
+        dentro da sequência ordenada de cada equipamento, sem vazar intervalos entre
+        equipamentos. Sem Data, mantém a ordem do arquivo e trata a virada da meia-noite.
+        Intervalos ausentes, negativos ou acima de LIMITE_DIFERENCA_HORA viram 0.
+        
+        Na leitura em blocos, ultimos_instantes guarda o último instante de cada
+        equipamento entre um bloco e o seguinte e é atualizado aqui.
+        """
+        if 'Diferença_Hora' in df.columns and not df['Diferença_Hora'].isna().any():
+            horas = pd.to_numeric(df['Diferença_Hora'].astype(str).str.strip(), errors='coerce').fillna(0)
+            return horas.where(horas <= LIMITE_DIFERENCA_HORA, 0).round(4)
+        
+        hora = pd.to_datetime(df['Hora'], format='%H:%M:%S', errors='coerce')
+        segundos = (hora - hora.dt.normalize()).dt.total_seconds().to_numpy(dtype=float)
+        
+        tem_data = 'Data' in df.columns
+        if tem_data:
+            data = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
+            dias = (data - pd.Timestamp(0)).dt.days.to_numpy(dtype=float)
+            tem_data = not np.isnan(dias).all()
+        
+        codigos, equipamentos = pd.factorize(df['Equipamento'])
+        if tem_data:
+            segundos = dias * 86400 + segundos
+            ordem = np.lexsort((segundos, codigos))
+        else:
+            ordem = np.argsort(codigos, kind='stable')
+        
+        instantes = segundos[ordem]
+        codigos = codigos[ordem]
+        
+        delta = np.empty(len(instantes))
+        delta[1:] = np.diff(instantes)
+        
+        # O primeiro registro de cada equipamento não tem intervalo anterior no bloco
+        inicio = np.ones(len(codigos), dtype=bool)
+        inicio[1:] = codigos[1:] != codigos[:-1]
+        delta[inicio] = np.nan
+        
+        if ultimos_instantes is not None:
+            # Continuar a sequência de cada equipamento a partir do bloco anterior
+            for posicao in np.flatnonzero(inicio):
+                codigo = codigos[posicao]
+                if codigo >= 0 and equipamentos[codigo] in ultimos_instantes:
+                    delta[posicao] = instantes[posicao] - ultimos_instantes[equipamentos[codigo]]
+            
+            ultimos = pd.Series(instantes).groupby(codigos, sort=False).last()
+            for codigo, instante in ultimos.items():
+                if codigo >= 0 and not np.isnan(instante):
+                    ultimos_instantes[equipamentos[codigo]] = instante
+        
+        if not tem_data:
+            # Sem a data, um intervalo negativo indica a virada da meia-noite
+            delta = np.where(delta < 0, delta + 86400, delta)
+        
+        delta = delta / 3600
+        validos = (delta >= 0) & (delta <= LIMITE_DIFERENCA_HORA)
+        delta = np.where(validos, np.round(delta, 4), 0.0)
+        
+        resultado = np.empty(len(delta))
+        resultado[ordem] = delta
+        return pd.Series(resultado, index=df.index)
+    
+    def _calcular_colunas_derivadas(self, df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+        """
+        Calcula as colunas derivadas da telemetria com máscaras vetorizadas.
+        
+        Comum a colhedoras e transbordos: parada com motor ligado e Horas Produtivas.
+        Para transbordos também calcula a coluna GPS.
+        """
+        coluna_parado = 'Parada com Motor Ligado' if tipo == 'colhedora' else 'Parado Com Motor Ligado'
+        if coluna_parado not in df.columns:
+            df[coluna_parado] = ((df['Velocidade'] == 0) & 
+                                 (df['RPM Motor'] >= RPM_MINIMO)).astype('int8')
+        
+        produtiva = df['Grupo Operacao'] == 'Produtiva'
+        
+        # Verificar se Horas Produtivas já existe
+        if 'Horas Produtivas' not in df.columns or df['Horas Produtivas'].isna().any():
+            df['Horas Produtivas'] = df['Diferença_Hora'].round(4).where(produtiva, 0)
+        else:
+            df['Horas Produtivas'] = pd.to_numeric(df['Horas Produtivas'].astype(str).str.strip(), errors='coerce')
+            df['Horas Produtivas'] = df['Horas Produtivas'].fillna(0)
+        
+        # Coluna de GPS - Para transbordos
+        if tipo == 'transbordo':
+            if 'RTK (Piloto Automatico)' in df.columns:
+                gps = (df['RTK (Piloto Automatico)'] == 1) & (df['Velocidade'] > 0) & produtiva
+                df['GPS'] = df['Diferença_Hora'].where(gps, 0)
+            else:
+                df['GPS'] = 0
+        
+        return df
+    
+    def _detectar_codificacao(self, caminho_arquivo: str, compressao: Optional[str] = None) -> str:
+        """
+        Detecta a codificação do arquivo a partir de uma amostra dos primeiros bytes
+        (do conteúdo descompactado, se o arquivo for compactado).
+        
+        Verifica BOM, depois tenta decodificar a amostra como UTF-8; caso falhe,
+        usa cp1252 (formato das exportações) ou latin1 se houver bytes sem mapeamento.
+        """
+        with open_decompressed(caminho_arquivo, compressao) as f:
+            amostra = f.read(TAMANHO_AMOSTRA_CODIFICACAO)
+        
+        if amostra.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if amostra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        
+        try:
+            # Decodificação incremental: um caractere cortado no fim da amostra não é erro
+            codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
+        try:
+            amostra.decode('cp1252')
+            return 'cp1252'
+        except UnicodeDecodeError:
+            return 'latin1'
     
-    # Funções para processamento de colhedoras
-    async def _process_colhedora_file(self, caminho_arquivo: str) -> pd.DataFrame:
+    def _ler_arquivo_txt(
+        self, caminho_arquivo: str, tipo: str, colunas: Optional[Set[str]] = None
+    ) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
         """
-        Processa o arquivo TXT de colhedoras.
-        Adaptado de processamento_unificado.py
+        Lê e trata um arquivo TXT de colhedoras ou transbordos (etapa síncrona, executada no pool de CPU).
+        Arquivos compactados (.gz, .zip ou .zst) são descompactados em fluxo durante a leitura.
+        Retorna o DataFrame tratado (None em caso de erro) e a codificação usada na leitura.
         """
-        # Lista de codificações para tentar
-        codificacoes = ['utf-8', 'latin1', 'ISO-8859-1', 'cp1252']
+        preparar = self._preparar_dados_colhedora if tipo == 'colhedora' else self._preparar_dados_transbordo
         
-        for codificacao in codificacoes:
+        # Detectar a compressão e a codificação a partir de uma amostra e ler o arquivo uma única vez
+        compressao = detect_compression(caminho_arquivo)
+        codificacao = None
+        
+        try:
+            codificacao = self._detectar_codificacao(caminho_arquivo, compressao)
+            opcoes = self._opcoes_leitura(tipo, colunas, compressao)
             try:
-                # Leitura do arquivo
-                df = pd.read_csv(caminho_arquivo, sep=';', encoding=codificacao)
-                print(f"Arquivo de colhedora lido com sucesso usando {codificacao}! Total de linhas: {len(df)}")
-                
-                # Verificar se o DataFrame está vazio
-                if len(df) == 0:
-                    print(f"O arquivo {caminho_arquivo} contém apenas cabeçalhos sem dados.")
-                    for col in COLUNAS_DESEJADAS_COLHEDORAS:
-                        if col not in df.columns:
-                            df[col] = np.nan
-                    colunas_existentes = [col for col in COLUNAS_DESEJADAS_COLHEDORAS if col in df.columns]
-                    colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_COLHEDORAS]
-                    return df[colunas_existentes + colunas_extras]
-                
-                # Limpeza de espaços extras nos nomes das colunas
-                df.columns = df.columns.str.strip()
-                
-                # Verificar se 'Data/Hora' existe e processá-la
-                if 'Data/Hora' in df.columns:
-                    df[['Data', 'Hora']] = df['Data/Hora'].str.split(' ', expand=True)
-                    df = df.drop(columns=['Data/Hora'])
-                
-                # Conversão e cálculo de diferenças de hora
-                df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S', errors='coerce')
-                
-                # Calcular a diferença de hora em segundos para maior precisão e depois converter para horas
-                if 'Diferença_Hora' not in df.columns or df['Diferença_Hora'].isna().any():
-                    df['Diferença_Hora'] = df['Hora'].diff().dt.total_seconds() / 3600
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if pd.isna(x) or x < 0 else x)
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if x > 0.50 else round(x, 4))
-                else:
-                    df['Diferença_Hora'] = pd.to_numeric(df['Diferença_Hora'].astype(str).str.strip(), errors='coerce')
-                    df['Diferença_Hora'] = df['Diferença_Hora'].fillna(0)
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if x > 0.50 else round(x, 4))
-                
-                # Cálculos adicionais
-                RPM_MINIMO = 300
-                if 'Parada com Motor Ligado' not in df.columns:
-                    df['Parada com Motor Ligado'] = ((df['Velocidade'] == 0) & 
-                                                  (df['RPM Motor'] >= RPM_MINIMO)).astype(int)
-                
-                # Verificar se Horas Produtivas já existe
-                if 'Horas Produtivas' not in df.columns or df['Horas Produtivas'].isna().any():
-                    df['Horas Produtivas'] = df.apply(
-                        lambda row: round(row['Diferença_Hora'], 4) if row['Grupo Operacao'] == 'Produtiva' else 0,
-                        axis=1
-                    )
-                else:
-                    df['Horas Produtivas'] = pd.to_numeric(df['Horas Produtivas'].astype(str).str.strip(), errors='coerce')
-                    df['Horas Produtivas'] = df['Horas Produtivas'].fillna(0)
-                
-                # Conversão de colunas binárias para valores numéricos
-                for col in ['Esteira Ligada', 'Motor Ligado', 'Field Cruiser', 'RTK (Piloto Automatico)', 'Implemento Ligado']:
-                    if col in df.columns:
-                        if df[col].dtype == 'object':
-                            df[col] = df[col].replace({'LIGADO': 1, 'DESLIGADO': 0})
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-                
-                # Limpeza e organização das colunas
-                df = df.drop(columns=COLUNAS_REMOVER_COLHEDORAS, errors='ignore')
-                
-                # Garantir que todas as colunas desejadas existam
-                for col in COLUNAS_DESEJADAS_COLHEDORAS:
-                    if col not in df.columns:
-                        df[col] = np.nan
-                
-                # Reorganizar as colunas na ordem desejada
-                colunas_existentes = [col for col in COLUNAS_DESEJADAS_COLHEDORAS if col in df.columns]
-                colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_COLHEDORAS]
-                df = df[colunas_existentes + colunas_extras]
-                
-                return df
-                
+                df = pd.read_csv(caminho_arquivo, encoding=codificacao, **opcoes)
             except UnicodeDecodeError:
-                print(f"Tentativa com codificação {codificacao} falhou, tentando próxima codificação...")
-                continue
-            except Exception as e:
-                print(f"Erro ao processar o arquivo com codificação {codificacao}: {str(e)}")
-                continue
+                # A amostra não representava o restante do arquivo; latin1 aceita qualquer byte
+                print(f"Codificação {codificacao} inválida após a amostra, relendo com latin1...")
+                codificacao = 'latin1'
+                df = pd.read_csv(caminho_arquivo, encoding=codificacao, **opcoes)
+            print(f"Arquivo de {tipo} lido com sucesso usando {codificacao}! Total de linhas: {len(df)}")
+            
+            if len(df) == 0:
+                print(f"O arquivo {caminho_arquivo} contém apenas cabeçalhos sem dados.")
+            
+            return preparar(df), codificacao
+            
+        except Exception as e:
+            print(f"Erro ao processar o arquivo {caminho_arquivo} com codificação {codificacao}: {str(e)}")
+            return None, codificacao
+    
+    def _preparar_dados_colhedora(
+        self, df: pd.DataFrame, ultimos_instantes: Optional[Dict[Any, float]] = None
+    ) -> pd.DataFrame:
+        """
+        Aplica as transformações de colhedoras a um DataFrame lido do TXT (inteiro ou um bloco).
+        """
+        # Verificar se o DataFrame está vazio
+        if len(df) == 0:
+            for col in COLUNAS_DESEJADAS_COLHEDORAS:
+                if col not in df.columns:
+                    df[col] = np.nan
+            df[COLUNA_CHAVE_FRENTE] = pd.Series(dtype='category')
+            colunas_existentes = [col for col in COLUNAS_DESEJADAS_COLHEDORAS if col in df.columns]
+            colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_COLHEDORAS]
+            return df[colunas_existentes + colunas_extras]
+        
+        # Limpeza de espaços extras nos nomes das colunas
+        df.columns = df.columns.str.strip()
+        
+        # Identificadores numéricos como categoria
+        for col in COLUNAS_CATEGORIA_NUMERICA:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        # Verificar se 'Data/Hora' existe e processá-la
+        if 'Data/Hora' in df.columns:
+            df[['Data', 'Hora']] = df['Data/Hora'].str.split(' ', expand=True)
+            df = df.drop(columns=['Data/Hora'])
+        
+        # Conversão e cálculo de diferenças de hora
+        df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S', errors='coerce')
+        
+        # Calcular a diferença de hora por equipamento, em horas
+        df['Diferença_Hora'] = self._calcular_diferenca_hora(df, ultimos_instantes)
+        
+        # Cálculos adicionais
+        df = self._calcular_colunas_derivadas(df, 'colhedora')
+        
+        # Conversão de colunas binárias para valores numéricos
+        for col in COLUNAS_FLAG_COLHEDORAS:
+            if col in df.columns:
+                if df[col].dtype == 'object':
+                    df[col] = df[col].replace({'LIGADO': 1, 'DESLIGADO': 0})
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int8')
+        
+        # Frente normalizada, usada no particionamento por frente
+        df[COLUNA_CHAVE_FRENTE] = self._calcular_chave_frente(df)
+        
+        # Limpeza e organização das colunas
+        df = df.drop(columns=COLUNAS_REMOVER_COLHEDORAS, errors='ignore')
+        
+        # Garantir que todas as colunas desejadas existam
+        for col in COLUNAS_DESEJADAS_COLHEDORAS:
+            if col not in df.columns:
+                df[col] = np.nan
+        
+        # Reorganizar as colunas na ordem desejada
+        colunas_existentes = [col for col in COLUNAS_DESEJADAS_COLHEDORAS if col in df.columns]
+        colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_COLHEDORAS]
+        df = df[colunas_existentes + colunas_extras]
+        
+        return df
+    
+    async def _carregar_arquivo(
+        self, upload_file: Optional[Union[UploadFile, Path]], tipo: str, contexto: TaskContext,
+        frentes: List[str], streaming: Optional[bool] = None
+    ) -> None:
+        """
+        Salva o upload no diretório temporário da tarefa e carrega os seus dados em contexto.dados[tipo].
+        Um caminho (arquivo já gravado, ex.: pela fila de trabalhos) é lido diretamente, sem cópia.
         
-        print(f"Erro: Não foi possível ler o arquivo {caminho_arquivo} com nenhuma das codificações tentadas.")
-        return None
+        Guarda os dados, o índice de partições por frente e se a leitura foi em blocos. Na
+        leitura em blocos os dados são os agregados acumulados por frente e os registros brutos
+        (seção "base") não são mantidos, então menos colunas são lidas. Sem arquivo, os dados são None.
+        """
+        if not upload_file:
+            contexto.dados[tipo] = (None, None, False)
+            return
+        
+        hash_arquivo = None
+        if isinstance(upload_file, Path):
+            caminho = upload_file
+        else:
+            caminho = contexto.arquivo(f"{tipo}.txt")
+            hash_arquivo = (await self._save_upload_file(upload_file, caminho)).sha256
+        em_blocos = self._usar_leitura_em_blocos(caminho, streaming)
+        colunas = self._colunas_leitura(tipo, manter_base=not em_blocos)
+        
+        if em_blocos:
+            dados, codificacao = await run_cpu(
+                _executar_no_worker, '_agregar_arquivo_em_blocos', str(caminho), tipo, frentes, colunas
+            )
+            if codificacao is not None:
+                contexto.registrar_codificacao(tipo, codificacao)
+            contexto.dados[tipo] = (dados, None, True)
+            return
+        
+        dados, indice, codificacao = await run_cpu(
+            _executar_no_worker, '_carregar_telemetria', str(caminho), tipo, colunas,
+            self._arquivo_compartilhado(contexto, tipo), hash_arquivo
+        )
+        if codificacao is not None:
+            contexto.registrar_codificacao(tipo, codificacao)
+        contexto.dados[tipo] = (dados, indice, False)
     
-    # Função para processar transbordos
-    async def _process_transbordo_file(self, caminho_arquivo: str) -> pd.DataFrame:
+    def _agregar_arquivo_em_blocos(
+        self, caminho_arquivo: str, tipo: str, frentes: List[str], colunas: Optional[Set[str]] = None
+    ) -> Tuple[Optional[Dict[str, Dict[str, Optional[pd.DataFrame]]]], Optional[str]]:
         """
-        Processa o arquivo TXT de transbordos.
-        Adaptado de processamento_unificado.py
+        Lê o arquivo TXT em blocos (etapa síncrona, executada no pool de CPU).
+        
+        Cada bloco é transformado, filtrado por frente e somado aos agregados da Base Calculo
+        e por equipamento. O último instante de cada equipamento passa de um bloco ao seguinte,
+        então o arquivo deve estar em ordem cronológica por equipamento.
+        Retorna os agregados por frente (None em caso de erro) e a codificação usada na leitura.
         """
-        # Lista de codificações para tentar
-        codificacoes = ['utf-8', 'latin1', 'ISO-8859-1', 'cp1252']
+        if tipo == 'colhedora':
+            preparar, agregar = self._preparar_dados_colhedora, self._agregar_base_calculo_colhedora
+        else:
+            preparar, agregar = self._preparar_dados_transbordo, self._agregar_base_calculo_transbordo
+        
+        compressao = detect_compression(caminho_arquivo)
+        try:
+            codificacao = self._detectar_codificacao(caminho_arquivo, compressao)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {caminho_arquivo}: {str(e)}")
+            return None, None
         
-        for codificacao in codificacoes:
+        while True:
             try:
-                # Leitura do arquivo
-                df = pd.read_csv(caminho_arquivo, sep=';', encoding=codificacao)
-                print(f"Arquivo de transbordo lido com sucesso usando {codificacao}! Total de linhas: {len(df)}")
-                
-                # Verificar se o DataFrame está vazio
-                if len(df) == 0:
-                    print(f"O arquivo {caminho_arquivo} contém apenas cabeçalhos sem dados.")
-                    for col in COLUNAS_DESEJADAS_TRANSBORDOS:
-                        if col not in df.columns:
-                            df[col] = np.nan
-                    colunas_existentes = [col for col in COLUNAS_DESEJADAS_TRANSBORDOS if col in df.columns]
-                    colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_TRANSBORDOS]
-                    return df[colunas_existentes + colunas_extras]
-                
-                # Limpeza de espaços extras nos nomes das colunas
-                df.columns = df.columns.str.strip()
-                
-                # Verificar se 'Data/Hora' existe e processá-la
-                if 'Data/Hora' in df.columns:
-                    df[['Data', 'Hora']] = df['Data/Hora'].str.split(' ', expand=True)
-                    df = df.drop(columns=['Data/Hora'])
-                
-                # Conversão e cálculo de diferenças de hora
-                if isinstance(df['Hora'].iloc[0], str):
-                    df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S', errors='coerce')
-                
-                # Calcular a diferença de hora se ainda não existir
-                if 'Diferença_Hora' not in df.columns or df['Diferença_Hora'].isna().any():
-                    df['Diferença_Hora'] = df['Hora'].diff().dt.total_seconds() / 3600
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if pd.isna(x) or x < 0 else x)
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if x > 0.50 else round(x, 4))
-                else:
-                    df['Diferença_Hora'] = pd.to_numeric(df['Diferença_Hora'].astype(str).str.strip(), errors='coerce')
-                    df['Diferença_Hora'] = df['Diferença_Hora'].fillna(0)
-                    df['Diferença_Hora'] = df['Diferença_Hora'].apply(lambda x: 0 if x > 0.50 else round(x, 4))
-                
-                # Conversão de Motor Ligado para formato numérico
-                if 'Motor Ligado' in df.columns:
-                    if df['Motor Ligado'].dtype == 'object':
-                        df['Motor Ligado'] = df['Motor Ligado'].replace({'LIGADO': 1, 'DESLIGADO': 0})
-                    df['Motor Ligado'] = pd.to_numeric(df['Motor Ligado'], errors='coerce').fillna(0).astype(int)
-                
-                # Cálculos específicos para transbordos
-                RPM_MINIMO = 300
-                
-                # Verificar e calcular "Parado Com Motor Ligado" se necessário
-                if 'Parado Com Motor Ligado' not in df.columns:
-                    df['Parado Com Motor Ligado'] = ((df['Velocidade'] == 0) & 
-                                                  (df['RPM Motor'] >= RPM_MINIMO)).astype(int)
-                
-                # Verificar se Horas Produtivas já existe
-                if 'Horas Produtivas' not in df.columns or df['Horas Produtivas'].isna().any():
-                    df['Horas Produtivas'] = df.apply(
-                        lambda row: round(row['Diferença_Hora'], 4) if row['Grupo Operacao'] == 'Produtiva' else 0,
-                        axis=1
-                    )
-                else:
-                    df['Horas Produtivas'] = pd.to_numeric(df['Horas Produtivas'].astype(str).str.strip(), errors='coerce')
-                    df['Horas Produtivas'] = df['Horas Produtivas'].fillna(0)
-                
-                # Coluna de GPS - Para transbordos
-                if 'RTK (Piloto Automatico)' in df.columns:
-                    df['GPS'] = df.apply(
-                        lambda row: row['Diferença_Hora'] if row.get('RTK (Piloto Automatico)', 0) == 1 
-                        and row['Velocidade'] > 0 and row['Grupo Operacao'] == 'Produtiva' else 0,
-                        axis=1
-                    )
-                else:
-                    df['GPS'] = 0
-                
-                # Limpeza e organização das colunas
-                df = df.drop(columns=COLUNAS_REMOVER_TRANSBORDOS, errors='ignore')
+                agregados = {frente: {"agregado": None, "por_equipamento": None} for frente in frentes}
+                ultimos_instantes = {}
+                total_linhas = 0
                 
-                # Garantir que todas as colunas desejadas existam
-                for col in COLUNAS_DESEJADAS_TRANSBORDOS:
-                    if col not in df.columns:
-                        df[col] = np.nan
-                
-                # Reorganizar as colunas na ordem desejada
-                colunas_existentes = [col for col in COLUNAS_DESEJADAS_TRANSBORDOS if col in df.columns]
-                colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_TRANSBORDOS]
-                df = df[colunas_existentes + colunas_extras]
+                with pd.read_csv(
+                    caminho_arquivo, encoding=codificacao, chunksize=settings.TXT_CHUNK_ROWS,
+                    **self._opcoes_leitura(tipo, colunas, compressao)
+                ) as leitor:
+                    for bloco in leitor:
+                        bloco = preparar(bloco, ultimos_instantes)
+                        total_linhas += len(bloco)
+                        bloco, indice = self._particionar_por_frente(bloco)
+                        
+                        for frente in frentes:
+                            dados_frente = self._selecionar_frente(bloco, frente, indice)
+                            if len(dados_frente) == 0:
+                                continue
+                            
+                            acumulado = agregados[frente]
+                            acumulado["agregado"] = self._combinar_agregados(
+                                acumulado["agregado"], agregar(dados_frente), CHAVES_BASE_CALCULO
+                            )
+                            acumulado["por_equipamento"] = self._combinar_agregados(
+                                acumulado["por_equipamento"], self._agregar_por_equipamento(dados_frente), ['Equipamento']
+                            )
+                        
+                        print(f"Bloco de {tipo} processado: {total_linhas} linhas lidas até agora")
                 
-                return df
+                print(f"Arquivo de {tipo} lido em blocos usando {codificacao}! Total de linhas: {total_linhas}")
+                return agregados, codificacao
                 
             except UnicodeDecodeError:
-                print(f"Tentativa com codificação {codificacao} falhou, tentando próxima codificação...")
-                continue
+                # A amostra não representava o restante do arquivo; latin1 aceita qualquer byte
+                print(f"Codificação {codificacao} inválida após a amostra, relendo com latin1...")
+                codificacao = 'latin1'
             except Exception as e:
-                print(f"Erro ao processar o arquivo com codificação {codificacao}: {str(e)}")
-                continue
+                print(f"Erro ao processar em blocos o arquivo {caminho_arquivo} com codificação {codificacao}: {str(e)}")
+                return None, codificacao
+    
+    def _carregar_telemetria(
+        self, caminho_arquivo: str, tipo: str, colunas: Optional[Set[str]] = None,
+        arquivo_compartilhado: Optional[str] = None, hash_arquivo: Optional[str] = None
+    ) -> Tuple[Optional[Union[pd.DataFrame, str]], Optional[Dict[str, slice]], Optional[str]]:
+        """
+        Carrega a telemetria tratada do cache quando o mesmo arquivo já foi processado com a
+        mesma versão do parser e projeção de colunas; caso contrário lê o TXT e grava o resultado.
+        hash_arquivo, se já calculado durante o upload, evita ler o arquivo de novo para a chave.
+        Retorna os dados particionados por frente (ou o caminho do arquivo compartilhado), o índice
+        de partições e a codificação usada na leitura (None quando os dados vieram do cache).
+        """
+        codificacao = None
+        chave = None
+        df = None
+        if self.cache_telemetria is not None:
+            chave = self.cache_telemetria.build_key(
+                hash_arquivo or hash_file(caminho_arquivo), tipo, VERSAO_PARSER, colunas
+            )
+            df = self.cache_telemetria.get(chave)
+            if df is not None:
+                print(f"Dados de {tipo} carregados do cache de telemetria! Total de linhas: {len(df)}")
+        
+        if df is None:
+            df, codificacao = self._ler_arquivo_txt(caminho_arquivo, tipo, colunas)
+            if df is None:
+                return None, None, codificacao
+            
+            # O cache guarda o DataFrame na ordem do arquivo, com os rótulos originais do índice
+            if chave is not None and len(df) > 0:
+                self.cache_telemetria.put(chave, df)
+        
+        df, indice = self._particionar_por_frente(df)
+        if arquivo_compartilhado is not None:
+            self._gravar_compartilhado(df, arquivo_compartilhado)
+            return arquivo_compartilhado, indice, codificacao
+        return df, indice, codificacao
+    
+    def _arquivo_compartilhado(self, contexto: TaskContext, tipo: str) -> Optional[str]:
+        """
+        Caminho do arquivo usado para compartilhar a telemetria com os workers do pool de processos.
+        Com o pool de threads os workers já compartilham a memória e nenhum arquivo é usado.
+        """
+        if settings.CPU_POOL_TYPE != "process":
+            return None
+        return str(contexto.arquivo(f"{tipo}.arrow"))
+    
+    def _gravar_compartilhado(self, df: pd.DataFrame, caminho: str) -> None:
+        """
+        Grava a telemetria particionada em Arrow IPC sem compressão, para que os workers a mapeiem
+        em memória e leiam só a fatia de cada frente. Os rótulos do índice vão em uma coluna.
+        """
+        tabela = pa.Table.from_pandas(df.reset_index(names=COLUNA_INDICE_ORIGINAL), preserve_index=False)
+        feather.write_feather(tabela, caminho, compression='uncompressed')
+    
+    def _ler_fatia_compartilhada(self, caminho: str, inicio: int, fim: int) -> pd.DataFrame:
+        """
+        Lê as linhas [inicio, fim) da telemetria compartilhada. A tabela mapeada em memória é
+        mantida por worker, então vários relatórios da mesma tarefa abrem o arquivo uma só vez.
+        """
+        tabela = self._tabelas_compartilhadas.pop(caminho, None)
+        if tabela is None:
+            tabela = feather.read_table(caminho, memory_map=True)
+        self._tabelas_compartilhadas[caminho] = tabela
         
-        print(f"Erro: Não foi possível ler o arquivo {caminho_arquivo} com nenhuma das codificações tentadas.")
-        return None
+        # Manter apenas as tabelas usadas mais recentemente
+        while len(self._tabelas_compartilhadas) > MAXIMO_TABELAS_COMPARTILHADAS:
+            self._tabelas_compartilhadas.pop(next(iter(self._tabelas_compartilhadas)))
         
-    def _filter_colhedora_by_frente(self, df: pd.DataFrame, frente: str) -> pd.DataFrame:
+        df = tabela.slice(inicio, fim - inicio).to_pandas()
+        df = df.set_index(COLUNA_INDICE_ORIGINAL)
+        df.index.name = None
+        return df
+    
+    def _colunas_leitura(self, tipo: str, manter_base: bool) -> Set[str]:
+        """
+        Conjunto mínimo de colunas a ler do TXT: as usadas nos cálculos e, quando os registros
+        brutos vão para a seção "base" do relatório, também as colunas desejadas.
+        """
+        if tipo == 'colhedora':
+            colunas = set(COLUNAS_CALCULO_COLHEDORAS)
+            if manter_base:
+                colunas.update(COLUNAS_DESEJADAS_COLHEDORAS)
+        else:
+            colunas = set(COLUNAS_CALCULO_TRANSBORDOS)
+            if manter_base:
+                colunas.update(COLUNAS_DESEJADAS_TRANSBORDOS)
+        return colunas
+    
+    def _opcoes_leitura(
+        self, tipo: str, colunas: Optional[Set[str]] = None, compressao: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Parâmetros de leitura do TXT: separador, esquema de tipos, compressão e, se informada,
+        a projeção de colunas. Arquivos compactados são descompactados em fluxo pelo pandas.
+        """
+        opcoes = {
+            'sep': ';',
+            'dtype': TIPOS_LEITURA_COLHEDORAS if tipo == 'colhedora' else TIPOS_LEITURA_TRANSBORDOS,
+            'compression': compressao
+        }
+        if colunas is not None:
+            # Os nomes no cabeçalho podem ter espaços extras, removidos só após a leitura
+            opcoes['usecols'] = lambda coluna: coluna.strip() in colunas
+        return opcoes
+    
+    def _usar_leitura_em_blocos(self, caminho_arquivo: Path, streaming: Optional[bool]) -> bool:
+        """
+        Define se o arquivo será lido em blocos: conforme solicitado ou, se não informado,
+        quando o tamanho (descompactado) atinge settings.TXT_STREAMING_MIN_SIZE. Arquivos
+        compactados sem tamanho confiável nos metadados são lidos em blocos por segurança.
+        """
+        if streaming is not None:
+            return streaming
+        tamanho = uncompressed_size(caminho_arquivo, detect_compression(caminho_arquivo))
+        return tamanho is None or tamanho >= settings.TXT_STREAMING_MIN_SIZE
+    
+    def _preparar_dados_transbordo(
+        self, df: pd.DataFrame, ultimos_instantes: Optional[Dict[Any, float]] = None
+    ) -> pd.DataFrame:
+        """
+        Aplica as transformações de transbordos a um DataFrame lido do TXT (inteiro ou um bloco).
+        """
+        # Verificar se o DataFrame está vazio
+        if len(df) == 0:
+            for col in COLUNAS_DESEJADAS_TRANSBORDOS:
+                if col not in df.columns:
+                    df[col] = np.nan
+            df[COLUNA_CHAVE_FRENTE] = pd.Series(dtype='category')
+            colunas_existentes = [col for col in COLUNAS_DESEJADAS_TRANSBORDOS if col in df.columns]
+            colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_TRANSBORDOS]
+            return df[colunas_existentes + colunas_extras]
+        
+        # Limpeza de espaços extras nos nomes das colunas
+        df.columns = df.columns.str.strip()
+        
+        # Identificadores numéricos como categoria
+        for col in COLUNAS_CATEGORIA_NUMERICA:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        # Verificar se 'Data/Hora' existe e processá-la
+        if 'Data/Hora' in df.columns:
+            df[['Data', 'Hora']] = df['Data/Hora'].str.split(' ', expand=True)
+            df = df.drop(columns=['Data/Hora'])
+        
+        # Conversão e cálculo de diferenças de hora
+        if isinstance(df['Hora'].iloc[0], str):
+            df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S', errors='coerce')
+        
+        # Calcular a diferença de hora por equipamento se ainda não existir
+        df['Diferença_Hora'] = self._calcular_diferenca_hora(df, ultimos_instantes)
+        
+        # Conversão de Motor Ligado para formato numérico
+        for col in COLUNAS_FLAG_TRANSBORDOS:
+            if col in df.columns:
+                if df[col].dtype == 'object':
+                    df[col] = df[col].replace({'LIGADO': 1, 'DESLIGADO': 0})
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int8')
+        
+        # Cálculos específicos para transbordos (inclui a coluna de GPS)
+        df = self._calcular_colunas_derivadas(df, 'transbordo')
+        
+        # Frente normalizada, usada no particionamento por frente
+        df[COLUNA_CHAVE_FRENTE] = self._calcular_chave_frente(df)
+        
+        # Limpeza e organização das colunas
+        df = df.drop(columns=COLUNAS_REMOVER_TRANSBORDOS, errors='ignore')
+        
+        # Garantir que todas as colunas desejadas existam
+        for col in COLUNAS_DESEJADAS_TRANSBORDOS:
+            if col not in df.columns:
+                df[col] = np.nan
+        
+        # Reorganizar as colunas na ordem desejada
+        colunas_existentes = [col for col in COLUNAS_DESEJADAS_TRANSBORDOS if col in df.columns]
+        colunas_extras = [col for col in df.columns if col not in COLUNAS_DESEJADAS_TRANSBORDOS]
+        df = df[colunas_existentes + colunas_extras]
+        
+        return df
+        
+    def _normalizar_frente(self, valor: Any) -> Optional[str]:
+        """
+        Normaliza uma identificação de frente: "Frente 4", "Frente4", "FRENTE 4 - NOME", o id
+        "frente4" da configuração e o código "4" resultam todos em "4".
+        Textos sem número de frente são apenas padronizados (sem espaços extras, minúsculos).
+        """
+        if valor is None or pd.isna(valor):
+            return None
+        texto = str(valor).strip()
+        correspondencia = PADRAO_FRENTE.search(texto)
+        if correspondencia:
+            return correspondencia.group(1)
+        return texto.lower() or None
+    
+    def _calcular_chave_frente(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Calcula a frente normalizada de cada registro.
+        
+        Usa Grupo Equipamento/Frente normalizado: o número da frente, ou o texto padronizado quando
+        o grupo não tem número (ex.: "Zona Leste"). O Codigo Frente (digitada) só é usado nos
+        registros sem grupo. A normalização é feita uma vez por valor distinto do grupo, não por linha.
+        """
+        grupo = df['Grupo Equipamento/Frente'].astype('category')
+        categorias = [self._normalizar_frente(valor) for valor in grupo.cat.categories]
+        codigos = grupo.cat.codes.to_numpy()
+        
+        # O código -1 (grupo ausente) aponta para o último elemento, sem chave
+        chave = pd.Series(np.array(categorias + [None], dtype=object)[codigos], index=df.index, dtype=object)
+        if 'Codigo Frente (digitada)' in df.columns:
+            codigo = df['Codigo Frente (digitada)']
+            if pd.api.types.is_numeric_dtype(codigo):
+                codigo = codigo.round().astype('Int64')
+            codigo = codigo.astype('string').str.strip().str.lower().replace('', pd.NA)
+            chave = chave.fillna(codigo.astype(object))
+        
+        return chave.astype('category')
+    
+    def _particionar_por_frente(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, slice]]:
+        """
+        Ordena os registros pela frente normalizada (de forma estável, mantendo a ordem dentro de
+        cada frente e os rótulos do índice) e monta o índice de partições: para cada frente, o
+        intervalo contínuo de posições. Assim cada frente é obtida por um fatiamento, sem cópia.
+        """
+        if len(df) == 0:
+            return df, {}
+        
+        ordem = np.argsort(df[COLUNA_CHAVE_FRENTE].cat.codes.to_numpy(), kind='stable')
+        df = df.iloc[ordem]
+        
+        indice = {}
+        for chave, posicoes in df.groupby(COLUNA_CHAVE_FRENTE, sort=False, observed=True).indices.items():
+            indice[chave] = slice(int(posicoes[0]), int(posicoes[-1]) + 1)
+        return df, indice
+    
+    def _selecionar_frente(
+        self, df: pd.DataFrame, frente: str, indice: Optional[Dict[str, slice]] = None
+    ) -> pd.DataFrame:
+        """
+        Registros de uma frente: pelo índice de partições, se informado, ou comparando a frente normalizada.
+        """
+        chave = self._normalizar_frente(frente)
+        if indice is not None:
+            return df.iloc[indice.get(chave, slice(0, 0))]
+        return df[df[COLUNA_CHAVE_FRENTE] == chave]
+    
+    def _filter_colhedora_by_frente(
+        self, df: pd.DataFrame, frente: str, indice: Optional[Dict[str, slice]] = None
+    ) -> pd.DataFrame:
         """
         Filtra os dados de colhedora para uma frente específica.
         """
         try:
-            # Verificar diferentes formas de representar a frente
-            filtro = (
-                (df['Grupo Equipamento/Frente'].str.contains(f'Frente {frente}', case=False, na=False)) |
-                (df['Grupo Equipamento/Frente'].str.contains(f'Frente{frente}', case=False, na=False)) |
-                (df['Grupo Equipamento/Frente'] == frente) |
-                (df['Codigo Frente (digitada)'] == frente)
-            )
-            
-            df_filtrado = df[filtro].copy()
+            df_filtrado = self._selecionar_frente(df, frente, indice)
             
             if len(df_filtrado) == 0:
                 print(f"Aviso: Nenhum dado encontrado para a frente {frente} nos dados de colhedora")
@@ -508,20 +1024,14 @@ class UnifiedTXTProcessor:
             # Retornar um DataFrame vazio em caso de erro
             return pd.DataFrame(columns=df.columns)
             
-    def _filter_transbordo_by_frente(self, df: pd.DataFrame, frente: str) -> pd.DataFrame:
+    def _filter_transbordo_by_frente(
+        self, df: pd.DataFrame, frente: str, indice: Optional[Dict[str, slice]] = None
+    ) -> pd.DataFrame:
         """
         Filtra os dados de transbordo para uma frente específica.
         """
         try:
-            # Verificar diferentes formas de representar a frente
-            filtro = (
-                (df['Grupo Equipamento/Frente'].str.contains(f'Frente {frente}', case=False, na=False)) |
-                (df['Grupo Equipamento/Frente'].str.contains(f'Frente{frente}', case=False, na=False)) |
-                (df['Grupo Equipamento/Frente'] == frente) |
-                (df['Codigo Frente (digitada)'] == frente)
-            )
-            
-            df_filtrado = df[filtro].copy()
+            df_filtrado = self._selecionar_frente(df, frente, indice)
             
             if len(df_filtrado) == 0:
                 print(f"Aviso: Nenhum dado encontrado para a frente {frente} nos dados de transbordo")
@@ -535,646 +1045,599 @@ class UnifiedTXTProcessor:
             # Retornar um DataFrame vazio em caso de erro
             return pd.DataFrame(columns=df.columns)
     
-    async def _generate_colheita_report(self, df: pd.DataFrame, frente: str, report_type: str) -> Dict[str, Any]:
+    async def _generate_colheita_report(
+        self, df: Optional[pd.DataFrame], frente: str, report_type: str,
+        agregados: Optional[Dict[str, Optional[pd.DataFrame]]] = None
+    ) -> Dict[str, Any]:
         """
         Gera os dados do relatório de colheita para uma frente específica.
+        Na leitura em blocos recebe os agregados acumulados no lugar do DataFrame.
+        O cálculo roda no pool de CPU.
         """
-        try:
-            if len(df) == 0:
-                return {
-                    "status": "empty",
-                    "message": f"Sem dados para gerar relatório de colheita para frente {frente}"
-                }
-            
-            # Calcular a Base Calculo
-            base_calculo = self._calcular_base_calculo_colhedora(df)
-            
-            # Calcular as métricas auxiliares
-            disp_mecanica = self._calcular_disponibilidade_mecanica(df)
-            eficiencia_energetica = self._calcular_eficiencia_energetica_colhedora(base_calculo)
-            hora_elevador = self._calcular_hora_elevador(df, base_calculo)
-            motor_ocioso = self._calcular_motor_ocioso_colhedora(base_calculo)
-            uso_gps = self._calcular_uso_gps_colhedora(df, base_calculo)
-            horas_por_frota = self._calcular_horas_por_frota(df)
-            
-            # Converter DataFrames para dicionários
-            report_data = {
-                "base": df.to_dict(orient='records'),
-                "base_calculo": base_calculo.to_dict(orient='records'),
-                "disponibilidade_mecanica": disp_mecanica.to_dict(orient='records'),
-                "eficiencia_energetica": eficiencia_energetica.to_dict(orient='records'),
-                "hora_elevador": hora_elevador.to_dict(orient='records'),
-                "motor_ocioso": motor_ocioso.to_dict(orient='records'),
-                "uso_gps": uso_gps.to_dict(orient='records'),
-                "horas_por_frota": horas_por_frota.to_dict(orient='records')
-            }
-            
-            return report_data
-            
-        except Exception as e:
-            print(f"Erro ao gerar relatório de colheita: {str(e)}")
-            return {
-                "status": "error",
-                "message": f"Erro ao gerar relatório de colheita: {str(e)}"
-            }
+        return await run_cpu(_executar_no_worker, '_montar_relatorio', 'colheita', df, frente, agregados)
     
-    async def _generate_transbordo_report(self, df: pd.DataFrame, frente: str, report_type: str) -> Dict[str, Any]:
+    async def _generate_transbordo_report(
+        self, df: Optional[pd.DataFrame], frente: str, report_type: str,
+        agregados: Optional[Dict[str, Optional[pd.DataFrame]]] = None
+    ) -> Dict[str, Any]:
         """
         Gera os dados do relatório de transbordo para uma frente específica.
+        Na leitura em blocos recebe os agregados acumulados no lugar do DataFrame.
+        O cálculo roda no pool de CPU.
+        """
+        return await run_cpu(_executar_no_worker, '_montar_relatorio', 'transbordo', df, frente, agregados)
+    
+    async def _gerar_relatorio_da_frente(
+        self, tipo: str, dados: Any, indice: Optional[Dict[str, slice]], em_blocos: bool,
+        frente: str, report_type: str
+    ) -> Dict[str, Any]:
+        """
+        Gera o relatório de colheita ou de transbordo de uma frente a partir dos dados carregados:
+        agregados da leitura em blocos, DataFrame particionado ou arquivo compartilhado.
+        """
+        gerar = self._generate_colheita_report if tipo == 'colheita' else self._generate_transbordo_report
+        
+        if em_blocos:
+            return await gerar(None, frente, report_type, dados[frente])
+        
+        if isinstance(dados, str):
+            # A fatia da frente é lida do arquivo compartilhado pelo próprio worker
+            fatia = indice.get(self._normalizar_frente(frente), slice(0, 0))
+            tipo_dados = 'colhedora' if tipo == 'colheita' else 'transbordo'
+            if fatia.stop == fatia.start:
+                print(f"Aviso: Nenhum dado encontrado para a frente {frente} nos dados de {tipo_dados}")
+            else:
+                print(f"Dados de {tipo_dados} filtrados para frente {frente}: {fatia.stop - fatia.start} registros")
+            return await run_cpu(
+                _executar_no_worker, '_montar_relatorio_compartilhado', tipo, dados, fatia.start, fatia.stop, frente
+            )
+        
+        # Filtrar para a frente específica
+        if tipo == 'colheita':
+            frente_data = self._filter_colhedora_by_frente(dados, frente, indice)
+        else:
+            frente_data = self._filter_transbordo_by_frente(dados, frente, indice)
+        return await gerar(frente_data, frente, report_type)
+    
+    def _montar_relatorio_compartilhado(
+        self, tipo: str, caminho: str, inicio: int, fim: int, frente: str
+    ) -> Dict[str, Any]:
+        """
+        Monta o relatório de uma frente lendo apenas a sua fatia da telemetria compartilhada.
+        """
+        return self._montar_relatorio(tipo, self._ler_fatia_compartilhada(caminho, inicio, fim), frente)
+    
+    def _montar_relatorio(
+        self, tipo: str, df: Optional[pd.DataFrame], frente: str,
+        agregados: Optional[Dict[str, Optional[pd.DataFrame]]] = None
+    ) -> Dict[str, Any]:
         """
+        Monta os dados do relatório de colheita ou de transbordo (etapa síncrona, executada no pool de CPU).
+        """
+        if tipo == 'colheita':
+            gerar_tabelas, tabelas_de_agregados = self._gerar_tabelas_colheita, self._tabelas_colheita_de_agregados
+        else:
+            gerar_tabelas, tabelas_de_agregados = self._gerar_tabelas_transbordo, self._tabelas_transbordo_de_agregados
+        
         try:
-            if len(df) == 0:
+            sem_dados = agregados["agregado"] is None if agregados is not None else len(df) == 0
+            if sem_dados:
                 return {
                     "status": "empty",
-                    "message": f"Sem dados para gerar relatório de transbordo para frente {frente}"
+                    "message": f"Sem dados para gerar relatório de {tipo} para frente {frente}"
                 }
             
-            # Calcular a Base Calculo
-            base_calculo = self._calcular_base_calculo_transbordo(df)
-            
-            # Calcular as métricas auxiliares
-            disp_mecanica = self._calcular_disponibilidade_mecanica(df)
-            eficiencia_energetica = self._calcular_eficiencia_energetica_transbordo(base_calculo)
-            motor_ocioso = self._calcular_motor_ocioso_transbordo(base_calculo)
-            falta_apontamento = self._calcular_falta_apontamento(base_calculo)
-            uso_gps = self._calcular_uso_gps_transbordo(base_calculo)
-            horas_por_frota = self._calcular_horas_por_frota(df)
+            # Calcular a Base Calculo e as tabelas derivadas a partir dos agregados
+            if agregados is not None:
+                tabelas = tabelas_de_agregados(agregados["agregado"], agregados["por_equipamento"])
+                # Na leitura em blocos os registros brutos não são mantidos em memória
+                base = []
+            else:
+                tabelas = gerar_tabelas(df)
+                base = df.drop(columns=COLUNA_CHAVE_FRENTE, errors='ignore')
+                # Parquet gravado à parte em _preparar_registro_relatorio, formato colunar compacto
+                # (lido com base_encoding.decode_base) ou lista de registros
+                if settings.REPORT_BASE_STORAGE == "artifact":
+                    base = encode_base_parquet(base)
+                elif settings.REPORT_BASE_FORMAT == "columnar":
+                    base = encode_base(base)
+                else:
+                    base = base.to_dict(orient='records')
             
             # Converter DataFrames para dicionários
-            report_data = {
-                "base": df.to_dict(orient='records'),
-                "base_calculo": base_calculo.to_dict(orient='records'),
-                "disponibilidade_mecanica": disp_mecanica.to_dict(orient='records'),
-                "eficiencia_energetica": eficiencia_energetica.to_dict(orient='records'),
-                "motor_ocioso": motor_ocioso.to_dict(orient='records'),
-                "falta_apontamento": falta_apontamento.to_dict(orient='records'),
-                "uso_gps": uso_gps.to_dict(orient='records'),
-                "horas_por_frota": horas_por_frota.to_dict(orient='records')
-            }
+            report_data = {"base": base}
+            for nome, tabela in tabelas.items():
+                report_data[nome] = tabela.to_dict(orient='records')
             
             return report_data
             
         except Exception as e:
-            print(f"Erro ao gerar relatório de transbordo: {str(e)}")
+            print(f"Erro ao gerar relatório de {tipo}: {str(e)}")
             return {
                 "status": "error",
-                "message": f"Erro ao gerar relatório de transbordo: {str(e)}"
+                "message": f"Erro ao gerar relatório de {tipo}: {str(e)}"
             }
     
-    async def _save_report_to_supabase(
+    async def _preparar_registro_relatorio(
         self, report_type: str, report_date: str, frente: str,
         report_data: Dict[str, Any], is_teste: bool
-    ) -> str:
+    ) -> Tuple[str, Dict[str, Any]]:
         """
-        Salva os dados do relatório no Supabase.
+        Monta o registro do relatório e a tabela de destino.
+        Uma base serializada em Parquet é gravada antes no armazenamento de artefatos e o
+        registro guarda apenas a referência.
+        """
+        # Determinar a tabela correta baseada no tipo de relatório
+        table_name = "relatorios_diarios"
+        if "semanal" in report_type:
+            table_name = "relatorios_semanais"
+        
+        if isinstance(report_data.get("base"), BaseArtefato):
+            referencia = await self._gravar_base_artefato(
+                table_name, report_type, report_date, frente, report_data["base"]
+            )
+            report_data = {**report_data, "base": referencia}
+        
+        # Preparar os dados para o Supabase
+        supabase_data = {
+            "tipo": report_type,
+            "data": report_date,
+            "frente": frente,
+            "dados": report_data,
+            "status": "concluido",
+            "created_at": datetime.now().isoformat(),
+            "is_teste": is_teste
+        }
+        return table_name, supabase_data
+    
+    async def _save_reports_to_supabase(
+        self, registros: List[Tuple[str, Dict[str, Any], bytes]], task_id: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Salva os registros (tabela, dados, JSON dos dados) de uma tarefa, montados por
+        _preparar_registro_relatorio, com inserções em lote (ReportBatchWriter) e retorna os ids na mesma ordem. Se a inserção
+        falhar, os artefatos da base dos relatórios não inseridos são removidos.
+        
+        Com settings.PERSIST_MODE = "outbox", os registros vão para o outbox local e os ids
+        retornados são provisórios; o envio ao Supabase acontece em segundo plano.
         """
+        if not registros:
+            return []
+        
+        lote = ReportBatchWriter(get_persistence_gateway())
+        for table_name, supabase_data, corpo in registros:
+            lote.add(table_name, supabase_data, corpo)
+        
         try:
-            # Determinar a tabela correta baseada no tipo de relatório
-            table_name = "relatorios_diarios"
-            if "semanal" in report_type:
-                table_name = "relatorios_semanais"
-            
-            # Preparar os dados para o Supabase
-            supabase_data = {
-                "tipo": report_type,
-                "data": report_date,
-                "frente": frente,
-                "dados": report_data,
-                "status": "concluido",
-                "created_at": datetime.now().isoformat(),
-                "is_teste": is_teste
-            }
-            
-            print(f"Salvando relatório {report_type} para frente {frente} no Supabase (tabela: {table_name})")
-            
-            # Inserir no Supabase
-            response = supabase_client.from_(table_name).insert(supabase_data).execute()
-            
-            # Verificar resposta
-            if hasattr(response, 'data') and len(response.data) > 0:
-                report_id = response.data[0].get('id')
-                print(f"Relatório salvo com sucesso. ID: {report_id}")
-                return report_id
-            else:
-                raise Exception(f"Erro ao salvar relatório no Supabase: {response}")
+            if settings.PERSIST_MODE == "outbox":
+                report_ids = await run_io(
+                    get_report_outbox().add, [(table_name, corpo) for table_name, _, corpo in registros], task_id
+                )
+                get_outbox_flusher().notify()
+                print(f"Relatórios aceitos no outbox. IDs provisórios: {report_ids}")
+                return report_ids
+            
+            print(f"Salvando {len(registros)} relatório(s) no Supabase")
+            report_ids = await lote.flush()
+            print(f"Relatórios salvos com sucesso. IDs: {report_ids}")
+            return report_ids
         
         except Exception as e:
-            print(f"Erro ao salvar relatório no Supabase: {str(e)}")
+            print(f"Erro ao salvar relatórios no Supabase: {str(e)}")
+            await self._remover_artefatos_nao_gravados([registro for _, registro, _ in registros], lote)
             raise e
     
-    def _calcular_disponibilidade_mecanica(self, df: pd.DataFrame) -> pd.DataFrame:
+    async def _remover_artefatos_nao_gravados(
+        self, registros: List[Dict[str, Any]], lote: Optional[ReportBatchWriter] = None
+    ) -> None:
         """
-        Calcula a disponibilidade mecânica para cada equipamento.
+        Remove os artefatos da base dos registros que não chegaram a ser inseridos
+        (todos, se nenhum lote foi gravado).
+        """
+        inseridos = {
+            id(registro) for (_, registro), report_id in zip(lote.pendentes, lote.ids)
+            if report_id is not None
+        } if lote is not None else set()
+        for registro in registros:
+            base = registro["dados"].get("base")
+            if id(registro) in inseridos or not (isinstance(base, dict) and base.get("format") == FORMATO_BASE_PARQUET):
+                continue
+            try:
+                await get_artifact_storage().delete(base["key"])
+            except Exception as erro_remocao:
+                print(f"Erro ao remover o artefato {base['key']}: {str(erro_remocao)}")
+    
+    async def _gravar_base_artefato(
+        self, table_name: str, report_type: str, report_date: str, frente: str, base: BaseArtefato
+    ) -> Dict[str, Any]:
+        """
+        Grava a base em Parquet no armazenamento de artefatos e retorna a referência
+        que substitui a seção "base" no relatório.
         """
-        # Filtramos os dados excluindo os operadores da lista
-        df_filtrado = df[~df['Operador'].isin(OPERADORES_EXCLUIR)]
+        frente_chave = re.sub(r'[^0-9A-Za-z_-]+', '_', str(frente)).strip('_') or 'frente'
+        chave = f"{table_name}/{report_date}/{frente_chave}/{report_type}-{uuid.uuid4().hex}.parquet"
         
-        # Agrupar por Equipamento e calcular horas por grupo operacional
-        equipamentos = df_filtrado['Equipamento'].unique()
-        resultados = []
+        referencia = await get_artifact_storage().put(chave, base.conteudo, "application/vnd.apache.parquet")
+        print(f"Base do relatório {report_type} da frente {frente} gravada em {chave} "
+              f"({base.linhas} linhas, {len(base.conteudo) / 1024:.0f}KB)")
+        return {"format": FORMATO_BASE_PARQUET, "rows": base.linhas, **referencia}
+    
+    def _agregar_por_equipamento(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Soma, em uma única passada, as horas por equipamento usadas pelas tabelas de frota.
+        """
+        validos = ~df['Operador'].isin(OPERADORES_EXCLUIR)
         
-        for equipamento in equipamentos:
-            dados_equip = df_filtrado[df_filtrado['Equipamento'] == equipamento]
-            total_horas = round(dados_equip['Diferença_Hora'].sum(), 4)
-            
-            # Calcular horas de manutenção
-            manutencao = round(dados_equip[dados_equip['Grupo Operacao'] == 'Manutenção']['Diferença_Hora'].sum(), 4)
-            
-            # A disponibilidade mecânica é o percentual de tempo fora de manutenção
-            disp_mecanica = self._calcular_porcentagem(total_horas - manutencao, total_horas)
-            
-            resultados.append({
-                'Frota': equipamento,
-                'Disponibilidade': disp_mecanica
-            })
+        por_equipamento = self._somar_horas_por_grupo(df, ['Equipamento'], {
+            'Horas Registradas': None,
+            'Horas Validas': validos,
+            'Horas Manutencao': validos & (df['Grupo Operacao'] == 'Manutenção')
+        })
         
-        return pd.DataFrame(resultados)
+        # Posição do primeiro registro válido, que define a ordem da disponibilidade mecânica
+        posicoes = pd.Series(df.index, index=df.index, dtype=float).where(validos)
+        primeiro_valido = posicoes.groupby(df['Equipamento'], sort=False, dropna=False, observed=True).min()
+        por_equipamento['Primeiro Registro Valido'] = primeiro_valido.values
+        
+        return por_equipamento
     
-    def _calcular_horas_por_frota(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _agregar_por_operador(self, base_calculo: pd.DataFrame, agregado: pd.DataFrame) -> pd.DataFrame:
         """
-        Calcula o total de horas registradas para cada frota e a diferença para 24 horas.
+        Consolida a Base Calculo e as somas auxiliares do agregado por Operador e Grupo Equipamento/Frente.
+        As somas não são arredondadas aqui; cada tabela arredonda conforme sua regra.
         """
-        # Agrupar por Equipamento e somar as diferenças de hora
-        equipamentos = df['Equipamento'].unique()
-        resultados = []
+        colunas_horas = [
+            col for col in base_calculo.columns
+            if col not in CHAVES_BASE_CALCULO and not col.startswith('%')
+        ]
+        por_operador = base_calculo.groupby(CHAVES_OPERADOR, sort=False, dropna=False, observed=True)[colunas_horas].sum()
         
-        for equipamento in equipamentos:
-            dados_equip = df[df['Equipamento'] == equipamento]
-            total_horas = round(dados_equip['Diferença_Hora'].sum(), 2)
-            
-            # Calcular a diferença para 24 horas
-            diferenca_24h = round(max(24 - total_horas, 0), 2)
-            
-            resultados.append({
-                'Frota': equipamento,
-                'Horas Registradas': total_horas,
-                'Diferença para 24h': diferenca_24h
-            })
+        colunas_auxiliares = [
+            col for col in agregado.columns
+            if col not in CHAVES_BASE_CALCULO and col not in base_calculo.columns
+        ]
+        if colunas_auxiliares:
+            auxiliares = agregado.groupby(CHAVES_OPERADOR, sort=False, dropna=False, observed=True)[colunas_auxiliares].sum()
+            por_operador = por_operador.join(auxiliares)
         
-        return pd.DataFrame(resultados)
+        return por_operador.reset_index()
     
-    def _calcular_base_calculo_colhedora(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _gerar_tabelas_colheita(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         """
-        Calcula a tabela de Base Calculo para colhedoras.
+        Gera todas as tabelas do relatório de colheita a partir de um agregado por
+        combinação, um por operador e um por equipamento.
         """
-        # Extrair combinações únicas de Equipamento, Grupo Equipamento/Frente e Operador
-        combinacoes = df[['Equipamento', 'Grupo Equipamento/Frente', 'Operador']].drop_duplicates().reset_index(drop=True)
+        return self._tabelas_colheita_de_agregados(
+            self._agregar_base_calculo_colhedora(df), self._agregar_por_equipamento(df)
+        )
+    
+    def _tabelas_colheita_de_agregados(
+        self, agregado: pd.DataFrame, por_equipamento: pd.DataFrame
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Gera as tabelas do relatório de colheita a partir de agregados já calculados
+        (de uma vez ou acumulados bloco a bloco).
+        """
+        base_calculo = self._finalizar_base_calculo_colhedora(agregado)
+        por_operador = self._agregar_por_operador(base_calculo, agregado)
         
-        # Filtrar operadores excluídos
-        combinacoes = combinacoes[~combinacoes['Operador'].isin(OPERADORES_EXCLUIR)]
+        return {
+            "base_calculo": base_calculo,
+            "disponibilidade_mecanica": self._calcular_disponibilidade_mecanica(por_equipamento),
+            "eficiencia_energetica": self._calcular_eficiencia_energetica_colhedora(por_operador),
+            "hora_elevador": self._calcular_hora_elevador(por_operador),
+            "motor_ocioso": self._calcular_motor_ocioso_colhedora(por_operador),
+            "uso_gps": self._calcular_uso_gps_colhedora(por_operador),
+            "media_velocidade": self._calcular_media_velocidade_colhedora(por_operador),
+            "horas_por_frota": self._calcular_horas_por_frota(por_equipamento)
+        }
+    
+    def _gerar_tabelas_transbordo(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Gera todas as tabelas do relatório de transbordo a partir de um agregado por
+        combinação, um por operador e um por equipamento.
+        """
+        return self._tabelas_transbordo_de_agregados(
+            self._agregar_base_calculo_transbordo(df), self._agregar_por_equipamento(df)
+        )
+    
+    def _tabelas_transbordo_de_agregados(
+        self, agregado: pd.DataFrame, por_equipamento: pd.DataFrame
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Gera as tabelas do relatório de transbordo a partir de agregados já calculados
+        (de uma vez ou acumulados bloco a bloco).
+        """
+        base_calculo = self._finalizar_base_calculo_transbordo(agregado)
+        por_operador = self._agregar_por_operador(base_calculo, agregado)
         
-        # Inicializar as colunas de métricas
-        resultados = []
+        return {
+            "base_calculo": base_calculo,
+            "disponibilidade_mecanica": self._calcular_disponibilidade_mecanica(por_equipamento),
+            "eficiencia_energetica": self._calcular_eficiencia_energetica_transbordo(por_operador),
+            "motor_ocioso": self._calcular_motor_ocioso_transbordo(por_operador),
+            "falta_apontamento": self._calcular_falta_apontamento(por_operador),
+            "uso_gps": self._calcular_uso_gps_transbordo(por_operador),
+            "media_velocidade": self._calcular_media_velocidade_transbordo(por_operador),
+            "horas_por_frota": self._calcular_horas_por_frota(por_equipamento)
+        }
+    
+    def _calcular_disponibilidade_mecanica(self, por_equipamento: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula a disponibilidade mecânica para cada equipamento.
+        """
+        # Considerar apenas equipamentos com registros fora dos operadores excluídos
+        dados = por_equipamento.dropna(subset=['Primeiro Registro Valido'])
+        dados = dados.sort_values('Primeiro Registro Valido', kind='stable')
+        total_horas = dados['Horas Validas'].round(4)
+        manutencao = dados['Horas Manutencao'].round(4)
         
-        # Calcular as métricas para cada combinação
-        for idx, row in combinacoes.iterrows():
-            equipamento = row['Equipamento']
-            grupo = row['Grupo Equipamento/Frente']
-            operador = row['Operador']
-            
-            # Filtrar dados para esta combinação
-            filtro = (df['Equipamento'] == equipamento) & \
-                    (df['Grupo Equipamento/Frente'] == grupo) & \
-                    (df['Operador'] == operador)
-            
-            dados_filtrados = df[filtro]
-            
-            # Horas totais
-            horas_totais = round(dados_filtrados['Diferença_Hora'].sum(), 4)
-            
+        # A disponibilidade mecânica é o percentual de tempo fora de manutenção
+        return pd.DataFrame({
+            'Frota': dados['Equipamento'],
+            'Disponibilidade': self._calcular_porcentagem_serie(total_horas - manutencao, total_horas)
+        }).reset_index(drop=True)
+    
+    def _calcular_horas_por_frota(self, por_equipamento: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula o total de horas registradas para cada frota e a diferença para 24 horas.
+        """
+        total_horas = por_equipamento['Horas Registradas'].round(2)
+        
+        return pd.DataFrame({
+            'Frota': por_equipamento['Equipamento'],
+            'Horas Registradas': total_horas,
+            'Diferença para 24h': (24 - total_horas).clip(lower=0).round(2)
+        })
+    
+    def _agregar_base_calculo_colhedora(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Soma as horas de cada métrica da Base Calculo de colhedoras, sem arredondamento,
+        para cada combinação de Equipamento, Grupo Equipamento/Frente e Operador.
+        """
+        df = df[~df['Operador'].isin(OPERADORES_EXCLUIR)]
+        trabalhando = df['Estado'].isin(['TRABALHANDO', 'COLHEITA'])
+        
+        return self._somar_horas_por_grupo(df, CHAVES_BASE_CALCULO, {
+            'Horas totais': None,
             # Horas elevador (Esteira Ligada = 1 E Pressão de Corte > 400)
-            horas_elevador = round(dados_filtrados[
-                (dados_filtrados['Esteira Ligada'] == 1) & 
-                (dados_filtrados['Pressao de Corte'] > 400)
-            ]['Diferença_Hora'].sum(), 4)
-            
-            # Percentual horas elevador
-            percent_elevador = self._calcular_porcentagem(horas_elevador, horas_totais)
-            
+            'Horas elevador': (df['Esteira Ligada'] == 1) & (df['Pressao de Corte'] > 400),
             # RTK (Piloto Automático = 1 e Field Cruiser = 1)
-            rtk = round(dados_filtrados[(dados_filtrados['RTK (Piloto Automatico)'] == 1) & 
-                                 (dados_filtrados['Field Cruiser'] == 1)]['Diferença_Hora'].sum(), 4)
-            
-            # Horas Produtivas
-            horas_produtivas = round(dados_filtrados['Horas Produtivas'].sum(), 4)
-            
-            # % Utilização RTK
-            utilizacao_rtk = self._calcular_porcentagem(rtk, horas_produtivas)
-            
-            # Motor Ligado
-            motor_ligado = round(dados_filtrados[dados_filtrados['Motor Ligado'] == 1]['Diferença_Hora'].sum(), 4)
-            
-            # % Eficiência Elevador
-            eficiencia_elevador = self._calcular_porcentagem(horas_elevador, motor_ligado)
-            
-            # Parado com Motor Ligado
-            parado_motor_ligado = round(dados_filtrados[dados_filtrados['Parada com Motor Ligado'] == 1]['Diferença_Hora'].sum(), 4)
-            
-            # % Parado com motor ligado
-            percent_parado_motor = self._calcular_porcentagem(parado_motor_ligado, motor_ligado)
-            
-            resultados.append({
-                'Equipamento': equipamento,
-                'Grupo Equipamento/Frente': grupo,
-                'Operador': operador,
-                'Horas totais': horas_totais,
-                'Horas elevador': horas_elevador,
-                '%': percent_elevador,
-                'RTK': rtk,
-                'Horas Produtivas': horas_produtivas,
-                '% Utilização RTK': utilizacao_rtk,
-                'Motor Ligado': motor_ligado,
-                '% Eficiência Elevador': eficiencia_elevador,
-                'Parado Com Motor Ligado': parado_motor_ligado,
-                '% Parado com motor ligado': percent_parado_motor
-            })
+            'RTK': (df['RTK (Piloto Automatico)'] == 1) & (df['Field Cruiser'] == 1),
+            'Horas Produtivas': df['Horas Produtivas'],
+            'Motor Ligado': df['Motor Ligado'] == 1,
+            'Parado Com Motor Ligado': df['Parada com Motor Ligado'] == 1,
+            # Somas auxiliares para as tabelas por operador
+            'Horas Trabalhando': trabalhando,
+            'Horas GPS Ativo': trabalhando & (df['RTK (Piloto Automatico)'] == 1) & (df['Velocidade'] > 0),
+            **self._somas_velocidade(df)
+        })
+    
+    def _somas_velocidade(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """
+        Soma e contagem de velocidade por registro, para compor médias a partir de agregados.
+        """
+        velocidade = pd.to_numeric(df['Velocidade'], errors='coerce')
+        return {
+            'Soma Velocidade': velocidade.fillna(0),
+            'Registros Velocidade': velocidade.notna().astype(int)
+        }
+    
+    def _finalizar_base_calculo_colhedora(self, agregado: pd.DataFrame) -> pd.DataFrame:
+        """
+        Arredonda as somas agregadas e calcula os percentuais da Base Calculo de colhedoras.
+        """
+        base = agregado[CHAVES_BASE_CALCULO].copy()
         
-        return pd.DataFrame(resultados)
+        for coluna in ['Horas totais', 'Horas elevador', 'RTK', 'Horas Produtivas',
+                       'Motor Ligado', 'Parado Com Motor Ligado']:
+            base[coluna] = agregado[coluna].round(4)
+        
+        base['%'] = self._calcular_porcentagem_serie(base['Horas elevador'], base['Horas totais'])
+        base['% Utilização RTK'] = self._calcular_porcentagem_serie(base['RTK'], base['Horas Produtivas'])
+        base['% Eficiência Elevador'] = self._calcular_porcentagem_serie(base['Horas elevador'], base['Motor Ligado'])
+        base['% Parado com motor ligado'] = self._calcular_porcentagem_serie(
+            base['Parado Com Motor Ligado'], base['Motor Ligado']
+        )
+        
+        return base[[
+            'Equipamento', 'Grupo Equipamento/Frente', 'Operador', 'Horas totais',
+            'Horas elevador', '%', 'RTK', 'Horas Produtivas', '% Utilização RTK',
+            'Motor Ligado', '% Eficiência Elevador', 'Parado Com Motor Ligado',
+            '% Parado com motor ligado'
+        ]]
     
-    def _calcular_eficiencia_energetica_colhedora(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_eficiencia_energetica_colhedora(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula a eficiência energética por operador para colhedoras.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Eficiência Energética = horas elevador / motor ligado
-            horas_elevador_sum = round(dados_op['Horas elevador'].sum(), 4)
-            motor_ligado_sum = round(dados_op['Motor Ligado'].sum(), 4)
-            
-            # Calcular eficiência
-            eficiencia = self._calcular_porcentagem(horas_elevador_sum, motor_ligado_sum)
-            
-            # Garantir que não ultrapasse 100%
-            eficiencia = min(eficiencia, 1.0)
-            
-            resultados.append({
-                'Operador': operador,
-                'Eficiência': eficiencia
-            })
+        # Eficiência Energética = horas elevador / motor ligado, limitada a 100%
+        eficiencia = self._calcular_porcentagem_serie(
+            por_operador['Horas elevador'].round(4), por_operador['Motor Ligado'].round(4)
+        )
         
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Eficiência': eficiencia.clip(upper=1.0)
+        })
     
-    def _calcular_hora_elevador(self, df: pd.DataFrame, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_hora_elevador(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula as horas de elevador por operador.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Somar horas de elevador da base de cálculo
-            horas_elevador_sum = round(dados_op['Horas elevador'].sum(), 2)
-            
-            resultados.append({
-                'Operador': operador,
-                'Horas': horas_elevador_sum
-            })
-        
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Horas': por_operador['Horas elevador'].round(2)
+        })
     
-    def _calcular_motor_ocioso_colhedora(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_motor_ocioso_colhedora(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula o percentual de motor ocioso por operador para colhedoras.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Motor Ocioso = Parado Com Motor Ligado / Motor Ligado
-            parado_motor_sum = round(dados_op['Parado Com Motor Ligado'].sum(), 4)
-            motor_ligado_sum = round(dados_op['Motor Ligado'].sum(), 4)
-            
-            percentual = self._calcular_porcentagem(parado_motor_sum, motor_ligado_sum)
-            
-            resultados.append({
-                'Operador': operador,
-                'Porcentagem': percentual,
-                'Tempo_Ligado': motor_ligado_sum,
-                'Tempo_Ocioso': parado_motor_sum
-            })
-        
-        return pd.DataFrame(resultados)
+        return self._calcular_motor_ocioso(por_operador)
     
-    def _calcular_uso_gps_colhedora(self, df: pd.DataFrame, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_uso_gps_colhedora(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula o percentual de uso de GPS por operador para colhedoras.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados base para este operador e grupo
-            filtro_base = (df['Operador'] == operador) & (df['Grupo Equipamento/Frente'] == grupo)
-            dados_op_base = df[filtro_base]
-            
-            # Calcular tempo total trabalhando
-            tempo_trabalhando = round(dados_op_base[
-                (dados_op_base['Estado'].isin(['TRABALHANDO', 'COLHEITA']))
-            ]['Diferença_Hora'].sum(), 4)
-            
-            # Calcular tempo com GPS ativo
-            tempo_gps_ativo = round(dados_op_base[
-                (dados_op_base['Estado'].isin(['TRABALHANDO', 'COLHEITA'])) &
-                (dados_op_base['RTK (Piloto Automatico)'] == 1) &
-                (dados_op_base['Velocidade'] > 0)
-            ]['Diferença_Hora'].sum(), 4)
-            
-            # Calcular percentual
-            percentual = self._calcular_porcentagem(tempo_gps_ativo, tempo_trabalhando)
-            
-            # Garantir que não ultrapasse 100%
-            percentual = min(percentual, 1.0)
-            
-            resultados.append({
-                'Operador': operador,
-                'Porcentagem': percentual
-            })
+        # Tempo com GPS ativo sobre o tempo total trabalhando, limitado a 100%
+        percentual = self._calcular_porcentagem_serie(
+            por_operador['Horas GPS Ativo'].round(4), por_operador['Horas Trabalhando'].round(4)
+        )
         
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Porcentagem': percentual.clip(upper=1.0)
+        })
     
-    def _calcular_base_calculo_transbordo(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _agregar_base_calculo_transbordo(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Calcula a tabela de Base Calculo para transbordos.
+        Soma as horas de cada métrica da Base Calculo de transbordos, sem arredondamento,
+        para cada combinação de Equipamento, Grupo Equipamento/Frente e Operador.
         """
-        # Extrair combinações únicas de Equipamento, Grupo Equipamento/Frente e Operador
-        combinacoes = df[['Equipamento', 'Grupo Equipamento/Frente', 'Operador']].drop_duplicates().reset_index(drop=True)
+        df = df[~df['Operador'].isin(OPERADORES_EXCLUIR)]
         
-        # Filtrar operadores excluídos
-        combinacoes = combinacoes[~combinacoes['Operador'].isin(OPERADORES_EXCLUIR)]
+        # Falta de Apontamento - Contabilizar apenas registros explicitamente marcados
+        codigo_operacao = df['Codigo da Operacao']
+        falta_apontamento = (df['Motor Ligado'] == 1) & (
+            (codigo_operacao == 8340) |
+            (codigo_operacao.astype(str).str.startswith('8340')) |
+            (df['Operacao'].astype(str).str.contains('FALTA DE APONTAMENTO', case=False))
+        )
         
-        # Inicializar as colunas de métricas
-        resultados = []
+        return self._somar_horas_por_grupo(df, CHAVES_BASE_CALCULO, {
+            'Horas totais': None,
+            'Horas Produtivas': df['Horas Produtivas'],
+            'GPS': df['GPS'],
+            'Motor Ligado': df['Motor Ligado'] == 1,
+            'Parado Com Motor Ligado': df['Parado Com Motor Ligado'] == 1,
+            'Falta de Apontamento': falta_apontamento,
+            # Somas auxiliares para as tabelas por operador
+            **self._somas_velocidade(df)
+        })
+    
+    def _finalizar_base_calculo_transbordo(self, agregado: pd.DataFrame) -> pd.DataFrame:
+        """
+        Arredonda as somas agregadas e calcula os percentuais da Base Calculo de transbordos.
+        """
+        base = agregado[CHAVES_BASE_CALCULO].copy()
         
-        # Calcular as métricas para cada combinação
-        for idx, row in combinacoes.iterrows():
-            equipamento = row['Equipamento']
-            grupo = row['Grupo Equipamento/Frente']
-            operador = row['Operador']
-            
-            # Filtrar dados para esta combinação
-            filtro = (df['Equipamento'] == equipamento) & \
-                    (df['Grupo Equipamento/Frente'] == grupo) & \
-                    (df['Operador'] == operador)
-            
-            dados_filtrados = df[filtro]
-            
-            # Horas totais
-            horas_totais = round(dados_filtrados['Diferença_Hora'].sum(), 4)
-            
-            # Horas Produtivas
-            horas_produtivas = round(dados_filtrados['Horas Produtivas'].sum(), 4)
-            
-            # GPS para transbordos
-            gps = round(dados_filtrados['GPS'].sum(), 4)
-            
-            # % Utilização GPS
-            utilizacao_gps = self._calcular_porcentagem(gps, horas_produtivas)
-            
-            # Motor Ligado
-            motor_ligado = round(dados_filtrados[dados_filtrados['Motor Ligado'] == 1]['Diferença_Hora'].sum(), 4)
-            
-            # Parado com Motor Ligado
-            parado_motor_ligado = round(dados_filtrados[dados_filtrados['Parado Com Motor Ligado'] == 1]['Diferença_Hora'].sum(), 4)
-            
-            # % Parado com motor ligado
-            percent_parado_motor = self._calcular_porcentagem(parado_motor_ligado, motor_ligado)
-            
-            # Falta de Apontamento - Contabilizar apenas registros explicitamente marcados
-            falta_apontamento = round(dados_filtrados[
-                (dados_filtrados['Motor Ligado'] == 1) & 
-                (
-                    (dados_filtrados['Codigo da Operacao'] == 8340) |
-                    (dados_filtrados['Codigo da Operacao'].astype(str).str.startswith('8340')) |
-                    (dados_filtrados['Operacao'].astype(str).str.contains('FALTA DE APONTAMENTO', case=False))
-                )
-            ]['Diferença_Hora'].sum(), 4)
-            
-            # % Falta de apontamento
-            percent_falta_apontamento = self._calcular_porcentagem(falta_apontamento, motor_ligado)
-            
-            resultados.append({
-                'Equipamento': equipamento,
-                'Grupo Equipamento/Frente': grupo,
-                'Operador': operador,
-                'Horas totais': horas_totais,
-                'Horas Produtivas': horas_produtivas,
-                'GPS': gps,
-                '% Utilização GPS': utilizacao_gps,
-                'Motor Ligado': motor_ligado,
-                'Parado Com Motor Ligado': parado_motor_ligado,
-                '% Parado com motor ligado': percent_parado_motor,
-                'Falta de Apontamento': falta_apontamento,
-                '% Falta de Apontamento': percent_falta_apontamento
-            })
+        for coluna in ['Horas totais', 'Horas Produtivas', 'GPS', 'Motor Ligado',
+                       'Parado Com Motor Ligado', 'Falta de Apontamento']:
+            base[coluna] = agregado[coluna].round(4)
+        
+        base['% Utilização GPS'] = self._calcular_porcentagem_serie(base['GPS'], base['Horas Produtivas'])
+        base['% Parado com motor ligado'] = self._calcular_porcentagem_serie(
+            base['Parado Com Motor Ligado'], base['Motor Ligado']
+        )
+        base['% Falta de Apontamento'] = self._calcular_porcentagem_serie(
+            base['Falta de Apontamento'], base['Motor Ligado']
+        )
         
-        return pd.DataFrame(resultados)
+        return base[[
+            'Equipamento', 'Grupo Equipamento/Frente', 'Operador', 'Horas totais',
+            'Horas Produtivas', 'GPS', '% Utilização GPS', 'Motor Ligado',
+            'Parado Com Motor Ligado', '% Parado com motor ligado',
+            'Falta de Apontamento', '% Falta de Apontamento'
+        ]]
     
-    def _calcular_eficiencia_energetica_transbordo(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_eficiencia_energetica_transbordo(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula a eficiência energética por operador para transbordos.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Eficiência Energética para transbordos = Horas Produtivas / Horas Totais
-            horas_produtivas_sum = round(dados_op['Horas Produtivas'].sum(), 4)
-            horas_totais_sum = round(dados_op['Horas totais'].sum(), 4)
-            
-            # Calcular eficiência
-            eficiencia = self._calcular_porcentagem(horas_produtivas_sum, horas_totais_sum)
-            
-            # Garantir que não ultrapasse 100%
-            eficiencia = min(eficiencia, 1.0)
-            
-            resultados.append({
-                'Operador': operador,
-                'Eficiência': eficiencia
-            })
+        # Eficiência Energética para transbordos = Horas Produtivas / Horas Totais, limitada a 100%
+        eficiencia = self._calcular_porcentagem_serie(
+            por_operador['Horas Produtivas'].round(4), por_operador['Horas totais'].round(4)
+        )
         
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Eficiência': eficiencia.clip(upper=1.0)
+        })
     
-    def _calcular_motor_ocioso_transbordo(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_motor_ocioso_transbordo(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula o percentual de motor ocioso por operador para transbordos.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Motor Ocioso = Parado Com Motor Ligado / Motor Ligado
-            parado_motor_sum = round(dados_op['Parado Com Motor Ligado'].sum(), 4)
-            motor_ligado_sum = round(dados_op['Motor Ligado'].sum(), 4)
-            
-            percentual = self._calcular_porcentagem(parado_motor_sum, motor_ligado_sum)
-            
-            resultados.append({
-                'Operador': operador,
-                'Porcentagem': percentual,
-                'Tempo_Ligado': motor_ligado_sum,
-                'Tempo_Ocioso': parado_motor_sum
-            })
+        return self._calcular_motor_ocioso(por_operador)
+    
+    def _calcular_motor_ocioso(self, por_operador: pd.DataFrame) -> pd.DataFrame:
+        """
+        Motor Ocioso = Parado Com Motor Ligado / Motor Ligado, comum a colhedoras e transbordos.
+        """
+        parado_motor = por_operador['Parado Com Motor Ligado'].round(4)
+        motor_ligado = por_operador['Motor Ligado'].round(4)
         
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Porcentagem': self._calcular_porcentagem_serie(parado_motor, motor_ligado),
+            'Tempo_Ligado': motor_ligado,
+            'Tempo_Ocioso': parado_motor
+        })
     
-    def _calcular_falta_apontamento(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_falta_apontamento(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula o percentual de falta de apontamento por operador.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Usar os valores já calculados em base_calculo
-            falta_apontamento_sum = round(dados_op['Falta de Apontamento'].sum(), 4)
-            motor_ligado_sum = round(dados_op['Motor Ligado'].sum(), 4)
-            
-            # Calcular percentual
-            percentual = self._calcular_porcentagem(falta_apontamento_sum, motor_ligado_sum)
-            
-            resultados.append({
-                'Operador': operador,
-                'Porcentagem': percentual
-            })
+        percentual = self._calcular_porcentagem_serie(
+            por_operador['Falta de Apontamento'].round(4), por_operador['Motor Ligado'].round(4)
+        )
         
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Porcentagem': percentual
+        })
     
-    def _calcular_uso_gps_transbordo(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_uso_gps_transbordo(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula o percentual de uso de GPS por operador para transbordos.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
+        # Uso GPS = GPS / Horas Produtivas, limitado a 100%
+        percentual = self._calcular_porcentagem_serie(
+            por_operador['GPS'].round(4), por_operador['Horas Produtivas'].round(4)
+        )
         
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Uso GPS = GPS / Horas Produtivas
-            gps_sum = round(dados_op['GPS'].sum(), 4)
-            horas_produtivas_sum = round(dados_op['Horas Produtivas'].sum(), 4)
-            
-            percentual = self._calcular_porcentagem(gps_sum, horas_produtivas_sum)
-            
-            # Garantir que não ultrapasse 100%
-            percentual = min(percentual, 1.0)
-            
-            resultados.append({
-                'Operador': operador,
-                'Porcentagem': percentual
-            })
-        
-        return pd.DataFrame(resultados)
+        return pd.DataFrame({
+            'Operador': por_operador['Operador'],
+            'Porcentagem': percentual.clip(upper=1.0)
+        })
     
-    def _calcular_media_velocidade_colhedora(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_media_velocidade_colhedora(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula a média de velocidade por operador para colhedoras.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Calcular média de velocidade
-            velocidade_media = round(dados_op['Velocidade'].mean(), 1)
-            
-            resultados.append({
-                'id': operador,
-                'nome': operador,
-                'velocidade': velocidade_media
-            })
-        
-        return pd.DataFrame(resultados)
+        return self._calcular_media_velocidade(por_operador)
     
-    def _calcular_media_velocidade_transbordo(self, base_calculo: pd.DataFrame) -> pd.DataFrame:
+    def _calcular_media_velocidade_transbordo(self, por_operador: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula a média de velocidade por operador para transbordos.
         """
-        # Agrupar por operador
-        operadores = base_calculo[['Operador', 'Grupo Equipamento/Frente']].drop_duplicates()
-        resultados = []
-        
-        for _, row in operadores.iterrows():
-            operador = row['Operador']
-            grupo = row['Grupo Equipamento/Frente']
-            
-            # Filtrar dados para este operador e grupo
-            filtro = (base_calculo['Operador'] == operador) & (base_calculo['Grupo Equipamento/Frente'] == grupo)
-            dados_op = base_calculo[filtro]
-            
-            # Calcular média de velocidade
-            velocidade_media = round(dados_op['Velocidade'].mean(), 1)
-            
-            resultados.append({
-                'id': operador,
-                'nome': operador,
-                'velocidade': velocidade_media
-            })
+        return self._calcular_media_velocidade(por_operador)
+    
+    def _calcular_media_velocidade(self, por_operador: pd.DataFrame) -> pd.DataFrame:
+        """
+        Média de velocidade dos registros de cada operador, comum a colhedoras e transbordos.
+        """
+        registros = por_operador['Registros Velocidade']
+        velocidade_media = (por_operador['Soma Velocidade'] / registros.where(registros > 0)).round(1).fillna(0.0)
         
-        return pd.DataFrame(resultados) 
\ No newline at end of file
+        return pd.DataFrame({
+            'id': por_operador['Operador'],
+            'nome': por_operador['Operador'],
+            'velocidade': velocidade_media
+        })
+
+
+# Instância usada pelos workers do pool de CPU, criada no primeiro uso em cada processo
+_processador_worker: Optional[UnifiedTXTProcessor] = None
+
+
+def _executar_no_worker(metodo: str, *args: Any) -> Any:
+    """
+    Executa um método síncrono do processador em um worker do pool de CPU.
+    Recebe o nome do método para que apenas dados serializáveis cruzem a fronteira entre processos.
+    """
+    global _processador_worker
+    if _processador_worker is None:
+        _processador_worker = UnifiedTXTProcessor()
+    return getattr(_processador_worker, metodo)(*args)
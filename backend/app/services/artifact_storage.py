@@ -0,0 +1,132 @@
+"""
+Armazenamento de artefatos dos relatórios (ex.: a base bruta em Parquet).
+
+Os artefatos ficam fora das tabelas de relatórios, que guardam apenas a referência retornada
+por put. Backends:
+- "local": arquivos em settings.ARTIFACT_STORAGE_DIR (desenvolvimento e testes);
+- "supabase": bucket settings.ARTIFACT_BUCKET do Storage do Supabase.
+"""
+
+import os
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..core.workers import run_io
+from ..database.gateway import get_persistence_gateway
+
+
+class ArtifactStorage:
+    """
+    Interface dos backends de artefatos. As chaves são caminhos relativos separados por '/'.
+    """
+
+    nome = ""
+
+    async def put(self, chave: str, conteudo: bytes, content_type: str = "application/octet-stream") -> Dict[str, Any]:
+        """
+        Grava o artefato e retorna a referência a ser guardada no relatório.
+        """
+        await self._gravar(self._validar_chave(chave), conteudo, content_type)
+        return {"storage": self.nome, "key": chave, "bytes": len(conteudo)}
+
+    async def get(self, chave: str) -> bytes:
+        """
+        Lê o conteúdo do artefato. Levanta FileNotFoundError se ele não existir.
+        """
+        return await self._ler(self._validar_chave(chave))
+
+    async def delete(self, chave: str) -> None:
+        """
+        Remove o artefato, se existir.
+        """
+        await self._remover(self._validar_chave(chave))
+
+    def _validar_chave(self, chave: str) -> str:
+        # As chaves podem vir de referências lidas do banco: recusar caminhos fora do armazenamento
+        partes = PurePosixPath(chave).parts
+        if not partes or chave.startswith('/') or any(parte in ('', '.', '..') for parte in partes):
+            raise ValueError(f"Chave de artefato inválida: {chave}")
+        return chave
+
+    async def _gravar(self, chave: str, conteudo: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    async def _ler(self, chave: str) -> bytes:
+        raise NotImplementedError
+
+    async def _remover(self, chave: str) -> None:
+        raise NotImplementedError
+
+
+class LocalArtifactStorage(ArtifactStorage):
+    """
+    Artefatos como arquivos em um diretório local, lidos e gravados no pool de I/O.
+    """
+
+    nome = "local"
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = Path(diretorio)
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio.joinpath(*PurePosixPath(chave).parts)
+
+    def _gravar_arquivo(self, chave: str, conteudo: bytes) -> None:
+        caminho = self._caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Gravar e renomear, para que leituras simultâneas nunca vejam um arquivo incompleto
+        temporario = caminho.with_name(f".{caminho.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+
+    async def _gravar(self, chave: str, conteudo: bytes, content_type: str) -> None:
+        await run_io(self._gravar_arquivo, chave, conteudo)
+
+    async def _ler(self, chave: str) -> bytes:
+        return await run_io(self._caminho(chave).read_bytes)
+
+    async def _remover(self, chave: str) -> None:
+        await run_io(self._caminho(chave).unlink, missing_ok=True)
+
+
+class SupabaseArtifactStorage(ArtifactStorage):
+    """
+    Artefatos em um bucket do Storage do Supabase, acessado pelo gateway assíncrono.
+    """
+
+    nome = "supabase"
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    async def _gravar(self, chave: str, conteudo: bytes, content_type: str) -> None:
+        await get_persistence_gateway(admin=True).upload(self.bucket, chave, conteudo, content_type)
+
+    async def _ler(self, chave: str) -> bytes:
+        return await get_persistence_gateway(admin=True).download(self.bucket, chave)
+
+    async def _remover(self, chave: str) -> None:
+        await get_persistence_gateway(admin=True).remove(self.bucket, [chave])
+
+
+_artifact_storage: Optional[ArtifactStorage] = None
+
+
+def get_artifact_storage() -> ArtifactStorage:
+    """
+    Retorna o armazenamento de artefatos configurado, criando-o no primeiro uso.
+    """
+    global _artifact_storage
+    if _artifact_storage is None:
+        if settings.ARTIFACT_STORAGE_BACKEND == "supabase":
+            _artifact_storage = SupabaseArtifactStorage(settings.ARTIFACT_BUCKET)
+        else:
+            _artifact_storage = LocalArtifactStorage(settings.ARTIFACT_STORAGE_DIR)
+    return _artifact_storage
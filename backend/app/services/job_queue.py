@@ -0,0 +1,331 @@
+"""
+Fila durável de processamentos, em arquivo SQLite.
+
+Os endpoints de upload enfileiram os trabalhos e os workers (worker.py), executados como
+processos separados do servidor web, os reservam, processam e confirmam. Um trabalho
+reservado fica invisível para os outros workers até settings.JOB_VISIBILITY_TIMEOUT; se o
+worker morrer sem renovar a reserva, o trabalho volta para a fila e é tentado de novo.
+"""
+
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.config import settings
+
+# Estados de um trabalho
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    Trabalho reservado por um worker.
+    """
+    id: str
+    tipo: str
+    payload: Dict[str, Any]
+    tentativas: int
+    max_tentativas: int
+
+
+class JobQueue:
+    """
+    Fila de trabalhos com reserva por tempo limitado, novas tentativas e deduplicação.
+
+    A deduplicação usa uma chave informada no enfileiramento (ex.: hash dos arquivos e
+    parâmetros); enquanto um trabalho com a mesma chave estiver na fila ou em execução,
+    enfileirar de novo retorna o trabalho existente. Concluído ou falho, a chave é liberada
+    e o mesmo envio pode ser processado de novo.
+
+    Com diretorio_arquivos, os arquivos de cada trabalho ficam em <diretorio_arquivos>/<id> e
+    são removidos pela fila quando uma reserva expira sem tentativas restantes.
+    """
+
+    def __init__(
+        self,
+        caminho: Path,
+        visibility_timeout: int,
+        max_tentativas: int,
+        intervalo_retentativa: int,
+        retencao: int,
+        diretorio_arquivos: Optional[Path] = None
+    ):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_tentativas = max_tentativas
+        self.intervalo_retentativa = intervalo_retentativa
+        self.retencao = retencao
+        self.diretorio_arquivos = Path(diretorio_arquivos) if diretorio_arquivos is not None else None
+        self._lock = threading.Lock()
+        # isolation_level=None: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        self._conexao = sqlite3.connect(
+            str(self.caminho), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    dedupe_key TEXT UNIQUE,
+                    status TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    max_tentativas INTEGER NOT NULL,
+                    disponivel_em REAL NOT NULL,
+                    reservado_ate REAL,
+                    worker TEXT,
+                    erro TEXT,
+                    resultado TEXT,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+                """
+            )
+            self._conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_fila ON jobs (status, disponivel_em)"
+            )
+
+    @contextmanager
+    def _transacao(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre uma transação com trava de escrita, para que dois workers nunca reservem o mesmo trabalho.
+        """
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conexao
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            raise
+        self._conexao.execute("COMMIT")
+
+    def enqueue(
+        self, tipo: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None,
+        job_id: Optional[str] = None
+    ) -> Tuple[str, bool]:
+        """
+        Enfileira um trabalho. Retorna o id e se ele foi criado (False quando a chave de
+        deduplicação já pertence a outro trabalho, cujo id é retornado).
+        """
+        agora = time.time()
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock, self._transacao() as conexao:
+            self._remover_antigos(conexao, agora)
+            if dedupe_key is not None:
+                existente = conexao.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ?", (dedupe_key,)
+                ).fetchone()
+                if existente is not None:
+                    return existente[0], False
+
+            conexao.execute(
+                """
+                INSERT INTO jobs (
+                    id, tipo, payload, dedupe_key, status, max_tentativas,
+                    disponivel_em, criado_em, atualizado_em
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id, tipo, json.dumps(payload, ensure_ascii=False), dedupe_key,
+                    STATUS_QUEUED, self.max_tentativas, agora, agora, agora
+                )
+            )
+        return job_id, True
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Reserva o próximo trabalho disponível: um da fila ou um cuja reserva expirou.
+        Retorna None se não houver trabalho.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            # Reservas expiradas sem tentativas restantes não voltam para a fila
+            expirados = [
+                linha[0] for linha in conexao.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND reservado_ate <= ? AND tentativas >= max_tentativas",
+                    (STATUS_RUNNING, agora)
+                )
+            ]
+            conexao.executemany(
+                """
+                UPDATE jobs SET status = ?, dedupe_key = NULL, reservado_ate = NULL,
+                    erro = COALESCE(erro, 'Reserva expirada sem confirmação do worker'), atualizado_em = ?
+                WHERE id = ?
+                """,
+                [(STATUS_FAILED, agora, job_id) for job_id in expirados]
+            )
+            linha = conexao.execute(
+                """
+                SELECT id, tipo, payload, tentativas, max_tentativas FROM jobs
+                WHERE (status = ? AND disponivel_em <= ?) OR (status = ? AND reservado_ate <= ?)
+                ORDER BY disponivel_em
+                LIMIT 1
+                """,
+                (STATUS_QUEUED, agora, STATUS_RUNNING, agora)
+            ).fetchone()
+            if linha is not None:
+                job_id, tipo, payload, tentativas, max_tentativas = linha
+                conexao.execute(
+                    """
+                    UPDATE jobs SET status = ?, tentativas = tentativas + 1, reservado_ate = ?,
+                        worker = ?, atualizado_em = ?
+                    WHERE id = ?
+                    """,
+                    (STATUS_RUNNING, agora + self.visibility_timeout, worker, agora, job_id)
+                )
+
+        # O worker que detinha a reserva não vai mais limpar os arquivos desses trabalhos
+        self._remover_arquivos(expirados)
+        if linha is None:
+            return None
+        return Job(job_id, tipo, json.loads(payload), tentativas + 1, max_tentativas)
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """
+        Renova a reserva do trabalho. Retorna False se ele não pertence mais ao worker.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            cursor = conexao.execute(
+                """
+                UPDATE jobs SET reservado_ate = ?, atualizado_em = ?
+                WHERE id = ? AND status = ? AND worker = ?
+                """,
+                (agora + self.visibility_timeout, agora, job_id, STATUS_RUNNING, worker)
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, job_id: str, worker: str, resultado: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Confirma a conclusão do trabalho. Retorna False (e nada muda) se a reserva já
+        passou para outro worker.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            # A chave é liberada: o mesmo envio pode ser reprocessado (ex.: após corrigir os dados no banco)
+            cursor = conexao.execute(
+                """
+                UPDATE jobs SET status = ?, dedupe_key = NULL, reservado_ate = NULL, erro = NULL,
+                    resultado = ?, atualizado_em = ?
+                WHERE id = ? AND status = ? AND worker = ?
+                """,
+                (
+                    STATUS_DONE, json.dumps(resultado, ensure_ascii=False, default=str), agora,
+                    job_id, STATUS_RUNNING, worker
+                )
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, erro: str) -> Optional[bool]:
+        """
+        Registra a falha do trabalho. Se houver tentativas restantes, ele volta para a fila
+        após um intervalo que dobra a cada tentativa. Retorna True se será tentado de novo,
+        False se falhou de vez e None (e nada muda) se a reserva já passou para outro worker.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            linha = conexao.execute(
+                "SELECT tentativas, max_tentativas FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                (job_id, STATUS_RUNNING, worker)
+            ).fetchone()
+            if linha is None:
+                return None
+
+            tentativas, max_tentativas = linha
+            if tentativas < max_tentativas:
+                atraso = self.intervalo_retentativa * (2 ** (tentativas - 1))
+                conexao.execute(
+                    """
+                    UPDATE jobs SET status = ?, disponivel_em = ?, reservado_ate = NULL, erro = ?, atualizado_em = ?
+                    WHERE id = ?
+                    """,
+                    (STATUS_QUEUED, agora + atraso, erro, agora, job_id)
+                )
+                return True
+
+            # Falha definitiva: liberar a chave para que o mesmo envio possa ser enfileirado de novo
+            conexao.execute(
+                """
+                UPDATE jobs SET status = ?, dedupe_key = NULL, reservado_ate = NULL, erro = ?, atualizado_em = ?
+                WHERE id = ?
+                """,
+                (STATUS_FAILED, erro, agora, job_id)
+            )
+            return False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna os dados de um trabalho, ou None se não existir.
+        """
+        with self._lock:
+            linha = self._conexao.execute(
+                """
+                SELECT id, tipo, status, tentativas, max_tentativas, erro, resultado, criado_em, atualizado_em
+                FROM jobs WHERE id = ?
+                """,
+                (job_id,)
+            ).fetchone()
+        if linha is None:
+            return None
+
+        job_id, tipo, status, tentativas, max_tentativas, erro, resultado, criado_em, atualizado_em = linha
+        return {
+            "id": job_id,
+            "type": tipo,
+            "status": status,
+            "attempts": tentativas,
+            "max_attempts": max_tentativas,
+            "error": erro,
+            "result": json.loads(resultado) if resultado else None,
+            "created_at": criado_em,
+            "updated_at": atualizado_em
+        }
+
+    def _remover_arquivos(self, ids: List[str]) -> None:
+        if self.diretorio_arquivos is None:
+            return
+        for job_id in ids:
+            print(f"Trabalho {job_id} falhou com a reserva expirada; removendo os seus arquivos")
+            shutil.rmtree(self.diretorio_arquivos / job_id, ignore_errors=True)
+
+    def _remover_antigos(self, conexao: sqlite3.Connection, agora: float) -> None:
+        """
+        Remove os trabalhos concluídos ou falhos há mais de self.retencao segundos.
+        """
+        conexao.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND atualizado_em <= ?",
+            (STATUS_DONE, STATUS_FAILED, agora - self.retencao)
+        )
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Retorna a fila de trabalhos configurada, criando-a no primeiro uso.
+    """
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            settings.JOB_QUEUE_PATH,
+            settings.JOB_VISIBILITY_TIMEOUT,
+            settings.JOB_MAX_ATTEMPTS,
+            settings.JOB_RETRY_DELAY,
+            settings.JOB_RETENTION,
+            settings.JOB_FILES_DIR
+        )
+    return _job_queue
@@ -4,7 +4,7 @@ import pyppeteer
 import uuid
 from datetime import datetime
 from ..utils.logger import logger
-from ..database.supabase_client import supabase_client, create_admin_client, supabase_url
+from ..database.gateway import get_persistence_gateway
 from pyppeteer import launch
 from fastapi import HTTPException
 from typing import Optional
@@ -13,10 +13,6 @@ class PDFService:
     def __init__(self):
         self.frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
         self.bucket_name = 'relatorios'
-        # Criar um cliente do Supabase com permissão de administrador para o Storage
-        self.admin_client = create_admin_client()
-        # URL do Supabase para construção de URLs públicas
-        self.supabase_url = supabase_url
         
     async def generate_and_upload_pdf(self, report_id, report_type):
         """Gera um PDF do relatório e faz upload para o Supabase"""
@@ -122,22 +118,18 @@ class PDFService:
         try:
             logger.upload(f"Enviando PDF para o Supabase: {storage_path}")
             
-            # Usar o admin client que tem permissões de service_role
-            client = self.admin_client if self.admin_client else supabase_client
+            # Gateway assíncrono com a chave service_role: o upload não bloqueia o event loop
+            gateway = get_persistence_gateway(admin=True)
             
             # Verificar se o bucket existe, caso contrário, criar
             try:
-                buckets = client.storage.list_buckets()
+                buckets = await gateway.list_buckets()
                 
-                bucket_exists = False
-                for bucket in buckets:
-                    if bucket.get('name') == self.bucket_name:
-                        bucket_exists = True
-                        break
+                bucket_exists = any(bucket.get('name') == self.bucket_name for bucket in buckets)
                 
                 if not bucket_exists:
                     logger.info(f"Criando bucket '{self.bucket_name}'")
-                    client.storage.create_bucket(self.bucket_name, {'public': True})
+                    await gateway.create_bucket(self.bucket_name, publico=True)
                     logger.success(f"Bucket '{self.bucket_name}' criado com sucesso")
             except Exception as e:
                 logger.error(f"Erro ao verificar/criar bucket: {str(e)}")
@@ -146,42 +138,18 @@ class PDFService:
             # Upload do arquivo
             try:
                 # Para PDFs, não precisamos abrir o arquivo, já temos o buffer
-                response = client.storage.from_(self.bucket_name).upload(
-                    path=storage_path,
-                    file=pdf_buffer,
-                    file_options={"contentType": "application/pdf"}
-                )
+                await gateway.upload(self.bucket_name, storage_path, pdf_buffer, "application/pdf")
                 
                 logger.success("Upload concluído com sucesso")
                 
-                # Obter URL pública
-                url = client.storage.from_(self.bucket_name).get_public_url(storage_path)
-                
-                # Se não conseguir obter a URL pública, construir manualmente
-                if not url:
-                    url = f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{storage_path}"
-                    logger.info(f"URL construída manualmente: {url}")
-                else:
-                    logger.success(f"URL pública obtida: {url}")
+                # URL pública do objeto
+                url = gateway.public_url(self.bucket_name, storage_path)
+                logger.success(f"URL pública obtida: {url}")
                 
                 return url
             except Exception as e:
                 logger.error(f"Erro durante o upload: {str(e)}")
-                # Tentar uma abordagem alternativa se a primeira falhar
-                try:
-                    logger.info("Tentando abordagem alternativa de upload...")
-                    response = client.storage.from_(self.bucket_name).upload(
-                        storage_path, 
-                        pdf_buffer
-                    )
-                    
-                    # Construir URL manualmente
-                    url = f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{storage_path}"
-                    logger.info(f"URL construída manualmente após tentativa alternativa: {url}")
-                    return url
-                except Exception as alt_e:
-                    logger.error(f"Tentativa alternativa falhou: {str(alt_e)}")
-                    return None
+                return None
         except Exception as e:
             logger.error(f"Erro ao fazer upload para o Supabase: {str(e)}")
             return None
@@ -199,8 +167,12 @@ class PDFService:
                     'updated_at': datetime.now().isoformat()
                 }
                 
-                # Abordagem simplificada conforme recomendado pelo assistente do Supabase
-                supabase_client.from_('relatorios_diarios').update(update_data).eq('id', report_id)
+                atualizados = await get_persistence_gateway().update(
+                    'relatorios_diarios', update_data, {'id': report_id}
+                )
+                if not atualizados:
+                    logger.error(f"Relatório {report_id} não encontrado para atualização")
+                    return False
                 
                 logger.success(f"Registro do relatório atualizado com sucesso: {report_id}")
                 return True
@@ -0,0 +1,185 @@
+"""
+Catálogo dos relatórios processados salvos em settings.UPLOAD_DIR (processed_*.json).
+
+Cada arquivo é registrado ao ser salvo, com a data do relatório, o tipo, a frente e o
+momento da geração (lidos de report["metadata"]), então /daily e /analytics encontram o
+arquivo com uma consulta indexada, sem listar o diretório nem consultar a data de cada arquivo.
+
+Na primeira utilização em cada processo, o catálogo é conciliado com o diretório: arquivos
+salvos antes do catálogo (ou copiados manualmente) são registrados e os removidos saem do índice.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..core.config import settings
+
+# Padrão dos nomes dos arquivos processados
+PREFIXO_ARQUIVO = "processed_"
+EXTENSAO_ARQUIVO = ".json"
+
+
+def _data_iso(valor: Union[date, str, None]) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()[:10]
+    return str(valor)[:10]
+
+
+class ProcessedFileCatalog:
+    """
+    Índice SQLite dos arquivos processados por data do relatório, tipo, frente e geração.
+    """
+
+    def __init__(self, caminho: Path, diretorio: Path):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.diretorio = Path(diretorio)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(str(self.caminho), timeout=30, check_same_thread=False)
+        with self._lock, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS processed_files (
+                    arquivo TEXT PRIMARY KEY,
+                    data_relatorio TEXT,
+                    tipo TEXT,
+                    frente TEXT,
+                    gerado_em TEXT NOT NULL,
+                    data_inicio TEXT,
+                    data_fim TEXT,
+                    tamanho INTEGER NOT NULL
+                )
+                """
+            )
+            self._conexao.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_processed_busca
+                ON processed_files (frente, data_relatorio, tipo, gerado_em)
+                """
+            )
+
+    def _linha(self, caminho: Path, report: Dict[str, Any]) -> Tuple[Any, ...]:
+        metadata = report.get("metadata") or {}
+        gerado_em = metadata.get("generated_at") or datetime.fromtimestamp(caminho.stat().st_mtime).isoformat()
+        return (
+            caminho.name,
+            _data_iso(metadata.get("date")),
+            metadata.get("type"),
+            metadata.get("frente"),
+            gerado_em,
+            _data_iso(metadata.get("start_date")),
+            _data_iso(metadata.get("end_date")),
+            caminho.stat().st_size
+        )
+
+    def register(self, caminho: Path, report: Dict[str, Any]) -> None:
+        """
+        Registra (ou atualiza) um arquivo processado recém-salvo, com os metadados do relatório.
+        """
+        linha = self._linha(Path(caminho), report)
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linha
+            )
+
+    def sync(self) -> None:
+        """
+        Concilia o catálogo com o diretório: registra os arquivos ausentes do índice, lendo os
+        seus metadados, e remove do índice os arquivos que não existem mais.
+        """
+        with os.scandir(self.diretorio) as entradas:
+            existentes = {
+                entrada.name for entrada in entradas
+                if entrada.is_file() and entrada.name.startswith(PREFIXO_ARQUIVO)
+                and entrada.name.endswith(EXTENSAO_ARQUIVO)
+            }
+        with self._lock:
+            catalogados = {linha[0] for linha in self._conexao.execute("SELECT arquivo FROM processed_files")}
+
+        novos = []
+        for nome in sorted(existentes - catalogados):
+            caminho = self.diretorio / nome
+            try:
+                with open(caminho, 'r', encoding='utf-8') as arquivo:
+                    report = json.load(arquivo)
+                novos.append(self._linha(caminho, report if isinstance(report, dict) else {}))
+            except (OSError, ValueError) as e:
+                print(f"Catálogo: arquivo {nome} ignorado: {str(e)}")
+
+        removidos = catalogados - existentes
+        with self._lock, self._conexao:
+            self._conexao.executemany("INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", novos)
+            self._conexao.executemany("DELETE FROM processed_files WHERE arquivo = ?", [(nome,) for nome in removidos])
+        if novos or removidos:
+            print(f"Catálogo de processados: {len(novos)} arquivo(s) registrado(s), {len(removidos)} removido(s)")
+
+    def _filtro_tipo(self) -> str:
+        # "colheita" também encontra "colheita_diario" e "colheita_semanal"
+        return "(tipo = :tipo OR substr(tipo, 1, length(:tipo) + 1) = :tipo || '_')"
+
+    def latest(self, report_date: Union[date, str], report_type: str, frente: str) -> Optional[Path]:
+        """
+        Arquivo gerado por último para a data do relatório, o tipo e a frente, ou None.
+        """
+        por_data = self.latest_by_date(report_date, report_date, report_type, frente)
+        return por_data[0][1] if por_data else None
+
+    def _consultar(
+        self, start_date: Union[date, str], end_date: Union[date, str], report_type: str, frente: str
+    ) -> List[Tuple[str, Path]]:
+        with self._lock:
+            linhas = self._conexao.execute(
+                f"""
+                SELECT data_relatorio, arquivo FROM (
+                    SELECT data_relatorio, arquivo, ROW_NUMBER() OVER (
+                        PARTITION BY data_relatorio ORDER BY gerado_em DESC, arquivo DESC
+                    ) AS ordem
+                    FROM processed_files
+                    WHERE frente = :frente AND data_relatorio BETWEEN :inicio AND :fim AND {self._filtro_tipo()}
+                )
+                WHERE ordem = 1
+                ORDER BY data_relatorio
+                """,
+                {"frente": frente, "inicio": _data_iso(start_date), "fim": _data_iso(end_date), "tipo": report_type}
+            ).fetchall()
+        return [(data_relatorio, self.diretorio / arquivo) for data_relatorio, arquivo in linhas]
+
+    def latest_by_date(
+        self, start_date: Union[date, str], end_date: Union[date, str], report_type: str, frente: str
+    ) -> List[Tuple[str, Path]]:
+        """
+        Para cada data de relatório do período com arquivos, o gerado por último: lista de (data, caminho) em ordem de data.
+        """
+        resultado = self._consultar(start_date, end_date, report_type, frente)
+        if all(caminho.exists() for _, caminho in resultado):
+            return resultado
+
+        # Arquivos removidos fora da API: atualizar o índice e repetir a consulta
+        self.sync()
+        return [
+            (data_relatorio, caminho) for data_relatorio, caminho in self._consultar(start_date, end_date, report_type, frente)
+            if caminho.exists()
+        ]
+
+
+_processed_catalog: Optional[ProcessedFileCatalog] = None
+
+
+def get_processed_catalog() -> ProcessedFileCatalog:
+    """
+    Retorna o catálogo dos arquivos processados, criando-o e conciliando-o com o diretório no primeiro uso.
+    """
+    global _processed_catalog
+    if _processed_catalog is None:
+        catalogo = ProcessedFileCatalog(settings.PROCESSED_CATALOG_PATH, settings.UPLOAD_DIR)
+        catalogo.sync()
+        _processed_catalog = catalogo
+    return _processed_catalog
@@ -0,0 +1,83 @@
+"""
+Gravação em lote dos relatórios de uma tarefa.
+
+Os registros são acumulados com add() e gravados por flush() com uma inserção em massa
+por tabela, dividida em lotes de até settings.PERSIST_BATCH_MAX_BYTES de JSON e
+settings.PERSIST_BATCH_MAX_ROWS registros.
+
+Cada registro é serializado uma única vez, fora do event loop: o mesmo JSON mede o
+tamanho dos lotes e forma o corpo das inserções.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.workers import run_io
+from ..database.gateway import json_bytes
+
+
+class ReportBatchWriter:
+    """
+    Acumula os registros de uma tarefa e os insere em lote, retornando os ids na ordem de add().
+    Cada instância atende uma única tarefa: flush() é chamado uma vez, ao final.
+    """
+
+    def __init__(self, gateway: Any, tamanho_maximo: Optional[int] = None, registros_maximo: Optional[int] = None):
+        self.gateway = gateway
+        self.tamanho_maximo = tamanho_maximo or settings.PERSIST_BATCH_MAX_BYTES
+        self.registros_maximo = registros_maximo or settings.PERSIST_BATCH_MAX_ROWS
+        self.pendentes: List[Tuple[str, Dict[str, Any]]] = []
+        self.corpos: List[Optional[bytes]] = []
+        # Preenchido à medida que cada lote é gravado: em caso de falha, indica o que já foi inserido
+        self.ids: List[Any] = []
+
+    def add(self, tabela: str, registro: Dict[str, Any], corpo: Optional[bytes] = None) -> int:
+        """
+        Acumula um registro e retorna a sua posição na lista de ids de flush().
+        corpo é o registro já serializado com json_bytes, se disponível; senão flush() o serializa.
+        """
+        self.pendentes.append((tabela, registro))
+        self.corpos.append(corpo)
+        self.ids.append(None)
+        return len(self.pendentes) - 1
+
+    def _serializar_pendentes(self) -> None:
+        for posicao, (_, registro) in enumerate(self.pendentes):
+            if self.corpos[posicao] is None:
+                self.corpos[posicao] = json_bytes(registro)
+
+    def _lotes(self) -> List[Tuple[str, List[int]]]:
+        """
+        Agrupa as posições dos registros por tabela, em lotes limitados por tamanho e quantidade.
+        Um registro maior que o limite forma um lote sozinho.
+        """
+        lotes: List[Tuple[str, List[int]]] = []
+        abertos: Dict[str, Tuple[List[int], int]] = {}
+        for posicao, (tabela, _) in enumerate(self.pendentes):
+            tamanho = len(self.corpos[posicao])
+            posicoes, acumulado = abertos.get(tabela, ([], 0))
+            if posicoes and (acumulado + tamanho > self.tamanho_maximo or len(posicoes) >= self.registros_maximo):
+                lotes.append((tabela, posicoes))
+                posicoes, acumulado = [], 0
+            abertos[tabela] = (posicoes + [posicao], acumulado + tamanho)
+        lotes.extend((tabela, posicoes) for tabela, (posicoes, _) in abertos.items() if posicoes)
+        return sorted(lotes, key=lambda lote: lote[1][0])
+
+    async def flush(self) -> List[Any]:
+        """
+        Insere os registros acumulados e retorna os ids na ordem em que foram adicionados.
+        Os lotes são gravados em sequência; uma falha interrompe a gravação e é repassada.
+        """
+        if any(corpo is None for corpo in self.corpos):
+            await run_io(self._serializar_pendentes)
+
+        for tabela, posicoes in self._lotes():
+            print(f"Inserindo {len(posicoes)} relatório(s) na tabela {tabela}")
+            corpo = b"[" + b",".join(self.corpos[posicao] for posicao in posicoes) + b"]"
+            dados = await self.gateway.insert_json(tabela, corpo)
+            if len(dados) != len(posicoes):
+                raise Exception(f"Erro ao salvar relatórios no Supabase: {len(dados)} de {len(posicoes)} registros retornados")
+            for posicao, linha in zip(posicoes, dados):
+                self.ids[posicao] = linha.get('id')
+
+        return list(self.ids)
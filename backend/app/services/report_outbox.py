@@ -0,0 +1,491 @@
+"""
+Outbox local (write-behind) para a gravação dos relatórios, em arquivo SQLite.
+
+Com settings.PERSIST_MODE = "outbox", os relatórios concluídos são gravados primeiro no
+outbox, em uma única transação, e recebem um id provisório; a tarefa termina sem esperar
+o Supabase. Um OutboxFlusher, em segundo plano na API e nos workers, envia os registros
+pelo gateway de persistência:
+- em ordem de chegada: um registro só é enviado depois de todos os anteriores;
+- em lotes de registros consecutivos da mesma tabela (settings.PERSIST_BATCH_MAX_*);
+- falhas transitórias (conexão, timeout, 429, 5xx) repetem o envio após um intervalo que
+  dobra a cada tentativa (até settings.OUTBOX_MAX_RETRY_DELAY), sem limite de tentativas;
+- falhas definitivas (demais 4xx e erros desconhecidos) marcam o registro como falho e o envio
+  segue com os próximos;
+- uma resposta 2xx inutilizável (JSON inválido, número de linhas diferente) marca o lote como
+  enviado sem o id definitivo, em vez de reenviá-lo e duplicar as linhas.
+
+Apenas um flusher envia por vez (reserva com prazo na tabela lease), então a ordem vale
+também com vários processos. A entrega é "pelo menos uma vez": se o processo cair entre a
+inserção e a confirmação no outbox, o registro é inserido de novo na retomada.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.workers import run_io
+from ..database.gateway import PersistenceResponseError, get_persistence_gateway, json_bytes
+from ..processors.base_encoding import FORMATO_BASE_PARQUET
+from .artifact_storage import get_artifact_storage
+from .task_store import get_task_store
+
+# Estados de um registro no outbox
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Nome da reserva de envio, única por arquivo de outbox
+LEASE_FLUSHER = "flusher"
+
+
+class ReportOutbox:
+    """
+    Registros aguardando o envio ao banco remoto, na ordem em que foram aceitos.
+    """
+
+    def __init__(self, caminho: Path, intervalo_retentativa: int, intervalo_maximo: int, retencao: int):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.intervalo_retentativa = intervalo_retentativa
+        self.intervalo_maximo = intervalo_maximo
+        self.retencao = retencao
+        self._lock = threading.Lock()
+        # isolation_level=None: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        self._conexao = sqlite3.connect(
+            str(self.caminho), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    tabela TEXT NOT NULL,
+                    registro TEXT NOT NULL,
+                    task_id TEXT,
+                    status TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    disponivel_em REAL NOT NULL,
+                    id_remoto TEXT,
+                    erro TEXT,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+                """
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_outbox_fila ON outbox (status, seq)")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS lease (nome TEXT PRIMARY KEY, dono TEXT NOT NULL, ate REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transacao(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre uma transação com trava de escrita.
+        """
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conexao
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            raise
+        self._conexao.execute("COMMIT")
+
+    def add(self, registros: List[Tuple[str, Any]], task_id: Optional[str] = None) -> List[str]:
+        """
+        Aceita os registros (tabela, registro) em uma única transação e retorna os ids provisórios, na mesma ordem.
+        O registro pode vir já serializado com json_bytes.
+        """
+        agora = time.time()
+        ids = [str(uuid.uuid4()) for _ in registros]
+        corpos = [
+            (registro if isinstance(registro, bytes) else json_bytes(registro)).decode('utf-8')
+            for _, registro in registros
+        ]
+        with self._lock, self._transacao() as conexao:
+            self._remover_antigos(conexao, agora)
+            conexao.executemany(
+                """
+                INSERT INTO outbox (id, tabela, registro, task_id, status, disponivel_em, criado_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (id_provisorio, tabela, corpo, task_id, STATUS_PENDING, agora, agora, agora)
+                    for id_provisorio, (tabela, _), corpo in zip(ids, registros, corpos)
+                ]
+            )
+        return ids
+
+    def acquire_lease(self, dono: str, duracao: float) -> bool:
+        """
+        Obtém ou renova a reserva de envio. Retorna False se outro flusher a detém.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            conexao.execute(
+                """
+                INSERT INTO lease (nome, dono, ate) VALUES (?, ?, ?)
+                ON CONFLICT (nome) DO UPDATE SET dono = excluded.dono, ate = excluded.ate
+                WHERE lease.dono = excluded.dono OR lease.ate <= ?
+                """,
+                (LEASE_FLUSHER, dono, agora + duracao, agora)
+            )
+            linha = conexao.execute("SELECT dono FROM lease WHERE nome = ?", (LEASE_FLUSHER,)).fetchone()
+        return linha is not None and linha[0] == dono
+
+    def release_lease(self, dono: str) -> None:
+        with self._lock, self._transacao() as conexao:
+            conexao.execute("DELETE FROM lease WHERE nome = ? AND dono = ?", (LEASE_FLUSHER, dono))
+
+    def next_batch(self, tamanho_maximo: int, registros_maximo: int) -> List[Tuple[str, str, str, Optional[str]]]:
+        """
+        Próximo lote a enviar: o registro pendente mais antigo, se já disponível, e os seguintes
+        da mesma tabela, até os limites de tamanho e quantidade. Retorna (id, tabela, JSON do registro, task_id).
+        """
+        agora = time.time()
+        with self._lock:
+            linhas = self._conexao.execute(
+                """
+                SELECT id, tabela, registro, task_id, disponivel_em FROM outbox
+                WHERE status = ? ORDER BY seq LIMIT ?
+                """,
+                (STATUS_PENDING, registros_maximo)
+            ).fetchall()
+
+        lote: List[Tuple[str, str, str, Optional[str]]] = []
+        acumulado = 0
+        for id_provisorio, tabela, registro, task_id, disponivel_em in linhas:
+            # Ordem de chegada: enquanto o mais antigo aguarda nova tentativa, nada é enviado
+            if not lote and disponivel_em > agora:
+                break
+            if lote and (tabela != lote[0][1] or acumulado + len(registro) > tamanho_maximo):
+                break
+            lote.append((id_provisorio, tabela, registro, task_id))
+            acumulado += len(registro)
+        return lote
+
+    def mark_sent(self, enviados: List[Tuple[str, Any]], erro: Optional[str] = None) -> None:
+        """
+        Registra os ids definitivos (id provisório, id remoto) dos registros enviados.
+        id remoto None (com erro) indica um registro inserido cujo id não foi confirmado.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            conexao.executemany(
+                "UPDATE outbox SET status = ?, id_remoto = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+                [
+                    (STATUS_SENT, str(id_remoto) if id_remoto is not None else None, erro, agora, id_provisorio)
+                    for id_provisorio, id_remoto in enviados
+                ]
+            )
+
+    def mark_retry(self, ids: List[str], erro: str) -> float:
+        """
+        Adia o envio dos registros após uma falha transitória. Retorna o intervalo até a próxima tentativa.
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            tentativas = max(
+                conexao.execute(
+                    f"SELECT tentativas FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall() or [(0,)]
+            )[0] + 1
+            atraso = min(self.intervalo_maximo, self.intervalo_retentativa * (2 ** (tentativas - 1)))
+            conexao.executemany(
+                "UPDATE outbox SET tentativas = ?, disponivel_em = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+                [(tentativas, agora + atraso, erro, agora, id_provisorio) for id_provisorio in ids]
+            )
+        return atraso
+
+    def mark_failed(self, id_provisorio: str, erro: str) -> None:
+        """
+        Marca o registro como falho de vez (ex.: rejeitado pelo banco remoto).
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conexao:
+            conexao.execute(
+                "UPDATE outbox SET status = ?, tentativas = tentativas + 1, erro = ?, atualizado_em = ? WHERE id = ?",
+                (STATUS_FAILED, erro, agora, id_provisorio)
+            )
+
+    def get(self, id_provisorio: str) -> Optional[Dict[str, Any]]:
+        """
+        Estado de um registro pelo id provisório, ou None se não existir (ou já tiver sido removido).
+        """
+        with self._lock:
+            linha = self._conexao.execute(
+                """
+                SELECT id, tabela, task_id, status, tentativas, id_remoto, erro, criado_em, atualizado_em
+                FROM outbox WHERE id = ?
+                """,
+                (id_provisorio,)
+            ).fetchone()
+        if linha is None:
+            return None
+
+        id_provisorio, tabela, task_id, status, tentativas, id_remoto, erro, criado_em, atualizado_em = linha
+        return {
+            "id": id_provisorio,
+            "table": tabela,
+            "task_id": task_id,
+            "status": status,
+            "remote_id": id_remoto,
+            "attempts": tentativas,
+            "error": erro,
+            "created_at": criado_em,
+            "updated_at": atualizado_em
+        }
+
+    def resolve_results(self, resultados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Atualiza resultados de tarefa com ids provisórios ("persisted": false) conforme o estado
+        do envio: id definitivo quando enviado, falha quando rejeitado.
+        """
+        for resultado in resultados.values():
+            if not isinstance(resultado, dict) or resultado.get("persisted", True):
+                continue
+            registro = self.get(str(resultado.get("id")))
+            if registro is None:
+                continue
+            if registro["status"] == STATUS_SENT:
+                resultado["persisted"] = True
+                if registro["remote_id"] is not None:
+                    resultado["id"] = registro["remote_id"]
+            elif registro["status"] == STATUS_FAILED:
+                resultado.update({"failed": True, "error": registro["error"]})
+        return resultados
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conexao.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()[0]
+
+    def _remover_antigos(self, conexao: sqlite3.Connection, agora: float) -> None:
+        """
+        Remove os registros enviados ou falhos há mais de self.retencao segundos.
+        """
+        conexao.execute(
+            "DELETE FROM outbox WHERE status IN (?, ?) AND atualizado_em <= ?",
+            (STATUS_SENT, STATUS_FAILED, agora - self.retencao)
+        )
+
+
+class OutboxFlusher:
+    """
+    Envia os registros do outbox em segundo plano, no event loop do processo.
+    """
+
+    def __init__(self, outbox: ReportOutbox, nome: Optional[str] = None):
+        self.outbox = outbox
+        self.nome = nome or f"{socket.gethostname()}-{os.getpid()}"
+        self._tarefa: Optional[asyncio.Task] = None
+        self._aviso: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """
+        Inicia o envio em segundo plano no event loop atual.
+        """
+        if self._tarefa is None or self._tarefa.done():
+            self._aviso = asyncio.Event()
+            self._tarefa = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Interrompe o envio e libera a reserva. Os registros pendentes continuam no outbox.
+        """
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await run_io(self.outbox.release_lease, self.nome)
+
+    def notify(self) -> None:
+        """
+        Avisa que há registros novos, antecipando a próxima verificação.
+        """
+        if self._aviso is not None:
+            self._aviso.set()
+
+    async def run(self) -> None:
+        print(f"Outbox: envio em segundo plano iniciado ({self.nome})")
+        while True:
+            try:
+                while await run_io(self.outbox.acquire_lease, self.nome, settings.OUTBOX_LEASE_TIMEOUT):
+                    if not await self.flush_once():
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox: erro no envio: {str(e)}")
+
+            if self._aviso is None:
+                self._aviso = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._aviso.clear()
+
+    async def flush_once(self) -> bool:
+        """
+        Envia o próximo lote. Retorna True se houve progresso (registros enviados ou descartados).
+        """
+        lote = await run_io(
+            self.outbox.next_batch, settings.PERSIST_BATCH_MAX_BYTES, settings.PERSIST_BATCH_MAX_ROWS
+        )
+        if not lote:
+            return False
+
+        try:
+            enviados = await self._enviar(lote)
+        except PersistenceResponseError as e:
+            # Os registros foram aceitos pelo banco: reenviá-los duplicaria as linhas
+            await self._confirmar([(id_provisorio, None, task_id) for id_provisorio, _, _, task_id in lote], str(e))
+            return True
+        except Exception as e:
+            # Erros desconhecidos não são repetidos: o registro à frente bloquearia todos os seguintes
+            if getattr(e, 'transitoria', False) or len(lote) == 1:
+                return await self._registrar_falha(lote, e)
+            # Falha definitiva de um lote: enviar um a um para isolar o registro rejeitado
+            enviados = []
+            for item in lote:
+                try:
+                    enviados += await self._enviar([item])
+                except PersistenceResponseError as erro_item:
+                    await self._confirmar(enviados + [(item[0], None, item[3])], str(erro_item))
+                    return True
+                except Exception as erro_item:
+                    if enviados:
+                        await self._confirmar(enviados)
+                    return await self._registrar_falha([item], erro_item)
+
+        await self._confirmar(enviados)
+        return True
+
+    async def _enviar(self, lote: List[Tuple[str, str, str, Optional[str]]]) -> List[Tuple[str, Any, Optional[str]]]:
+        tabela = lote[0][1]
+        # O JSON guardado no outbox é enviado como está, sem ser decodificado e serializado de novo
+        corpo = ("[" + ",".join(registro for _, _, registro, _ in lote) + "]").encode('utf-8')
+        dados = await get_persistence_gateway().insert_json(tabela, corpo)
+        if len(dados) != len(lote):
+            raise PersistenceResponseError(
+                f"Erro ao salvar relatórios no Supabase: {len(dados)} de {len(lote)} registros retornados"
+            )
+        return [(id_provisorio, linha.get('id'), task_id) for (id_provisorio, _, _, task_id), linha in zip(lote, dados)]
+
+    async def _confirmar(self, enviados: List[Tuple[str, Any, Optional[str]]], erro: Optional[str] = None) -> None:
+        """
+        Marca os registros como enviados. Com erro, os que não têm id remoto foram inseridos sem
+        confirmação do id: ficam com o id provisório e o aviso no resultado da tarefa.
+        """
+        await run_io(self.outbox.mark_sent, [(id_provisorio, id_remoto) for id_provisorio, id_remoto, _ in enviados], erro)
+        print(f"Outbox: {len(enviados)} relatório(s) enviado(s)" + (f" ({erro})" if erro else ""))
+        await run_io(self._atualizar_tarefas, [
+            (
+                task_id, id_provisorio,
+                {"id": id_remoto, "persisted": True} if id_remoto is not None else {"persisted": True, "error": erro}
+            )
+            for id_provisorio, id_remoto, task_id in enviados
+        ])
+
+    async def _registrar_falha(self, lote: List[Tuple[str, str, str, Optional[str]]], erro: Exception) -> bool:
+        if getattr(erro, 'transitoria', False):
+            atraso = await run_io(self.outbox.mark_retry, [item[0] for item in lote], str(erro))
+            print(f"Outbox: falha ao enviar {len(lote)} relatório(s), nova tentativa em {atraso:.0f}s: {str(erro)}")
+            return False
+
+        id_provisorio, _, registro, task_id = lote[0]
+        await run_io(self.outbox.mark_failed, id_provisorio, str(erro))
+        print(f"Outbox: relatório {id_provisorio} rejeitado: {str(erro)}")
+        await self._remover_artefato(id_provisorio, registro)
+        await run_io(self._atualizar_tarefas, [
+            (task_id, id_provisorio, {"persisted": False, "failed": True, "error": str(erro)})
+        ])
+        return True
+
+    async def _remover_artefato(self, id_provisorio: str, registro: str) -> None:
+        """
+        Remove o artefato da base (Parquet) de um registro que nunca será inserido.
+        """
+        base = (await run_io(json.loads, registro)).get("dados", {}).get("base")
+        if not (isinstance(base, dict) and base.get("format") == FORMATO_BASE_PARQUET):
+            return
+        try:
+            await get_artifact_storage().delete(base["key"])
+        except Exception as e:
+            print(f"Outbox: erro ao remover o artefato {base['key']} do relatório {id_provisorio}: {str(e)}")
+
+    def _atualizar_tarefas(self, alteracoes: List[Tuple[Optional[str], str, Dict[str, Any]]]) -> None:
+        """
+        Aplica as alterações (task_id, id provisório, valores) aos resultados das tarefas ainda
+        guardados, localizados pelo id provisório, e troca o id na lista de progresso ("reports").
+        Executado no pool de I/O.
+        """
+        store = get_task_store()
+        por_tarefa: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for task_id, id_provisorio, valores in alteracoes:
+            if task_id:
+                por_tarefa.setdefault(task_id, {})[id_provisorio] = valores
+
+        for task_id, valores_por_id in por_tarefa.items():
+            status = store.get(task_id)
+            resultados = (status or {}).get("results") or {}
+            alterado = False
+            for resultado in resultados.values():
+                if isinstance(resultado, dict) and resultado.get("id") in valores_por_id:
+                    resultado.update(valores_por_id[resultado["id"]])
+                    alterado = True
+            for relatorio in (status or {}).get("reports") or []:
+                valores = valores_por_id.get(relatorio.get("id")) if isinstance(relatorio, dict) else None
+                if valores is None:
+                    continue
+                if "id" in valores:
+                    relatorio["id"] = valores["id"]
+                if valores.get("failed"):
+                    relatorio.update({"status": "error", "error": valores["error"]})
+                alterado = True
+            if alterado:
+                store.set(task_id, status)
+
+
+_report_outbox: Optional[ReportOutbox] = None
+_outbox_flusher: Optional[OutboxFlusher] = None
+
+
+def get_report_outbox() -> ReportOutbox:
+    """
+    Retorna o outbox configurado, criando-o no primeiro uso.
+    """
+    global _report_outbox
+    if _report_outbox is None:
+        _report_outbox = ReportOutbox(
+            settings.OUTBOX_PATH,
+            settings.OUTBOX_RETRY_DELAY,
+            settings.OUTBOX_MAX_RETRY_DELAY,
+            settings.OUTBOX_RETENTION
+        )
+    return _report_outbox
+
+
+def get_outbox_flusher() -> OutboxFlusher:
+    """
+    Retorna o flusher do processo, criando-o no primeiro uso.
+    """
+    global _outbox_flusher
+    if _outbox_flusher is None:
+        _outbox_flusher = OutboxFlusher(get_report_outbox())
+    return _outbox_flusher
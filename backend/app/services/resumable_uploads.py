@@ -0,0 +1,255 @@
+"""
+Uploads retomáveis, enviados em partes.
+
+Protocolo:
+1. init: o cliente informa nome e tamanho do arquivo e recebe o upload_id e o tamanho das partes;
+2. PUT de cada parte no seu offset (múltiplo do tamanho das partes), em qualquer ordem e em
+   paralelo; uma conexão perdida exige reenviar apenas as partes sem confirmação;
+3. finalize: com todas as partes recebidas, o SHA-256 do arquivo montado é conferido com o
+   informado pelo cliente e o arquivo fica disponível para os processadores pelo upload_id.
+
+As partes são gravadas diretamente na posição final de um arquivo pré-alocado, e cada parte
+recebida é marcada por um arquivo próprio, então gravações simultâneas (inclusive de processos
+diferentes do servidor) não disputam nenhum estado compartilhado.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiofiles
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.workers import run_io
+from ..processors.telemetry_cache import hash_file
+from ..utils.uploads import ArquivoGravado
+
+ARQUIVO_METADADOS = "meta.json"
+ARQUIVO_DADOS = "data.part"
+DIRETORIO_PARTES = "partes"
+
+
+class ResumableUploadStore:
+    """
+    Sessões de upload em partes, guardadas em disco em diretorio/<upload_id>/.
+    """
+
+    def __init__(self, diretorio: Path, tamanho_parte: int, tamanho_maximo: int, ttl: int):
+        self.diretorio = Path(diretorio)
+        self.tamanho_parte = tamanho_parte
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+
+    def _sessao(self, upload_id: str) -> Path:
+        # O upload_id vem da URL: aceitar apenas o formato gerado em init
+        try:
+            upload_id = str(uuid.UUID(upload_id))
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+        return self.diretorio / upload_id
+
+    def _ler_metadados(self, upload_id: str) -> Dict[str, Any]:
+        caminho = self._sessao(upload_id) / ARQUIVO_METADADOS
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+
+    def _gravar_metadados(self, upload_id: str, metadados: Dict[str, Any]) -> None:
+        # Gravar e renomear, para que leituras simultâneas nunca vejam um arquivo incompleto
+        caminho = self._sessao(upload_id) / ARQUIVO_METADADOS
+        temporario = caminho.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    def _registrar_atividade(self, upload_id: str) -> None:
+        # Gravar as partes não altera o mtime do diretório da sessão, que marca a última atividade
+        try:
+            os.utime(self._sessao(upload_id))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+
+    def _total_partes(self, metadados: Dict[str, Any]) -> int:
+        return max(1, -(-metadados["size"] // metadados["part_size"]))
+
+    def _partes_recebidas(self, upload_id: str) -> List[int]:
+        diretorio = self._sessao(upload_id) / DIRETORIO_PARTES
+        return sorted(int(parte.name) for parte in diretorio.iterdir() if parte.name.isdigit())
+
+    def init(self, nome_arquivo: str, tamanho: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cria uma sessão de upload e pré-aloca o arquivo no tamanho informado.
+        """
+        if tamanho < 0 or tamanho > self.tamanho_maximo:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Tamanho inválido ou acima do máximo permitido ({self.tamanho_maximo} bytes)"
+            )
+
+        self._remover_expiradas()
+
+        upload_id = str(uuid.uuid4())
+        sessao = self.diretorio / upload_id
+        (sessao / DIRETORIO_PARTES).mkdir(parents=True)
+        with open(sessao / ARQUIVO_DADOS, 'wb') as arquivo:
+            arquivo.truncate(tamanho)
+
+        metadados = {
+            "upload_id": upload_id,
+            "filename": Path(nome_arquivo).name,
+            "size": tamanho,
+            "part_size": self.tamanho_parte,
+            "sha256": sha256.lower() if sha256 else None,
+            "finalized": False,
+            "created_at": time.time()
+        }
+        self._gravar_metadados(upload_id, metadados)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Estado da sessão, com as partes recebidas e as que faltam enviar.
+        """
+        metadados = self._ler_metadados(upload_id)
+        total = self._total_partes(metadados)
+        recebidas = self._partes_recebidas(upload_id)
+        conjunto = set(recebidas)
+        return {
+            **metadados,
+            "total_parts": total,
+            "received_parts": recebidas,
+            "missing_parts": [parte for parte in range(total) if parte not in conjunto]
+        }
+
+    async def write_part(
+        self, upload_id: str, offset: int, conteudo: AsyncIterator[bytes], sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Grava uma parte a partir do offset, lendo o corpo da requisição em fluxo.
+
+        O offset deve ser múltiplo do tamanho das partes e a parte deve ter exatamente o tamanho
+        esperado (menor apenas na última). Se sha256 for informado, o conteúdo é conferido antes
+        de a parte ser marcada como recebida. Reenviar uma parte apenas a sobrescreve.
+        """
+        metadados = self._ler_metadados(upload_id)
+        if metadados["finalized"]:
+            raise HTTPException(status_code=409, detail="Upload já finalizado")
+
+        tamanho_parte = metadados["part_size"]
+        if offset < 0 or offset % tamanho_parte != 0 or (offset >= metadados["size"] and metadados["size"] > 0):
+            raise HTTPException(status_code=400, detail=f"Offset inválido: use múltiplos de {tamanho_parte}")
+
+        indice = offset // tamanho_parte
+        esperado = min(tamanho_parte, metadados["size"] - offset)
+        sessao = self._sessao(upload_id)
+        self._registrar_atividade(upload_id)
+        marcador = sessao / DIRETORIO_PARTES / str(indice)
+        resumo = hashlib.sha256()
+        recebido = 0
+
+        # Um reenvio sobrescreve a parte: ela só volta a contar como recebida se chegar inteira
+        marcador.unlink(missing_ok=True)
+
+        async with aiofiles.open(sessao / ARQUIVO_DADOS, 'r+b') as arquivo:
+            await arquivo.seek(offset)
+            async for bloco in conteudo:
+                recebido += len(bloco)
+                if recebido > esperado:
+                    raise HTTPException(status_code=400, detail=f"Parte maior que o esperado ({esperado} bytes)")
+                resumo.update(bloco)
+                await arquivo.write(bloco)
+
+        if recebido != esperado:
+            raise HTTPException(
+                status_code=400, detail=f"Parte incompleta: recebidos {recebido} de {esperado} bytes"
+            )
+        if sha256 and resumo.hexdigest() != sha256.lower():
+            raise HTTPException(status_code=400, detail="SHA-256 da parte não confere")
+
+        marcador.touch()
+        self._registrar_atividade(upload_id)
+        return {"upload_id": upload_id, "part": indice, "size": recebido}
+
+    async def finalize(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Confere se todas as partes chegaram e o SHA-256 do arquivo montado.
+        """
+        estado = self.status(upload_id)
+        if estado["finalized"]:
+            return estado
+        if estado["missing_parts"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Partes pendentes", "missing_parts": estado["missing_parts"]}
+            )
+
+        esperado = (sha256 or estado["sha256"] or "").lower()
+        calculado = await run_io(hash_file, str(self._sessao(upload_id) / ARQUIVO_DADOS))
+        if esperado and calculado != esperado:
+            raise HTTPException(status_code=400, detail="SHA-256 do arquivo não confere")
+
+        metadados = self._ler_metadados(upload_id)
+        metadados.update({"sha256": calculado, "finalized": True})
+        self._gravar_metadados(upload_id, metadados)
+        return self.status(upload_id)
+
+    def get_file(self, upload_id: str) -> ArquivoGravado:
+        """
+        Arquivo de um upload finalizado, para ser entregue a um processador.
+        """
+        metadados = self._ler_metadados(upload_id)
+        if not metadados["finalized"]:
+            raise HTTPException(status_code=409, detail=f"Upload {upload_id} ainda não foi finalizado")
+        return ArquivoGravado(self._sessao(upload_id) / ARQUIVO_DADOS, metadados["size"], metadados["sha256"])
+
+    def filename(self, upload_id: str) -> str:
+        """
+        Nome original do arquivo enviado.
+        """
+        return self._ler_metadados(upload_id)["filename"]
+
+    def delete(self, upload_id: str) -> None:
+        """
+        Remove a sessão e o arquivo.
+        """
+        shutil.rmtree(self._sessao(upload_id), ignore_errors=True)
+
+    def _remover_expiradas(self) -> None:
+        """
+        Remove as sessões sem atividade (criação, parte gravada ou finalização) há mais de self.ttl segundos.
+        """
+        if not self.diretorio.exists():
+            return
+        limite = time.time() - self.ttl
+        for sessao in self.diretorio.iterdir():
+            try:
+                if sessao.is_dir() and sessao.stat().st_mtime < limite:
+                    shutil.rmtree(sessao, ignore_errors=True)
+            except FileNotFoundError:
+                continue
+
+
+_upload_store: Optional[ResumableUploadStore] = None
+
+
+def get_upload_store() -> ResumableUploadStore:
+    """
+    Retorna o armazenamento de uploads em partes, criando-o no primeiro uso.
+    """
+    global _upload_store
+    if _upload_store is None:
+        _upload_store = ResumableUploadStore(
+            settings.UPLOAD_SESSIONS_DIR,
+            settings.UPLOAD_PART_SIZE,
+            settings.MAX_TXT_UPLOAD_SIZE,
+            settings.UPLOAD_SESSION_TTL
+        )
+    return _upload_store
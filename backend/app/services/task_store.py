@@ -0,0 +1,216 @@
+"""
+Armazenamento do status das tarefas de processamento, com expiração (TTL) e limite de entradas.
+
+Dois backends estão disponíveis, escolhidos por settings.TASK_STORE_BACKEND:
+- "memory": dicionário no próprio processo, para implantações com um único processo, sem worker.py;
+- "sqlite" (padrão): arquivo SQLite compartilhado pela API e pelos workers na mesma máquina.
+"""
+
+import asyncio
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+# Status em que a tarefa não muda mais
+STATUS_FINAIS = ("completed", "error")
+
+
+class TaskStatusStore:
+    """
+    Interface comum dos backends. Cada gravação incrementa a versão do status da tarefa,
+    usada por watch() para enviar apenas mudanças.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o status da tarefa, ou None se não existir ou tiver expirado.
+        """
+        registro = self.get_versioned(task_id)
+        return registro[1] if registro else None
+
+    def get_versioned(self, task_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Retorna a versão e o status da tarefa, ou None se não existir ou tiver expirado.
+        """
+        raise NotImplementedError
+
+    def set(self, task_id: str, status: Dict[str, Any]) -> None:
+        """
+        Grava uma cópia do status da tarefa, renovando a sua expiração.
+        """
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> None:
+        """
+        Remove o status da tarefa.
+        """
+        raise NotImplementedError
+
+    async def watch(self, task_id: str, intervalo: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Gera o status da tarefa a cada mudança de versão, até a tarefa terminar.
+        Gera None uma vez se a tarefa não existir.
+        """
+        ultima_versao = None
+        while True:
+            registro = self.get_versioned(task_id)
+            if registro is None:
+                yield None
+                return
+
+            versao, status = registro
+            if versao != ultima_versao:
+                ultima_versao = versao
+                yield status
+                if status.get("status") in STATUS_FINAIS:
+                    return
+
+            await asyncio.sleep(intervalo)
+
+
+class InMemoryTaskStore(TaskStatusStore):
+    """
+    Backend em memória: visível apenas no processo que executa a tarefa.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        super().__init__(ttl, max_entries)
+        # task_id -> (versão, expiração, status), da gravação mais antiga para a mais recente
+        self._entradas: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_versioned(self, task_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            entrada = self._entradas.get(task_id)
+            if entrada is None:
+                return None
+            versao, expira_em, status = entrada
+            if expira_em <= time.time():
+                del self._entradas[task_id]
+                return None
+            return versao, copy.deepcopy(status)
+
+    def set(self, task_id: str, status: Dict[str, Any]) -> None:
+        agora = time.time()
+        with self._lock:
+            anterior = self._entradas.pop(task_id, None)
+            versao = anterior[0] + 1 if anterior else 1
+            self._entradas[task_id] = (versao, agora + self.ttl, copy.deepcopy(status))
+            self._remover_excedente(agora)
+
+    def delete(self, task_id: str) -> None:
+        with self._lock:
+            self._entradas.pop(task_id, None)
+
+    def _remover_excedente(self, agora: float) -> None:
+        """
+        Remove as entradas expiradas e, acima do limite, as gravadas há mais tempo.
+        """
+        for task_id in [t for t, (_, expira_em, _) in self._entradas.items() if expira_em <= agora]:
+            del self._entradas[task_id]
+        while len(self._entradas) > self.max_entries:
+            self._entradas.popitem(last=False)
+
+
+class SQLiteTaskStore(TaskStatusStore):
+    """
+    Backend em arquivo SQLite: todos os processos que apontam para o mesmo arquivo
+    enxergam o status das tarefas, independentemente de qual deles as executa.
+    """
+
+    def __init__(self, caminho: Path, ttl: int, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(str(self.caminho), timeout=30, check_same_thread=False)
+        with self._lock, self._conexao:
+            # WAL permite leituras de outros processos durante as gravações
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS task_status (
+                    task_id TEXT PRIMARY KEY,
+                    versao INTEGER NOT NULL,
+                    atualizado_em REAL NOT NULL,
+                    expira_em REAL NOT NULL,
+                    status TEXT NOT NULL
+                )
+                """
+            )
+            self._conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_task_status_atualizado ON task_status (atualizado_em)"
+            )
+
+    def get_versioned(self, task_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT versao, status FROM task_status WHERE task_id = ? AND expira_em > ?",
+                (task_id, time.time())
+            ).fetchone()
+        if linha is None:
+            return None
+        return linha[0], json.loads(linha[1])
+
+    def set(self, task_id: str, status: Dict[str, Any]) -> None:
+        agora = time.time()
+        conteudo = json.dumps(status, ensure_ascii=False, default=str)
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                """
+                INSERT INTO task_status (task_id, versao, atualizado_em, expira_em, status)
+                VALUES (?, 1, ?, ?, ?)
+                ON CONFLICT(task_id) DO UPDATE SET
+                    versao = versao + 1,
+                    atualizado_em = excluded.atualizado_em,
+                    expira_em = excluded.expira_em,
+                    status = excluded.status
+                """,
+                (task_id, agora, agora + self.ttl, conteudo)
+            )
+            self._conexao.execute("DELETE FROM task_status WHERE expira_em <= ?", (agora,))
+            self._conexao.execute(
+                """
+                DELETE FROM task_status WHERE task_id IN (
+                    SELECT task_id FROM task_status ORDER BY atualizado_em DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def delete(self, task_id: str) -> None:
+        with self._lock, self._conexao:
+            self._conexao.execute("DELETE FROM task_status WHERE task_id = ?", (task_id,))
+
+
+_task_store: Optional[TaskStatusStore] = None
+
+
+def get_task_store() -> TaskStatusStore:
+    """
+    Retorna o armazenamento de status configurado, criando-o no primeiro uso.
+    """
+    global _task_store
+    if _task_store is None:
+        if settings.TASK_STORE_BACKEND == "sqlite":
+            _task_store = SQLiteTaskStore(
+                settings.TASK_STORE_PATH, settings.TASK_STATUS_TTL, settings.TASK_STATUS_MAX_ENTRIES
+            )
+        elif settings.TASK_STORE_BACKEND == "memory":
+            _task_store = InMemoryTaskStore(settings.TASK_STATUS_TTL, settings.TASK_STATUS_MAX_ENTRIES)
+        else:
+            raise ValueError(
+                f"TASK_STORE_BACKEND inválido: {settings.TASK_STORE_BACKEND} (use 'memory' ou 'sqlite')"
+            )
+    return _task_store
@@ -0,0 +1,227 @@
+"""
+Processamento de arquivos TXT pela fila de trabalhos.
+
+A API grava os arquivos enviados em settings.JOB_FILES_DIR e enfileira o trabalho
+(enqueue_txt_reports); os workers (worker.py) reservam os trabalhos e geram os relatórios
+com o UnifiedTXTProcessor (JobWorker). O id do trabalho é o task_id, então o progresso
+é acompanhado pelas rotas de status das tarefas.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import socket
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import UploadFile
+
+from ..core.config import settings
+from ..core.workers import run_io
+from ..processors.unified_txt_processor import UnifiedTXTProcessor
+from ..utils.uploads import ArquivoGravado, save_upload_file
+from .job_queue import STATUS_DONE, STATUS_FAILED, STATUS_RUNNING, Job, JobQueue, get_job_queue
+from .report_outbox import get_report_outbox
+from .task_store import get_task_store
+
+# Tipo dos trabalhos de geração de relatórios a partir de TXT
+TIPO_RELATORIOS_TXT = "txt_reports"
+
+
+async def enqueue_txt_reports(
+    colhedora_file: Optional[Union[UploadFile, ArquivoGravado]],
+    transbordo_file: Optional[Union[UploadFile, ArquivoGravado]],
+    frentes: List[str],
+    report_types: List[str],
+    report_date: str,
+    is_teste: bool = False
+) -> Tuple[str, bool]:
+    """
+    Grava os arquivos enviados e enfileira a geração dos relatórios. Arquivos já gravados
+    (ex.: uploads em partes finalizados) são movidos para o diretório do trabalho.
+
+    Retorna o id do trabalho (task_id) e se ele foi criado. O mesmo conteúdo de arquivos
+    com os mesmos parâmetros não é enfileirado de novo enquanto o trabalho anterior estiver
+    na fila ou em execução: o id existente é retornado.
+    """
+    job_id = str(uuid.uuid4())
+    diretorio = settings.JOB_FILES_DIR / job_id
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    try:
+        payload: Dict[str, Any] = {
+            "frentes": frentes,
+            "report_types": report_types,
+            "report_date": str(report_date),
+            "is_teste": is_teste
+        }
+        hashes = {}
+        for tipo, upload_file in (('colhedora', colhedora_file), ('transbordo', transbordo_file)):
+            if upload_file is None:
+                payload[tipo] = None
+                continue
+            if isinstance(upload_file, ArquivoGravado):
+                destino = diretorio / f"{tipo}.txt"
+                await run_io(shutil.move, str(upload_file.caminho), str(destino))
+                arquivo = ArquivoGravado(destino, upload_file.tamanho, upload_file.sha256)
+            else:
+                arquivo = await save_upload_file(
+                    upload_file, diretorio / f"{tipo}.txt", settings.MAX_TXT_UPLOAD_SIZE
+                )
+            hashes[tipo] = arquivo.sha256
+            payload[tipo] = str(arquivo.caminho)
+
+        assinatura = json.dumps({
+            "tipo": TIPO_RELATORIOS_TXT,
+            "arquivos": hashes,
+            "frentes": sorted(frentes),
+            "report_types": sorted(report_types),
+            "report_date": payload["report_date"],
+            "is_teste": is_teste
+        }, sort_keys=True)
+        dedupe_key = hashlib.sha256(assinatura.encode('utf-8')).hexdigest()
+
+        fila = get_job_queue()
+        job_id, criado = await run_io(fila.enqueue, TIPO_RELATORIOS_TXT, payload, dedupe_key, job_id)
+    except Exception:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        raise
+
+    if not criado:
+        # Envio repetido: os arquivos já estão com o trabalho existente
+        shutil.rmtree(diretorio, ignore_errors=True)
+        print(f"Envio duplicado, reaproveitando o trabalho {job_id}")
+        return job_id, False
+
+    get_task_store().set(job_id, {"status": "queued", "stage": "queued", "progress": 0})
+    print(f"Trabalho {job_id} enfileirado")
+    return job_id, True
+
+
+def get_txt_task_status(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Status de uma tarefa de relatórios TXT: o publicado no armazenamento de status ou, se ele
+    já expirou, o estado do trabalho na fila. None se nenhum dos dois existir.
+    """
+    status = get_task_store().get(task_id)
+    if status is not None:
+        return status
+
+    job = get_job_queue().get(task_id)
+    if job is None:
+        return None
+    if job["status"] == STATUS_DONE:
+        resultados = job["result"] or {}
+        if any(isinstance(resultado, dict) and resultado.get("persisted") is False for resultado in resultados.values()):
+            # Resultado guardado na confirmação do trabalho, com ids provisórios do outbox
+            resultados = get_report_outbox().resolve_results(resultados)
+        return {"status": "completed", "stage": "completed", "progress": 100, "results": resultados}
+    if job["status"] == STATUS_FAILED:
+        return {"status": "error", "stage": "error", "error": job["error"]}
+    if job["status"] == STATUS_RUNNING:
+        return {"status": "processing", "stage": "processing", "attempts": job["attempts"]}
+    return {"status": "queued", "stage": "queued", "progress": 0, "attempts": job["attempts"]}
+
+
+class JobWorker:
+    """
+    Worker que reserva trabalhos da fila e os executa, um por vez.
+
+    Enquanto um trabalho roda, a reserva é renovada a cada terço de settings.JOB_VISIBILITY_TIMEOUT.
+    Para escalar, execute vários workers (processos ou máquinas) apontando para a mesma fila.
+    """
+
+    def __init__(self, nome: Optional[str] = None, fila: Optional[JobQueue] = None):
+        self.nome = nome or f"{socket.gethostname()}-{os.getpid()}"
+        self.fila = fila or get_job_queue()
+        self.processador = UnifiedTXTProcessor()
+        self._parar = asyncio.Event()
+
+    def parar(self) -> None:
+        """
+        Pede o encerramento do worker após o trabalho em andamento.
+        """
+        self._parar.set()
+
+    async def run(self, uma_vez: bool = False) -> None:
+        """
+        Executa trabalhos até parar() ser chamado. Com uma_vez, encerra quando a fila estiver vazia.
+        """
+        print(f"Worker {self.nome} iniciado")
+        while not self._parar.is_set():
+            job = await run_io(self.fila.claim, self.nome)
+            if job is None:
+                if uma_vez:
+                    break
+                try:
+                    await asyncio.wait_for(self._parar.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._executar(job)
+        print(f"Worker {self.nome} encerrado")
+
+    async def _executar(self, job: Job) -> None:
+        """
+        Executa um trabalho, confirmando-o na fila ou registrando a falha para nova tentativa.
+        """
+        print(f"Worker {self.nome}: trabalho {job.id} (tentativa {job.tentativas}/{job.max_tentativas})")
+        renovacao = asyncio.create_task(self._renovar_reserva(job))
+        try:
+            if job.tipo != TIPO_RELATORIOS_TXT:
+                raise ValueError(f"Tipo de trabalho desconhecido: {job.tipo}")
+            resultado = await self._processar_relatorios_txt(job)
+        except Exception as e:
+            renovacao.cancel()
+            print(f"Erro no trabalho {job.id}: {str(e)}")
+            novamente = await run_io(self.fila.fail, job.id, self.nome, str(e))
+            if novamente is None:
+                # A reserva expirou e o trabalho passou para outro worker, que cuida dos arquivos
+                print(f"Worker {self.nome}: trabalho {job.id} reservado por outro worker")
+            elif novamente:
+                get_task_store().set(job.id, {
+                    "status": "queued",
+                    "stage": "retrying",
+                    "progress": 0,
+                    "attempts": job.tentativas,
+                    "error": str(e)
+                })
+            else:
+                self._remover_arquivos(job)
+            return
+
+        renovacao.cancel()
+        if await run_io(self.fila.ack, job.id, self.nome, resultado):
+            self._remover_arquivos(job)
+        else:
+            print(f"Worker {self.nome}: trabalho {job.id} reservado por outro worker")
+
+    async def _processar_relatorios_txt(self, job: Job) -> Dict[str, Any]:
+        payload = job.payload
+        return await self.processador.process_files(
+            colhedora_file=Path(payload["colhedora"]) if payload.get("colhedora") else None,
+            transbordo_file=Path(payload["transbordo"]) if payload.get("transbordo") else None,
+            frentes=payload["frentes"],
+            report_types=payload["report_types"],
+            report_date=payload["report_date"],
+            is_teste=payload["is_teste"],
+            task_id=job.id
+        )
+
+    async def _renovar_reserva(self, job: Job) -> None:
+        intervalo = max(1, settings.JOB_VISIBILITY_TIMEOUT / 3)
+        while True:
+            await asyncio.sleep(intervalo)
+            if not await run_io(self.fila.heartbeat, job.id, self.nome):
+                print(f"Worker {self.nome}: reserva do trabalho {job.id} perdida")
+                return
+
+    def _remover_arquivos(self, job: Job) -> None:
+        """
+        Remove os arquivos do trabalho, que não será mais executado.
+        """
+        shutil.rmtree(settings.JOB_FILES_DIR / job.id, ignore_errors=True)
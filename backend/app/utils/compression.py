@@ -0,0 +1,99 @@
+"""
+Suporte a arquivos de telemetria compactados (.gz, .zip e .zst).
+
+A compressão é identificada pelos primeiros bytes do arquivo, não pela extensão, e o
+conteúdo é sempre lido descompactando em fluxo, sem gravar o arquivo descompactado em disco.
+"""
+
+import gzip
+import struct
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+# Assinaturas (magic numbers) de cada formato, no nome usado pelo parâmetro compression do pandas
+ASSINATURAS_COMPRESSAO = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'PK\x03\x04', 'zip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+
+def detect_compression(caminho_arquivo: Union[str, Path]) -> Optional[str]:
+    """
+    Retorna 'gzip', 'zip' ou 'zstd' conforme a assinatura do arquivo, ou None se não compactado.
+    """
+    with open(caminho_arquivo, 'rb') as arquivo:
+        inicio = arquivo.read(4)
+    for assinatura, compressao in ASSINATURAS_COMPRESSAO:
+        if inicio.startswith(assinatura):
+            return compressao
+    return None
+
+
+def _membro_zip(arquivo_zip: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """
+    Retorna o único arquivo contido no zip (o pandas, como aqui, não lê zips com vários arquivos).
+    """
+    membros = [membro for membro in arquivo_zip.infolist() if not membro.is_dir()]
+    if len(membros) != 1:
+        raise ValueError(f"O arquivo zip deve conter exatamente um arquivo de telemetria (encontrados: {len(membros)})")
+    return membros[0]
+
+
+@contextmanager
+def open_decompressed(caminho_arquivo: Union[str, Path], compressao: Optional[str]) -> Iterator[BinaryIO]:
+    """
+    Abre o conteúdo do arquivo para leitura binária, descompactando em fluxo.
+    """
+    if compressao is None:
+        with open(caminho_arquivo, 'rb') as arquivo:
+            yield arquivo
+    elif compressao == 'gzip':
+        with gzip.open(caminho_arquivo, 'rb') as arquivo:
+            yield arquivo
+    elif compressao == 'zip':
+        with zipfile.ZipFile(caminho_arquivo) as arquivo_zip:
+            with arquivo_zip.open(_membro_zip(arquivo_zip)) as arquivo:
+                yield arquivo
+    elif compressao == 'zstd':
+        # Dependência opcional, necessária apenas para arquivos .zst
+        import zstandard
+        with open(caminho_arquivo, 'rb') as compactado:
+            with zstandard.ZstdDecompressor().stream_reader(compactado) as arquivo:
+                yield arquivo
+    else:
+        raise ValueError(f"Compressão não suportada: {compressao}")
+
+
+def uncompressed_size(caminho_arquivo: Union[str, Path], compressao: Optional[str]) -> Optional[int]:
+    """
+    Tamanho do conteúdo descompactado, lido dos metadados do arquivo sem descompactá-lo.
+    Retorna None quando o formato não informa o tamanho de forma confiável.
+    """
+    caminho_arquivo = Path(caminho_arquivo)
+    tamanho_compactado = caminho_arquivo.stat().st_size
+    if compressao is None:
+        return tamanho_compactado
+
+    if compressao == 'gzip':
+        # Os últimos 4 bytes guardam o tamanho módulo 2^32; um valor menor que o próprio
+        # arquivo compactado indica conteúdo acima de 4GB
+        with open(caminho_arquivo, 'rb') as arquivo:
+            arquivo.seek(-4, 2)
+            tamanho = struct.unpack('<I', arquivo.read(4))[0]
+        return tamanho if tamanho >= tamanho_compactado else None
+
+    if compressao == 'zip':
+        with zipfile.ZipFile(caminho_arquivo) as arquivo_zip:
+            return _membro_zip(arquivo_zip).file_size
+
+    if compressao == 'zstd':
+        import zstandard
+        with open(caminho_arquivo, 'rb') as arquivo:
+            cabecalho = arquivo.read(18)
+        tamanho = zstandard.frame_content_size(cabecalho)
+        return tamanho if tamanho >= 0 else None
+
+    return None
@@ -0,0 +1,64 @@
+"""
+Gravação de uploads em disco por blocos, sem carregar o arquivo inteiro na memória.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+from ..core.config import settings
+
+
+def _formatar_tamanho(tamanho: int) -> str:
+    if tamanho >= 1024 * 1024:
+        return f"{tamanho / (1024 * 1024):.0f}MB"
+    return f"{tamanho} bytes"
+
+
+@dataclass
+class ArquivoGravado:
+    """
+    Resultado da gravação de um upload.
+    """
+    caminho: Path
+    tamanho: int
+    sha256: str
+
+
+async def save_upload_file(
+    upload_file: UploadFile, destino: Path, tamanho_maximo: int
+) -> ArquivoGravado:
+    """
+    Grava o upload em destino em blocos de settings.UPLOAD_CHUNK_SIZE, calculando o SHA-256
+    durante a cópia. Ao ultrapassar tamanho_maximo, interrompe a cópia, remove o arquivo
+    parcial e levanta HTTPException 413.
+    """
+    destino = Path(destino)
+    sha256 = hashlib.sha256()
+    tamanho = 0
+
+    try:
+        async with aiofiles.open(destino, 'wb') as arquivo:
+            while True:
+                bloco = await upload_file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not bloco:
+                    break
+
+                tamanho += len(bloco)
+                if tamanho > tamanho_maximo:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Arquivo {upload_file.filename} excede o tamanho máximo de "
+                               f"{_formatar_tamanho(tamanho_maximo)}"
+                    )
+
+                sha256.update(bloco)
+                await arquivo.write(bloco)
+    except BaseException:
+        destino.unlink(missing_ok=True)
+        raise
+
+    return ArquivoGravado(destino, tamanho, sha256.hexdigest())
@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import reports, analytics
+from app.core.workers import shutdown_executors
+from app.core.config import settings
+from app.database.gateway import close_persistence_gateways
+from app.services.report_outbox import get_outbox_flusher
+from app.api.routes import reports, analytics, uploads
 
 app = FastAPI(
     title="Boletim Plantadeiras API",
@@ -20,6 +24,21 @@ app.add_middleware(
 # Incluindo as rotas
 app.include_router(reports.router, prefix="/api/v1/relatorios", tags=["relatorios"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
+app.include_router(uploads.router, prefix="/api/v1/uploads", tags=["uploads"])
+
+@app.on_event("startup")
+async def iniciar_outbox():
+    # Enviar em segundo plano os relatórios aceitos no outbox
+    if settings.PERSIST_MODE == "outbox":
+        get_outbox_flusher().start()
+
+@app.on_event("shutdown")
+async def encerrar_pools():
+    # Fechar as conexões com o Supabase e encerrar os pools de execução usados no processamento dos relatórios
+    if settings.PERSIST_MODE == "outbox":
+        await get_outbox_flusher().stop()
+    await close_persistence_gateways()
+    shutdown_executors()
 
 if __name__ == "__main__":
     import uvicorn
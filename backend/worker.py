@@ -0,0 +1,60 @@
+"""
+Worker da fila de processamento de arquivos TXT.
+
+Uso:
+    python worker.py [--nome NOME] [--uma-vez]
+
+Execute quantos workers forem necessários, em uma ou mais máquinas, apontando para a mesma
+fila (settings.JOB_QUEUE_PATH), para os mesmos arquivos (settings.JOB_FILES_DIR) e para o
+mesmo status das tarefas (TASK_STORE_BACKEND=sqlite, padrão, com o mesmo TASK_STORE_PATH).
+"""
+
+import argparse
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.workers import shutdown_executors
+from app.database.gateway import close_persistence_gateways
+from app.services.report_outbox import get_outbox_flusher
+from app.services.txt_jobs import JobWorker
+
+
+async def executar(nome: str, uma_vez: bool) -> None:
+    worker = JobWorker(nome)
+
+    # Encerrar após o trabalho em andamento ao receber SIGINT/SIGTERM
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, worker.parar)
+        except NotImplementedError:
+            # Windows: sem tratamento de sinais no event loop
+            pass
+
+    # No modo outbox, os relatórios gerados por este worker também são enviados por ele
+    if settings.PERSIST_MODE == "outbox":
+        get_outbox_flusher().start()
+
+    try:
+        await worker.run(uma_vez=uma_vez)
+    finally:
+        if settings.PERSIST_MODE == "outbox":
+            await get_outbox_flusher().stop()
+        await close_persistence_gateways()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker da fila de processamento de arquivos TXT")
+    parser.add_argument("--nome", default=None, help="Identificação do worker (padrão: host-pid)")
+    parser.add_argument("--uma-vez", action="store_true", help="Encerrar quando a fila estiver vazia")
+    args = parser.parse_args()
+
+    if settings.TASK_STORE_BACKEND == "memory":
+        # O status ficaria só neste processo: a API nunca veria a tarefa passar de "queued"
+        raise SystemExit("TASK_STORE_BACKEND=memory não é suportado pelo worker; use TASK_STORE_BACKEND=sqlite")
+
+    try:
+        asyncio.run(executar(args.nome, args.uma_vez))
+    finally:
+        shutdown_executors()
@@ -57,10 +57,7 @@ def processar_arquivo(caminho_txt, caminho_excel):
         # Cálculos adicionais
         RPM_MINIMO = 300  # Definindo constante para RPM mínimo
         df['Parada com Motor Ligado'] = ((df['Velocidade'] == 0) & (df['RPM Motor'] >= RPM_MINIMO)).astype(int)
-        df['Horas Produtivas'] = df.apply(
-            lambda row: row['Diferença_Hora'] if row['Grupo Operacao'] == 'Produtiva' else 0,
-            axis=1
-        )
+        df['Horas Produtivas'] = df['Diferença_Hora'].where(df['Grupo Operacao'] == 'Produtiva', 0)
         
         # Limpeza e organização das colunas
         df = df.drop(columns=COLUNAS_REMOVER, errors='ignore')
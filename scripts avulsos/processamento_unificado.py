@@ -193,10 +193,7 @@ def processar_arquivo_colhedora(caminho_arquivo):
             
             # Verificar se Horas Produtivas já existe
             if 'Horas Produtivas' not in df.columns or df['Horas Produtivas'].isna().any():
-                df['Horas Produtivas'] = df.apply(
-                    lambda row: round(row['Diferença_Hora'], 4) if row['Grupo Operacao'] == 'Produtiva' else 0,
-                    axis=1
-                )
+                df['Horas Produtivas'] = df['Diferença_Hora'].round(4).where(df['Grupo Operacao'] == 'Produtiva', 0)
             else:
                 df['Horas Produtivas'] = pd.to_numeric(df['Horas Produtivas'].astype(str).str.strip(), errors='coerce')
                 df['Horas Produtivas'] = df['Horas Produtivas'].fillna(0)
@@ -541,21 +538,16 @@ def processar_arquivo_transbordo(caminho_arquivo):
             
             # Verificar se Horas Produtivas já existe
             if 'Horas Produtivas' not in df.columns or df['Horas Produtivas'].isna().any():
-                df['Horas Produtivas'] = df.apply(
-                    lambda row: round(row['Diferença_Hora'], 4) if row['Grupo Operacao'] == 'Produtiva' else 0,
-                    axis=1
-                )
+                df['Horas Produtivas'] = df['Diferença_Hora'].round(4).where(df['Grupo Operacao'] == 'Produtiva', 0)
             else:
                 df['Horas Produtivas'] = pd.to_numeric(df['Horas Produtivas'].astype(str).str.strip(), errors='coerce')
                 df['Horas Produtivas'] = df['Horas Produtivas'].fillna(0)
             
             # Coluna de GPS - Para transbordos
             if 'RTK (Piloto Automatico)' in df.columns:
-                df['GPS'] = df.apply(
-                    lambda row: row['Diferença_Hora'] if row.get('RTK (Piloto Automatico)', 0) == 1 
-                    and row['Velocidade'] > 0 and row['Grupo Operacao'] == 'Produtiva' else 0,
-                    axis=1
-                )
+                gps = ((df['RTK (Piloto Automatico)'] == 1) & (df['Velocidade'] > 0) &
+                       (df['Grupo Operacao'] == 'Produtiva'))
+                df['GPS'] = df['Diferença_Hora'].where(gps, 0)
             else:
                 df['GPS'] = 0
             